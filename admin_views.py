@@ -0,0 +1,33 @@
+"""Admin Views — hidden performance page (open with ?page=admin_perf as a teacher)"""
+
+import streamlit as st
+from profiler import page_stats, samples, reset
+
+def nav(page):
+    st.session_state.page = page
+    st.rerun()
+
+# ── PERFORMANCE ───────────────────────────────────────────────────────────────
+def page_admin_perf():
+    st.markdown('<div class="page-title">⏱️ Page Performance</div>', unsafe_allow_html=True)
+    st.markdown('<div class="page-sub">Render time and storage I/O per page, for this server process.</div>', unsafe_allow_html=True)
+
+    c1, c2 = st.columns(2)
+    with c1:
+        if st.button("← Back to Dashboard"):
+            nav("teacher_dashboard")
+    with c2:
+        if st.button("Reset samples", use_container_width=True):
+            reset(); st.rerun()
+
+    rows = page_stats()
+    if not rows:
+        st.info("No renders recorded yet."); return
+
+    st.markdown("**Latency per page (ms) and mean I/O per render**")
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+
+    st.markdown('<hr class="divider">', unsafe_allow_html=True)
+    st.markdown("**Slowest recent renders**")
+    slowest = sorted(samples(), key=lambda r: r["wall_ms"], reverse=True)[:20]
+    st.dataframe(slowest, use_container_width=True, hide_index=True)
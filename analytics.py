@@ -0,0 +1,121 @@
+"""
+Item analysis over the columnar score store.
+Per question: mean score, difficulty index, point-biserial discrimination,
+the spread of the semantic / keyword / coherence components, and the keywords
+students miss most often. Everything is computed in one vectorized pass over
+an exam's arrays and cached per exam version until its column file changes.
+"""
+
+import threading
+import warnings
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from database import get_exam_columns, exam_columns_stamp
+
+PASS_FRACTION = 0.5             # item counted "correct" at >= half marks
+QUANTILES     = (10, 25, 50, 75, 90)
+COMPONENTS    = ("semantic", "keyword", "coherence")
+
+_cache: Dict[Tuple[str, Optional[int]], Tuple[int, dict]] = {}   # (exam id, version) -> (stamp, report)
+_lock  = threading.Lock()
+
+
+def _point_biserial(correct: np.ndarray, rest: np.ndarray) -> np.ndarray:
+    """Column-wise Pearson r between a 0/1 item matrix and rest-of-test scores."""
+    answered = ~np.isnan(rest)
+    n = answered.sum(axis=0)
+    x = np.where(answered, correct, 0.0)
+    y = np.where(answered, rest, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        xm = x - x.sum(axis=0) / n
+        ym = y - y.sum(axis=0) / n
+        xm, ym = np.where(answered, xm, 0.0), np.where(answered, ym, 0.0)
+        r = (xm * ym).sum(axis=0) / np.sqrt((xm ** 2).sum(axis=0) * (ym ** 2).sum(axis=0))
+    return np.where(np.isfinite(r), r, np.nan)
+
+
+def _cells(cols: dict, field: str, nq: int) -> np.ndarray:
+    """An (n, nq) column; a file written before a new version added questions is padded."""
+    arr = cols[field][:, :nq]
+    if arr.shape[1] < nq:
+        fill = False if arr.dtype == bool else np.nan
+        arr = np.pad(arr, ((0, 0), (0, nq - arr.shape[1])), constant_values=fill)
+    return arr
+
+
+def compute(exam: dict, cols: dict) -> dict:
+    questions = exam["questions"]
+    nq        = len(questions)
+    score     = _cells(cols, "score", nq)
+    n         = score.shape[0]
+    max_marks = np.array([q["max_marks"] for q in questions], dtype=float)
+
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)     # a question nobody answered yet
+        frac       = score / max_marks
+        answered   = (~np.isnan(score)).sum(axis=0)
+        mean_score = np.nanmean(score, axis=0) if n else np.full(nq, np.nan)
+        difficulty = np.nanmean(frac, axis=0) if n else np.full(nq, np.nan)
+    total   = np.nansum(score, axis=1)
+    rest    = total[:, None] - score             # NaN where unanswered
+    correct = (frac >= PASS_FRACTION).astype(float)
+    discrimination = _point_biserial(correct, rest) if n > 1 else np.full(nq, np.nan)
+
+    labels = [f"Q{i+1}" for i in range(nq)]
+    items = pd.DataFrame({
+        "question": labels,
+        "text": [q["text"][:60] for q in questions],
+        "answers": answered,
+        "max_marks": max_marks,
+        "mean_score": np.round(mean_score, 2),
+        "difficulty": np.round(difficulty, 3),
+        "discrimination": np.round(discrimination, 3),
+        "overridden": _cells(cols, "overridden", nq).sum(axis=0),
+    })
+
+    spread = []
+    for comp in COMPONENTS:
+        arr = _cells(cols, comp, nq)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            qs = np.nanpercentile(arr, QUANTILES, axis=0) if n else np.full((len(QUANTILES), nq), np.nan)
+        for qi in range(nq):
+            spread.append({"question": labels[qi], "component": comp,
+                           **{f"p{p}": round(float(v), 3) for p, v in zip(QUANTILES, qs[:, qi])}})
+    components = pd.DataFrame(spread)
+
+    # Keyword hits are (row, question, keyword) triples; count them per keyword
+    kw_counts = [len(q.get("keywords", [])) for q in questions]
+    width     = max(kw_counts + [1])
+    inside    = (cols["hit_q"] < nq) & (cols["hit_kw"] < width)
+    flat      = cols["hit_q"][inside] * width + cols["hit_kw"][inside]
+    hits      = np.bincount(flat, minlength=nq * width).reshape(nq, width)
+    missed_rows = []
+    for qi, q in enumerate(questions):
+        for ki, kw in enumerate(q.get("keywords", [])):
+            if answered[qi]:
+                missed_rows.append({"question": labels[qi], "keyword": kw,
+                                    "missed_by": int(answered[qi] - hits[qi, ki]),
+                                    "miss_rate": round(1 - hits[qi, ki] / answered[qi], 3)})
+    missed = pd.DataFrame(missed_rows, columns=["question", "keyword", "missed_by", "miss_rate"])
+    missed = missed.sort_values("miss_rate", ascending=False, kind="stable").reset_index(drop=True)
+
+    return {"submissions": n, "items": items, "components": components, "missed_keywords": missed}
+
+
+def item_analysis(exam: dict) -> dict:
+    """Cached per exam version; recomputed only after a submission or override touches it."""
+    key   = (exam["id"], exam.get("version"))
+    stamp = exam_columns_stamp(exam["id"])
+    with _lock:
+        hit = _cache.get(key)
+    if hit and stamp and hit[0] == stamp:
+        return hit[1]
+    report = compute(exam, get_exam_columns(exam["id"]))
+    # tagged with the stamp read before the load: a write racing it forces a recompute
+    with _lock:
+        _cache[key] = (stamp or exam_columns_stamp(exam["id"]), report)
+    return report
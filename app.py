@@ -4,8 +4,15 @@ Run: streamlit run app.py
 """
 
 import streamlit as st
+import importlib
 import time
-from database import authenticate, create_user, get_exams
+from pathlib import Path
+
+import database
+from database import authenticate, create_session, create_user, end_session, get_exams, session_user
+from profiler import profile_page
+
+STATIC_DIR = Path(__file__).parent / "static"
 
 st.set_page_config(
     page_title="ExamEval AI",
@@ -14,160 +21,38 @@ st.set_page_config(
     initial_sidebar_state="collapsed",
 )
 
-# ── Global CSS: light + dark mode aware ──────────────────────────────────────
-st.markdown("""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Plus+Jakarta+Sans:wght@300;400;500;600;700;800&display=swap');
-
-html, body, [class*="css"], .stMarkdown, p, div {
-    font-family: 'Plus Jakarta Sans', sans-serif !important;
-}
-
-/* Hide Streamlit chrome */
-#MainMenu, footer, header, .stDeployButton { visibility: hidden; display: none; }
-.block-container {
-    padding: 2rem 1rem 3rem 1rem !important;
-    max-width: 860px !important;
-}
-
-/* ── Buttons ── */
-.stButton > button {
-    font-family: 'Plus Jakarta Sans', sans-serif !important;
-    font-weight: 600 !important;
-    border-radius: 10px !important;
-    border: none !important;
-    padding: 0.6rem 1.4rem !important;
-    transition: all 0.18s ease !important;
-    font-size: 0.95rem !important;
-}
-.stButton > button:hover {
-    transform: translateY(-2px) !important;
-    box-shadow: 0 6px 20px rgba(0,0,0,0.18) !important;
-}
+# ── Static assets & store: built once per server process, not on every rerun ──
+@st.cache_resource
+def load_css() -> str:
+    return "<style>\n" + (STATIC_DIR / "style.css").read_text() + "</style>"
 
-/* Primary button colour fix */
-.stButton > button[kind="primary"] {
-    background: linear-gradient(135deg, #4F46E5, #7C3AED) !important;
-    color: white !important;
-}
-
-/* ── Inputs ── */
-.stTextInput > div > div > input,
-.stTextArea > div > div > textarea,
-.stNumberInput > div > div > input {
-    border-radius: 10px !important;
-    font-family: 'Plus Jakarta Sans', sans-serif !important;
-    font-size: 0.95rem !important;
-}
-
-/* ── Tabs ── */
-.stTabs [data-baseweb="tab"] {
-    font-family: 'Plus Jakarta Sans', sans-serif !important;
-    font-weight: 600 !important;
-}
-
-/* ── Alerts ── */
-.stAlert { border-radius: 10px !important; }
-
-/* ── Expander ── */
-.streamlit-expanderHeader {
-    font-family: 'Plus Jakarta Sans', sans-serif !important;
-    font-weight: 600 !important;
-}
+@st.cache_resource
+def setup_store():
+    database.init_store()
 
-/* ── Metric ── */
-[data-testid="metric-container"] {
-    border-radius: 12px !important;
-    border: 1px solid rgba(128,128,128,0.2) !important;
-    padding: 0.8rem 1rem !important;
-}
+setup_store()
 
-/* ── Custom component classes ── */
-.nav-bar {
-    display: flex;
-    justify-content: space-between;
-    align-items: center;
-    padding: 0.6rem 0 1rem 0;
-    border-bottom: 1px solid rgba(128,128,128,0.2);
-    margin-bottom: 1.5rem;
-}
-.brand {
-    font-size: 1.3rem;
-    font-weight: 800;
-    background: linear-gradient(135deg, #4F46E5, #7C3AED);
-    -webkit-background-clip: text;
-    -webkit-text-fill-color: transparent;
-    background-clip: text;
-}
-.page-title {
-    font-size: 1.6rem;
-    font-weight: 800;
-    margin-bottom: 0.25rem;
-}
-.page-sub {
-    font-size: 0.95rem;
-    opacity: 0.6;
-    margin-bottom: 1.5rem;
-}
-.card {
-    border-radius: 14px;
-    border: 1px solid rgba(128,128,128,0.2);
-    padding: 1.2rem 1.4rem;
-    margin-bottom: 0.9rem;
-    background: transparent;
-}
-.code-pill {
-    display: inline-block;
-    font-family: 'Courier New', monospace;
-    font-weight: 800;
-    font-size: 1rem;
-    letter-spacing: 4px;
-    padding: 0.3rem 1rem;
-    border-radius: 8px;
-    background: rgba(79,70,229,0.12);
-    color: #4F46E5;
-    border: 1.5px solid rgba(79,70,229,0.3);
-}
-.badge {
-    display: inline-block;
-    padding: 0.2rem 0.7rem;
-    border-radius: 20px;
-    font-weight: 700;
-    font-size: 0.82rem;
-}
-.badge-green  { background: rgba(34,197,94,0.15);  color: #16a34a; }
-.badge-yellow { background: rgba(234,179,8,0.15);  color: #b45309; }
-.badge-red    { background: rgba(239,68,68,0.15);  color: #dc2626; }
-.badge-blue   { background: rgba(79,70,229,0.12);  color: #4F46E5; }
-
-.step-num {
-    width: 30px; height: 30px;
-    border-radius: 50%;
-    display: inline-flex;
-    align-items: center;
-    justify-content: center;
-    font-weight: 800;
-    font-size: 0.85rem;
-    color: white;
-    flex-shrink: 0;
-}
-.divider { border: none; border-top: 1px solid rgba(128,128,128,0.2); margin: 1.2rem 0; }
-
-/* Timer display */
-.timer-box {
-    text-align: center;
-    padding: 0.8rem;
-    border-radius: 12px;
-    border: 2px solid;
-}
-</style>
-""", unsafe_allow_html=True)
+# ── Global CSS: light + dark mode aware (static/style.css) ───────────────────
+st.markdown(load_css(), unsafe_allow_html=True)
 
 # ── Session state ─────────────────────────────────────────────────────────────
-for k, v in [("user", None), ("page", "home")]:
+for k, v in [("user", None), ("page", "home"), ("session", None)]:
     if k not in st.session_state:
         st.session_state[k] = v
 
+# The session token stays server-side in session state, never in the URL (a
+# shared link must not sign anyone in). Each rerun resolves it from the
+# in-memory session cache (database.py), so an expired or revoked session
+# signs the user out without the user store being read.
+if st.session_state.session:
+    st.session_state.user = session_user(st.session_state.session)
+    if st.session_state.user is None:
+        st.session_state.session = None
+
+def sign_in(user: dict):
+    st.session_state.user    = user
+    st.session_state.session = create_session(user)
+
 def nav(page: str):
     st.session_state.page = page
     st.rerun()
@@ -193,6 +78,9 @@ def render_navbar():
                 st.markdown(f"<div style='text-align:right;font-weight:600;padding-top:6px'>{icon} {user['name']}</div>", unsafe_allow_html=True)
             with rc2:
                 if st.button("Logout", key="logout_btn"):
+                    if st.session_state.session:
+                        end_session(st.session_state.session)
+                    st.session_state.session = None
                     st.session_state.user = None
                     st.session_state.page = "home"
                     st.rerun()
@@ -303,7 +191,7 @@ def page_login(role: str):
             if st.form_submit_button("Login →", use_container_width=True):
                 user = authenticate(email.strip(), password)
                 if user and user["role"] == role:
-                    st.session_state.user = user
+                    sign_in(user)
                     nav("teacher_dashboard" if role == "teacher" else "student_dashboard")
                 elif user:
                     st.error(f"This account is a {user['role']} account. Please use the correct portal.")
@@ -328,7 +216,7 @@ def page_login(role: str):
                 else:
                     user = create_user(name.strip(), email.strip(), password, role)
                     if user:
-                        st.session_state.user = user
+                        sign_in(user)
                         st.success(f"✅ Welcome, {name}! Redirecting…")
                         time.sleep(0.7)
                         nav("teacher_dashboard" if role == "teacher" else "student_dashboard")
@@ -340,28 +228,38 @@ def page_login(role: str):
         nav("home")
 
 # ── ROUTING ───────────────────────────────────────────────────────────────────
-from teacher_views import page_teacher_dashboard, page_create_exam, page_exam_results
-from student_views  import page_student_dashboard, page_take_exam, page_my_results
+# page -> (view module, view function, required role). View modules are imported
+# on first use, so a student session never loads the teacher UI and vice versa.
+ROUTES = {
+    "teacher_dashboard": ("teacher_views", "page_teacher_dashboard", "teacher"),
+    "create_exam":       ("teacher_views", "page_create_exam",       "teacher"),
+    "exam_results":      ("teacher_views", "page_exam_results",      "teacher"),
+    "student_dashboard": ("student_views", "page_student_dashboard", "student"),
+    "take_exam":         ("student_views", "page_take_exam",         "student"),
+    "my_results":        ("student_views", "page_my_results",        "student"),
+    "admin_perf":        ("admin_views",   "page_admin_perf",        "teacher"),
+}
+
+def load_view(module: str, func: str):
+    return getattr(importlib.import_module(module), func)
+
+# Hidden admin page: not linked anywhere, reached via ?page=admin_perf. The
+# parameter is consumed on arrival so Back, Logout and sign-in redirects work.
+if st.query_params.get("page") == "admin_perf":
+    st.query_params.pop("page")
+    st.session_state.page = "admin_perf"
 
 page = st.session_state.page
 
-if page == "home":
-    page_home()
-elif page == "login_teacher":
-    page_login("teacher")
-elif page == "login_student":
-    page_login("student")
-elif page == "teacher_dashboard":
-    require_auth("teacher"); render_navbar(); page_teacher_dashboard()
-elif page == "create_exam":
-    require_auth("teacher"); render_navbar(); page_create_exam()
-elif page == "exam_results":
-    require_auth("teacher"); render_navbar(); page_exam_results()
-elif page == "student_dashboard":
-    require_auth("student"); render_navbar(); page_student_dashboard()
-elif page == "take_exam":
-    require_auth("student"); render_navbar(); page_take_exam()
-elif page == "my_results":
-    require_auth("student"); render_navbar(); page_my_results()
-else:
-    nav("home")
+with profile_page(page):
+    if page == "home":
+        page_home()
+    elif page == "login_teacher":
+        page_login("teacher")
+    elif page == "login_student":
+        page_login("student")
+    elif page in ROUTES:
+        module, func, role = ROUTES[page]
+        require_auth(role); render_navbar(); load_view(module, func)()
+    else:
+        nav("home")
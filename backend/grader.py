@@ -5,47 +5,28 @@ combined with keyword presence scoring and coherence checks.
 No external model downloads required.
 """
 
-import re
 import math
-import string
-from typing import List, Optional
+from typing import List
 
+from tokenizer import ENGLISH
 
-# ── Stop words (built-in, no NLTK required) ─────────────────────────────────
-STOP_WORDS = {
-    "a", "an", "the", "is", "it", "in", "on", "at", "to", "for", "of", "and",
-    "or", "but", "not", "with", "this", "that", "are", "was", "be", "been",
-    "being", "have", "has", "had", "do", "does", "did", "will", "would", "can",
-    "could", "should", "may", "might", "shall", "from", "by", "as", "so", "if",
-    "then", "than", "there", "their", "they", "we", "our", "us", "you", "your",
-    "he", "she", "his", "her", "its", "my", "me", "i", "am", "were", "also",
-    "into", "which", "who", "what", "when", "where", "how", "all", "each",
-    "both", "more", "most", "other", "some", "such", "no", "only", "same",
-    "up", "out", "about", "above", "after", "before", "between", "through",
-    "during", "while", "although", "because", "since", "any", "these", "those",
-}
+
+# ── Stop words and stemming: the English pack in tokenizer.py ───────────────
+STOP_WORDS = ENGLISH.stop_words
 
 
 def preprocess(text: str) -> List[str]:
     """Tokenise, lowercase, strip punctuation, remove stop words."""
-    text = text.lower()
-    text = re.sub(r"[^\w\s]", " ", text)
-    tokens = text.split()
-    return [t for t in tokens if t not in STOP_WORDS and len(t) > 1]
+    return ENGLISH.tokens(text)
 
 
 def simple_stem(word: str) -> str:
     """Lightweight suffix-stripping stemmer (Porter-inspired)."""
-    suffixes = ["ation", "ations", "ing", "ings", "tion", "tions",
-                "ness", "ment", "ments", "ers", "ies", "es", "ed", "ly", "s"]
-    for suffix in suffixes:
-        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
-            return word[: len(word) - len(suffix)]
-    return word
+    return ENGLISH.stem_word(word)
 
 
 def stem_tokens(tokens: List[str]) -> List[str]:
-    return [simple_stem(t) for t in tokens]
+    return ENGLISH.stem_tokens(tokens)
 
 
 # ── TF-IDF Cosine Similarity ─────────────────────────────────────────────────
@@ -0,0 +1,371 @@
+"""
+Incremental point-in-time backups of the data directory.
+
+A snapshot covers the primary store files: users, exam version files, the
+question bank and the per-exam submission shards. Everything else in data/ is
+derived (submission index, score columns, change feed, grading cache) and is
+rebuilt on restore. That includes exams.json: every exam record in it is also
+its latest version file (exams are versioned, never deleted), so restore
+writes it from those, and an exam edit costs a snapshot one new small file
+instead of a re-read of every exam.
+
+Taking a snapshot never blocks writers. database._save replaces files
+atomically, so a hard link to a store file pins one complete version of it
+while the app carries on writing new versions. The users log (users.jsonl)
+is only ever appended to, so its link is read up to the size it had when
+linked, which is likewise one complete version. The files are linked in
+reference order: shards, then exam version files, then the question bank,
+then users. Every record refers only to records that existed before it (a
+submission to its exam version and student, a version to its questions and
+teacher), so whatever the snapshot holds, its references resolve. The change
+feed head read just before linking is recorded as feed_seq: every change up
+to it is in the snapshot.
+
+Snapshots form a chain, and each one stores only what changed since its parent:
+
+  manifest.json   for every file read, its identity (inode, size, mtime) and
+                  the new version (content hash) of each record that changed,
+                  or null for a deleted one; the files that went away; the
+                  parent snapshot and a checksum of the delta
+  delta.jsonl.gz  one line per record that is new or changed since the
+                  parent ({"f": file, "id": record id, "v": version, "r": record}),
+                  one per deleted record (no "r", "v" null), and {"f": file,
+                  "reset": true} before a file that is stored again in full
+
+The state of the whole store (every file's identity and record versions) is
+rebuilt by replaying the manifests from the chain's root. Files whose
+identity has not changed since the parent are not even read, and the users
+log is read from the offset the parent stopped at, so an hourly snapshot
+costs in proportion to the exams, submissions and users that changed. The
+first snapshot (or one taken with --full) has no parent and holds every
+record. Restore replays the chain from its root; verify does the same and
+checks every record against the manifests.
+
+    python backup.py snapshot [--full]
+    python backup.py list
+    python backup.py verify [SNAPSHOT]
+    python backup.py restore SNAPSHOT --to DIR [--force]
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import jsonstream
+from database import (COLUMNS_DIR, COMPACT_MARKER, DATA_DIR, EXAM_VERSIONS_DIR, EXAMS_FILE, FEED_FILE,
+                      QUESTIONS_FILE, SUBMISSION_INDEX, SUBMISSIONS_DIR, USERS_FILE, _feed, _summary,
+                      iter_user_log, read_user_log)
+
+BACKUP_DIR = Path(os.environ.get("EXAMEVAL_BACKUP_DIR", "backups"))
+MANIFEST = "manifest.json"
+DELTA = "delta.jsonl.gz"
+FORMAT = 2                  # manifests that hold only their own snapshot's changes
+EXAMS_REL    = EXAMS_FILE.relative_to(DATA_DIR).as_posix()
+VERSIONS_REL = EXAM_VERSIONS_DIR.relative_to(DATA_DIR).as_posix() + "/"
+
+
+def record_version(record) -> str:
+    canonical = json.dumps(record, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def _store_files() -> List[Path]:
+    """Primary store files in snapshot (reference) order."""
+    tables = [p for p in (QUESTIONS_FILE, USERS_FILE) if p.exists()]
+    return sorted(SUBMISSIONS_DIR.glob("*.json")) + sorted(EXAM_VERSIONS_DIR.glob("*/v*.json")) + tables
+
+
+def _stage(staging: Path) -> Dict[str, Tuple[Path, list]]:
+    """Hard-link the store files into `staging`; returns {relative name: (link, identity)}."""
+    staged = {}
+    for path in _store_files():
+        rel  = path.relative_to(DATA_DIR).as_posix()
+        link = staging / rel
+        link.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(path, link)
+        except FileNotFoundError:
+            continue                    # removed since listing
+        except OSError:
+            shutil.copy2(path, link)    # no hard links here: the copy is still one whole version
+        st = link.stat()
+        staged[rel] = (link, [st.st_ino, st.st_size, st.st_mtime_ns])
+    return staged
+
+
+def _records(path: Path, size: int = -1) -> Iterator[Tuple[str, dict]]:
+    """(id, record) pairs of a store file; a .jsonl log is read only up to `size` bytes."""
+    if path.suffix == ".jsonl":
+        return iter(dict(iter_user_log(path, size)).items())    # last line per email wins
+    return jsonstream.iter_file(path)
+
+
+# ── SNAPSHOT CATALOG ──────────────────────────────────────────────────────────
+def list_snapshots(backup_dir: Path = BACKUP_DIR) -> List[str]:
+    """Snapshot ids, oldest first."""
+    if not backup_dir.exists():
+        return []
+    return sorted(p.name for p in backup_dir.iterdir() if (p / MANIFEST).exists())
+
+
+def load_manifest(sid: str, backup_dir: Path = BACKUP_DIR) -> dict:
+    with open(backup_dir / sid / MANIFEST, "rb") as f:
+        return json.loads(f.read())
+
+
+def _chain(sid: str, backup_dir: Path) -> List[dict]:
+    """Manifests from the chain's full snapshot up to `sid`."""
+    chain = []
+    while sid:
+        chain.append(load_manifest(sid, backup_dir))
+        sid = chain[-1]["parent"]
+    return chain[::-1]
+
+
+def _state(chain: List[dict]) -> Dict[str, dict]:
+    """{file: {"ident", "offset", "records": {id: version}}} as of the chain's last snapshot."""
+    state = {}
+    for m in chain:
+        for rel in m.get("removed", ()):
+            state.pop(rel, None)
+        for rel, f in m["files"].items():
+            cur = state.get(rel)
+            if cur is None or f.get("reset"):
+                cur = state[rel] = {"records": {}}
+            cur["ident"], cur["offset"] = f["ident"], f.get("offset", 0)
+            records = cur["records"]
+            for rid, v in f["changes"].items():
+                if v is None:
+                    records.pop(rid, None)
+                else:
+                    records[rid] = v
+    return state
+
+
+def _delta(sid: str, backup_dir: Path, checksum: str) -> Iterator[dict]:
+    path = backup_dir / sid / DELTA
+    with open(path, "rb") as f:
+        raw = f.read()
+    if hashlib.sha256(raw).hexdigest() != checksum:
+        raise ValueError(f"{sid}: {DELTA} does not match its manifest checksum")
+    for line in gzip.decompress(raw).splitlines():
+        yield json.loads(line)
+
+
+# ── SNAPSHOT ──────────────────────────────────────────────────────────────────
+def snapshot(full: bool = False, backup_dir: Path = BACKUP_DIR) -> dict:
+    """Take a snapshot of the live store; returns its manifest."""
+    existing = list_snapshots(backup_dir)
+    parent   = None if full or not existing else existing[-1]
+    chain    = _chain(parent, backup_dir) if parent else []
+    if chain and chain[-1].get("format") != FORMAT:
+        parent, chain = None, []        # the parent stored full manifests: start a new chain
+    prev = _state(chain)
+    sid = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S.%fZ")
+    out = backup_dir / f".{sid}.tmp"
+    staging = DATA_DIR / f".snapshot-{sid}"
+    out.mkdir(parents=True)
+    feed_seq = _feed.head()             # before linking: every change up to here is included
+    files, changes, read = {}, 0, 0
+    try:
+        staged = _stage(staging)
+        with gzip.open(out / DELTA, "wb", compresslevel=6) as delta:
+            def emit(entry):
+                delta.write(json.dumps(entry, separators=(",", ":"), ensure_ascii=False).encode() + b"\n")
+
+            for rel, (link, ident) in staged.items():
+                old = prev.get(rel)
+                if old and old["ident"] == ident:
+                    continue            # same inode, size and mtime: unchanged since the parent
+                read += 1
+                entry = files[rel] = {"ident": ident, "changes": {}}
+                before = old["records"] if old else {}
+                if link.suffix == ".jsonl":
+                    # the log only grows: read on from where the parent stopped if it is the same file
+                    appended = bool(old) and old["ident"][0] == ident[0] and ident[1] >= old["offset"]
+                    users, entry["offset"] = read_user_log(link, old["offset"] if appended else 0, ident[1])
+                    records = {u["email"]: u for u in users}.items()
+                    if old and not appended:
+                        entry["reset"], before = True, {}
+                        emit({"f": rel, "reset": True})
+                else:
+                    records = _records(link)
+                seen = set()
+                for rid, rec in records:
+                    seen.add(rid)
+                    v = record_version(rec)
+                    if before.get(rid) != v:
+                        entry["changes"][rid] = v
+                        emit({"f": rel, "id": rid, "v": v, "r": rec})
+                if link.suffix != ".jsonl":
+                    for rid in before.keys() - seen:
+                        entry["changes"][rid] = None
+                        emit({"f": rel, "id": rid, "v": None})
+                changes += len(entry["changes"])
+            removed = sorted(prev.keys() - staged.keys())     # whole files that went away
+            changes += sum(len(prev[rel]["records"]) for rel in removed)
+    except BaseException:
+        shutil.rmtree(out, ignore_errors=True)
+        raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    with open(out / DELTA, "rb") as f:
+        raw = f.read()
+    manifest = {
+        "format": FORMAT, "id": sid, "parent": parent, "created_at": time.time(), "feed_seq": feed_seq,
+        "delta": {"sha256": hashlib.sha256(raw).hexdigest(), "bytes": len(raw),
+                  "changes": changes, "files_read": read, "files_total": len(staged)},
+        "files": files, "removed": removed,
+    }
+    with open(out / MANIFEST, "wb") as f:
+        f.write(json.dumps(manifest, separators=(",", ":"), ensure_ascii=False).encode())
+    os.replace(out, backup_dir / sid)   # a snapshot is listed only once complete
+    return manifest
+
+
+# ── RESTORE / VERIFY ──────────────────────────────────────────────────────────
+def materialize(sid: str, backup_dir: Path = BACKUP_DIR) -> Tuple[Dict[str, dict], List[str]]:
+    """Replay the chain up to `sid`: ({file: {id: record}}, problems found)."""
+    chain, data, problems = _chain(sid, backup_dir), {}, []
+    for m in chain:
+        for e in _delta(m["id"], backup_dir, m["delta"]["sha256"]):
+            if e.get("reset"):
+                data[e["f"]] = {}
+                continue
+            records = data.setdefault(e["f"], {})
+            if e["v"] is None:
+                records.pop(e["id"], None)
+            else:
+                if record_version(e["r"]) != e["v"]:
+                    problems.append(f"{m['id']}: {e['f']}/{e['id']} does not match its version")
+                records[e["id"]] = e["r"]
+        for rel in m.get("removed", ()):
+            data.pop(rel, None)
+    if chain[-1].get("format") == FORMAT:
+        expected = {rel: f["records"] for rel, f in _state(chain).items()}
+    else:                               # older manifests list every record of every file
+        expected = {rel: f["records"] for rel, f in chain[-1]["files"].items()}
+    for rel in expected.keys() | data.keys():
+        want = expected.get(rel, {})
+        have = {rid: record_version(r) for rid, r in data.get(rel, {}).items()}
+        if have != want:
+            missing, extra = want.keys() - have.keys(), have.keys() - want.keys()
+            stale = sum(have[r] != want[r] for r in want.keys() & have.keys())
+            problems.append(f"{rel}: {len(missing)} missing, {len(extra)} unexpected, "
+                            f"{stale} at the wrong version")
+    return data, problems
+
+
+def verify(sid: Optional[str] = None, backup_dir: Path = BACKUP_DIR) -> List[str]:
+    """Problems with snapshot `sid` (latest by default); empty if it restores cleanly."""
+    sid = sid or (list_snapshots(backup_dir) or [None])[-1]
+    if sid is None:
+        return ["no snapshots"]
+    try:
+        return materialize(sid, backup_dir)[1]
+    except (OSError, ValueError) as e:
+        return [str(e)]
+
+
+def _exams_from_versions(data: Dict[str, dict]) -> dict:
+    """exams.json as it was: each exam's latest version, in creation order."""
+    latest = {}
+    for rel, records in data.items():
+        if rel.startswith(VERSIONS_REL):
+            for exam in records.values():
+                cur = latest.get(exam["id"])
+                if cur is None or exam["version"] > cur["version"]:
+                    latest[exam["id"]] = exam
+    return {e["id"]: e for e in sorted(latest.values(), key=lambda e: e.get("created_at", 0))}
+
+
+def restore(sid: str, target: Path, force: bool = False, backup_dir: Path = BACKUP_DIR) -> int:
+    """Write snapshot `sid` as a data directory at `target`; returns records restored.
+    Derived files are rebuilt (index) or dropped to be rebuilt by init_store
+    (columns, change feed). Restoring over a live data directory needs the app stopped."""
+    target = Path(target)
+    if target.exists() and any(target.iterdir()) and not force:
+        raise FileExistsError(f"{target} is not empty (use force to overwrite)")
+    data, problems = materialize(sid, backup_dir)
+    if problems:
+        raise ValueError(f"snapshot {sid} failed verification: " + "; ".join(problems))
+    if EXAMS_REL not in data:
+        data[EXAMS_REL] = _exams_from_versions(data)
+    subs_dir = target / SUBMISSIONS_DIR.relative_to(DATA_DIR)
+    subs_dir.mkdir(parents=True, exist_ok=True)
+    for old in subs_dir.glob("*.json"):
+        if old.relative_to(target).as_posix() not in data:
+            old.unlink()                # shard created after the snapshot
+    # an older snapshot may hold pre-compact records: let init_store migrate them
+    (target / COMPACT_MARKER.relative_to(DATA_DIR)).unlink(missing_ok=True)
+    summaries = []
+    for rel, records in data.items():
+        path = target / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp  = path.with_name(path.name + ".restore.tmp")
+        with open(tmp, "wb") as f:
+            if path.suffix == ".jsonl":
+                f.write("".join(json.dumps(r, separators=(",", ":"), ensure_ascii=False) + "\n"
+                                for r in records.values()).encode())
+            else:
+                f.write(json.dumps(records, separators=(",", ":"), ensure_ascii=False).encode())
+        os.replace(tmp, path)
+        if path.parent == subs_dir:
+            summaries += [_summary(s) for s in records.values()]
+    summaries.sort(key=lambda s: s["submitted_at"])
+    index = target / SUBMISSION_INDEX.relative_to(DATA_DIR)
+    with open(index, "wb") as f:
+        f.write("".join(json.dumps(s, separators=(",", ":"), ensure_ascii=False) + "\n"
+                        for s in summaries).encode())
+    shutil.rmtree(target / COLUMNS_DIR.relative_to(DATA_DIR), ignore_errors=True)
+    feed = target / FEED_FILE.relative_to(DATA_DIR)
+    for p in (feed, feed.with_name(feed.name + "-wal"), feed.with_name(feed.name + "-shm")):
+        p.unlink(missing_ok=True)
+    return sum(len(r) for r in data.values())
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Incremental snapshots of the data directory.")
+    ap.add_argument("--backup-dir", type=Path, default=BACKUP_DIR)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sp = sub.add_parser("snapshot", help="take a snapshot (incremental unless --full)")
+    sp.add_argument("--full", action="store_true")
+    sub.add_parser("list", help="list snapshots")
+    vp = sub.add_parser("verify", help="replay a snapshot's chain and check every record")
+    vp.add_argument("snapshot", nargs="?")
+    rp = sub.add_parser("restore", help="write a snapshot out as a data directory")
+    rp.add_argument("snapshot")
+    rp.add_argument("--to", type=Path, required=True)
+    rp.add_argument("--force", action="store_true", help="overwrite a non-empty directory")
+    args = ap.parse_args()
+
+    if args.cmd == "snapshot":
+        t = time.perf_counter()
+        m = snapshot(args.full, args.backup_dir)
+        d = m["delta"]
+        print(f"{m['id']} (parent {m['parent'] or 'none'}, feed seq {m['feed_seq']}): "
+              f"{d['changes']} changed records from {d['files_read']} of {d['files_total']} files, "
+              f"{d['bytes'] / 1024:.1f} KiB in {time.perf_counter() - t:.2f} s")
+    elif args.cmd == "list":
+        for sid in list_snapshots(args.backup_dir):
+            m = load_manifest(sid, args.backup_dir)
+            print(f"{sid}  parent {m['parent'] or '-':<28} {m['delta']['changes']:>8} changes "
+                  f"{m['delta']['bytes'] / 1024:>10.1f} KiB")
+    elif args.cmd == "verify":
+        problems = verify(args.snapshot, args.backup_dir)
+        print("\n".join(problems) if problems else "ok")
+        raise SystemExit(1 if problems else 0)
+    else:
+        try:
+            n = restore(args.snapshot, args.to, args.force, args.backup_dir)
+        except (FileExistsError, ValueError) as e:
+            raise SystemExit(str(e))
+        print(f"restored {n} records to {args.to}")
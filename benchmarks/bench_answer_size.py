@@ -0,0 +1,93 @@
+"""
+Grading cost against answer length, 10 words to 1M words.
+
+Three ways of grading the same answer:
+
+  whole text   the pre-chunking pipeline: preprocess / stem / tf / keyword
+               scan over the full answer at once (several full-size copies)
+  streamed     grade_answer with the cap lifted to the answer's length, so
+               every word is graded in CHUNK_WORDS pieces
+  capped       grade_answer with the default word cap (DEFAULT_MAX_TOKENS)
+
+For each, time and peak traced memory (tracemalloc, excluding the answer
+string itself). Streamed time should grow linearly with flat memory. Capped
+time and memory should stop growing at the cap.
+
+    python benchmarks/bench_answer_size.py [--max-words 1000000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import with_profile  # noqa: E402
+from grader import (_keyword_result, cosine_similarity, grade_answer, normalize,  # noqa: E402
+                    preprocess, stem_tokens)
+from keyword_matcher import matcher_for  # noqa: E402
+from tokenizer import DEFAULT_MAX_TOKENS  # noqa: E402
+
+VOCAB = ("cell membrane lipid bilayer controls transport proteins energy light glucose "
+         "photosynthesis chlorophyll oxygen carbon dioxide water mitochondria respiration "
+         "enzyme diffusion osmosis nucleus dna gene protein synthesis ribosome, the a of. "
+         "Running runners co-operate don't").split()
+
+QUESTION = with_profile({"text": "Q", "max_marks": 10, "min_words": 10,
+                         "model_answer": "The cell membrane is a lipid bilayer that controls transport "
+                                         "of proteins and glucose into the cell.",
+                         "keywords": ["lipid bilayer", "transport", "mitochondria"]})
+
+
+def whole_text(answer: str) -> float:
+    """The grading steps as they ran before chunking, over the full answer."""
+    tokens = stem_tokens(preprocess(answer))
+    sim = cosine_similarity(tokens, QUESTION["profile"]["model_stems"])
+    found = matcher_for(QUESTION["profile"]).match(tokens, normalize(answer).split())
+    kw, _, _ = _keyword_result(found, QUESTION["keywords"])
+    return sim + kw + len(answer.split())
+
+
+def grade(answer: str, cap: int) -> dict:
+    return grade_answer(answer, QUESTION["model_answer"], QUESTION["keywords"], 10, 10,
+                        profile=QUESTION["profile"], max_tokens=cap)
+
+
+def measure(fn, answer: str, *args):
+    reps = max(1, 20000 // max(1, len(answer) // 8))
+    t = time.perf_counter()
+    for _ in range(reps):
+        fn(answer, *args)
+    dt = (time.perf_counter() - t) / reps
+    tracemalloc.start()
+    fn(answer, *args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return dt, peak
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--max-words", type=int, default=1_000_000)
+    args = ap.parse_args()
+    rnd = random.Random(0)
+    sizes = [n for n in (10, 100, 1_000, 10_000, 100_000, 1_000_000) if n <= args.max_words]
+    print(f"default cap {DEFAULT_MAX_TOKENS} words\n")
+    print(f"{'words':>9} {'MB':>6} | {'whole ms':>9} {'peak MB':>8} | {'streamed ms':>11} {'µs/word':>8} "
+          f"{'peak MB':>8} | {'capped ms':>9} {'peak MB':>8}")
+    for n in sizes:
+        answer = " ".join(rnd.choice(VOCAB) for _ in range(n))
+        w_t, w_m = measure(whole_text, answer)
+        s_t, s_m = measure(grade, answer, n)
+        c_t, c_m = measure(grade, answer, 0)
+        assert grade(answer, n)["truncated"] is False and grade(answer, 0)["truncated"] is (n > DEFAULT_MAX_TOKENS)
+        print(f"{n:>9} {len(answer) / 2**20:>6.2f} | {w_t * 1e3:>9.2f} {w_m / 2**20:>8.2f} | "
+              f"{s_t * 1e3:>11.2f} {s_t / n * 1e6:>8.2f} {s_m / 2**20:>8.2f} | "
+              f"{c_t * 1e3:>9.2f} {c_m / 2**20:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Signup and login cost with a large user directory.
+
+Seeds --accounts users (50k by default) into the users log, then measures:
+
+  signup       create_user appending to users.jsonl versus the old whole-file
+               rewrite of users.json (load every account, add one, save), the
+               latter --legacy-signups times
+  cold start   loading the email index in a fresh process: the log versus
+               parsing users.json
+  login burst  --logins threads released together, each calling authenticate
+               once (the old path, a full users.json load per login, is run
+               with --legacy-logins threads)
+  resume       the same threads restoring their session from its token on
+               --reruns reruns each, profiled to show the user store is never read
+  signups      --procs processes signing up at once, every one also trying the
+               same few shared emails: each email must end up with one account
+
+Runs against a scratch data directory (EXAMEVAL_DATA_DIR), never ./data.
+
+    python benchmarks/bench_auth.py [--accounts 50000] [--logins 300] [--procs 4]
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+SCRATCH = Path(tempfile.mkdtemp(prefix="exameval_auth_"))
+os.environ["EXAMEVAL_DATA_DIR"] = str(SCRATCH / "data")
+
+import database  # noqa: E402
+from profiler import percentile, profile_page  # noqa: E402
+
+PASSWORD = "secret-pw"
+LEGACY_FILE = SCRATCH / "legacy_users.json"
+
+
+def account(i: int, prefix: str = "user") -> dict:
+    return {"id": f"{i:08d}", "name": f"User {i}", "email": f"{prefix}{i}@auth.test",
+            "password": database.hash_password(PASSWORD), "role": "student", "created_at": time.time()}
+
+
+# ── the user store as it was: one users.json dict, rewritten on every signup ──
+def legacy_create_user(email: str):
+    with database._locked(LEGACY_FILE):
+        users = database._load(LEGACY_FILE)
+        if email in users:
+            return None
+        users[email] = {**account(0), "id": str(uuid.uuid4())[:8], "email": email}
+        database._save(LEGACY_FILE, users)
+    return users[email]
+
+
+def legacy_authenticate(email: str, password: str):
+    user = database._load(LEGACY_FILE).get(email)
+    if user and user["password"] == database.hash_password(password):
+        return user
+    return None
+
+
+def burst(n: int, fn) -> tuple:
+    """Run fn(i) in n threads released together: (wall s, per-call latencies ms, results)."""
+    barrier, lat, out = threading.Barrier(n + 1), [0.0] * n, [None] * n
+
+    def run(i):
+        barrier.wait()
+        t = time.perf_counter()
+        out[i] = fn(i)
+        lat[i] = (time.perf_counter() - t) * 1000
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for th in threads:
+        th.start()
+    barrier.wait()
+    t = time.perf_counter()
+    for th in threads:
+        th.join()
+    return time.perf_counter() - t, lat, out
+
+
+def report(label: str, wall: float, lat: list):
+    print(f"{label:<28} {len(lat):>6} calls {wall:>8.3f} s  {len(lat) / wall:>10,.0f}/s  "
+          f"p50 {percentile(lat, 50):>8.2f} ms  p99 {percentile(lat, 99):>8.2f} ms")
+
+
+def signer(n: int, count: int, shared: int, out):
+    got = [database.create_user(f"P{n}.{i}", f"p{n}.{i}@auth.test", PASSWORD, "student")
+           for i in range(count)]
+    won = [database.create_user(f"Shared {i} by {n}", f"shared{i}@auth.test", PASSWORD, "student")
+           for i in range(shared)]
+    out.put((n, sum(u is not None for u in got), [u is not None for u in won]))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="User directory and session benchmark.")
+    ap.add_argument("--accounts", type=int, default=50_000)
+    ap.add_argument("--signups", type=int, default=200)
+    ap.add_argument("--legacy-signups", type=int, default=10)
+    ap.add_argument("--logins", type=int, default=300)
+    ap.add_argument("--legacy-logins", type=int, default=20)
+    ap.add_argument("--reruns", type=int, default=20)
+    ap.add_argument("--procs", type=int, default=4)
+    args = ap.parse_args()
+    try:
+        database.init_store()
+        seeded = [account(i) for i in range(args.accounts)]
+        with database._locked(database.USERS_FILE):
+            database._append_users(seeded)
+        database._save(LEGACY_FILE, {u["email"]: u for u in seeded})
+        print(f"{args.accounts} accounts: users.jsonl {database.USERS_FILE.stat().st_size / 2**20:.1f} MiB, "
+              f"users.json {LEGACY_FILE.stat().st_size / 2**20:.1f} MiB\n")
+
+        t = time.perf_counter()
+        for i in range(args.signups):
+            database.create_user(f"New {i}", f"new{i}@auth.test", PASSWORD, "student")
+        new = (time.perf_counter() - t) / args.signups
+        t = time.perf_counter()
+        for i in range(args.legacy_signups):
+            legacy_create_user(f"new{i}@auth.test")
+        old = (time.perf_counter() - t) / args.legacy_signups
+        print(f"signup                        log {new * 1e3:>8.2f} ms   rewrite {old * 1e3:>8.2f} ms")
+
+        t = time.perf_counter()
+        index = dict(database.iter_user_log())
+        new = time.perf_counter() - t
+        t = time.perf_counter()
+        json.loads(LEGACY_FILE.read_bytes())
+        old = time.perf_counter() - t
+        print(f"cold start ({len(index)} accounts)   log {new * 1e3:>8.1f} ms   json    {old * 1e3:>8.1f} ms\n")
+
+        emails = [seeded[i * len(seeded) // args.logins]["email"] for i in range(args.logins)]
+        database._replica.sync()
+        wall, lat, users = burst(args.logins, lambda i: database.authenticate(emails[i], PASSWORD))
+        report("login burst (replica)", wall, lat)
+        assert all(u and u["email"] == emails[i] for i, u in enumerate(users))
+        wall, lat, _ = burst(args.legacy_logins, lambda i: legacy_authenticate(emails[i], PASSWORD))
+        report("login burst (users.json)", wall, lat)
+
+        tokens = [database.create_session(u) for u in users]
+        loads = [0] * args.logins
+
+        def resume(i):
+            for _ in range(args.reruns):
+                with profile_page("bench_resume") as rec:
+                    user = database.session_user(tokens[i])
+                loads[i] += rec["loads"]
+            return user
+
+        wall, lat, resumed = burst(args.logins, resume)
+        report(f"resume x{args.reruns} reruns", wall, [x / args.reruns for x in lat for _ in range(args.reruns)])
+        reads = sum(loads)
+        ok = all(r is u for r, u in zip(resumed, users))
+        print(f"{'':<28} {reads} store reads during {args.logins * args.reruns} resumed reruns, "
+              f"{'every' if ok else 'NOT every'} session restored\n")
+
+        shared = 10
+        ctx = mp.get_context("fork")
+        out = ctx.Queue()
+        procs = [ctx.Process(target=signer, args=(n, args.signups, shared, out)) for n in range(args.procs)]
+        t = time.perf_counter()
+        for p in procs:
+            p.start()
+        results = [out.get() for _ in procs]
+        for p in procs:
+            p.join()
+        wall = time.perf_counter() - t
+        created = sum(r[1] for r in results)
+        winners = [sum(r[2][i] for r in results) for i in range(shared)]
+        log = list(database.iter_user_log())
+        unique = len({e for e, _ in log})
+        good = (created == args.procs * args.signups and winners == [1] * shared
+                and len(log) == unique == len(database.get_users()))
+        print(f"{args.procs} processes x {args.signups + shared} signups in {wall:.2f} s: {created} created, "
+              f"each shared email won {set(winners)} time(s), {len(log)} log lines for {unique} accounts "
+              f"-> {'ok' if good else 'MISMATCH'}")
+        return 0 if ok and good and not reads else 1
+    finally:
+        shutil.rmtree(SCRATCH, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Full versus incremental snapshot cost, with writers running during snapshots.
+
+Seeds a store, takes a full snapshot, then repeatedly changes a small share of
+it (new submissions in a few exams, score overrides, new users) and takes an
+incremental snapshot, while a background thread keeps saving submissions.
+Each snapshot's manifest size is reported next to its delta: both should track
+the change, not the size of the store. Every snapshot is verified, and the
+last one is restored into a scratch directory and compared record for record
+with a hard-linked copy of the live files taken in the same reference order
+(and exams.json with the live one).
+
+Runs against scratch directories (EXAMEVAL_DATA_DIR / EXAMEVAL_BACKUP_DIR).
+
+    python benchmarks/bench_backup.py [--exams 50] [--subs 20000] [--rounds 3]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+SCRATCH = Path(tempfile.mkdtemp(prefix="exameval_backup_"))
+os.environ["EXAMEVAL_DATA_DIR"] = str(SCRATCH / "data")
+os.environ["EXAMEVAL_BACKUP_DIR"] = str(SCRATCH / "backups")
+
+import backup  # noqa: E402
+import database  # noqa: E402
+
+WORDS = "cells divide by mitosis and the membrane controls transport of proteins".split()
+QUESTION = {"text": "Q", "model_answer": "cells divide by mitosis", "keywords": ["mitosis"],
+            "max_marks": 10, "min_words": 0}
+
+
+def submit(exam, student, rnd):
+    res = []
+    for _ in exam["questions"]:
+        s = round(rnd.uniform(0, 10), 1)
+        res.append({"s": s, "sim": s / 10, "kw": 1.0, "coh": 1.0, "m": [0], "fb": 0,
+                    "a": " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(20, 60)))})
+    return database.save_submission(exam["id"], student["id"], student["name"], res,
+                                    sum(r["s"] for r in res), 10.0 * len(res),
+                                    exam["title"], exam["subject"])
+
+
+def seed(args, rnd):
+    database.init_store()
+    teacher = database.create_user("Teacher", "teacher@backup.test", "pw", "teacher")
+    exams = [database.create_exam(teacher["id"], f"Exam {i}", "Bio", [QUESTION] * 3, 30)
+             for i in range(args.exams)]
+    students = [{"id": f"st{i:06d}", "name": f"Student {i}"} for i in range(args.subs // 4)]
+    # bulk-write the shards directly: one save per exam instead of one per submission
+    by_exam = {e["id"]: {} for e in exams}
+    for _ in range(args.subs):
+        exam, st = rnd.choice(exams), rnd.choice(students)
+        sub = {"id": f"{len(by_exam[exam['id']]):05d}{exam['id']}", "exam_id": exam["id"],
+               "exam_title": exam["title"], "exam_subject": exam["subject"],
+               "student_id": st["id"], "student_name": st["name"],
+               "results": [{"s": 5.0, "sim": 0.5, "kw": 1.0, "coh": 1.0, "m": [0], "fb": 0,
+                            "a": " ".join(rnd.choice(WORDS) for _ in range(40))}] * 3,
+               "total_score": 15.0, "total_marks": 30.0, "percentage": 50.0,
+               "submitted_at": time.time()}
+        by_exam[exam["id"]][sub["id"]] = sub
+    for eid, subs in by_exam.items():
+        database._save(database._shard_path(eid), subs)
+        database._index_append(list(subs.values()))
+    return teacher, exams, students
+
+
+def data_bytes() -> int:
+    return sum(p.stat().st_size for p in backup._store_files())
+
+
+def live_copy() -> dict:
+    """The live store as {file: {id: record}}, read through hard links like a snapshot."""
+    staging = SCRATCH / "compare"
+    try:
+        return {rel: dict(backup._records(link, ident[1]))
+                for rel, (link, ident) in backup._stage(staging).items()}
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Incremental backup benchmark.")
+    ap.add_argument("--exams", type=int, default=50)
+    ap.add_argument("--subs", type=int, default=20000)
+    ap.add_argument("--rounds", type=int, default=3)
+    ap.add_argument("--change", type=int, default=100, help="submissions added per round")
+    args = ap.parse_args()
+    rnd = random.Random(0)
+    try:
+        teacher, exams, students = seed(args, rnd)
+        print(f"store: {args.subs} submissions in {args.exams} exams, {data_bytes() / 2**20:.1f} MiB\n")
+
+        stop = threading.Event()
+        background = {"n": 0}
+
+        def writer():                   # keeps saving while snapshots are taken
+            wrnd = random.Random(1)
+            while not stop.is_set():
+                submit(wrnd.choice(exams[:3]), wrnd.choice(students), wrnd)
+                background["n"] += 1
+
+        def snap(label, full=False):
+            t = time.perf_counter()
+            m = backup.snapshot(full)
+            dt = time.perf_counter() - t
+            d = m["delta"]
+            manifest = (backup.BACKUP_DIR / m["id"] / backup.MANIFEST).stat().st_size
+            problems = backup.verify(m["id"])
+            print(f"{label:<14} {dt:>7.2f} s  {d['changes']:>7} records  {d['files_read']:>4}/"
+                  f"{d['files_total']} files read  delta {d['bytes'] / 1024:>9.1f} KiB  "
+                  f"manifest {manifest / 1024:>8.1f} KiB  verify: {'ok' if not problems else problems}")
+            return m, problems
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        bad = []
+        try:
+            bad += snap("full")[1]
+            for r in range(args.rounds):
+                hot = rnd.sample(exams, 3)
+                for _ in range(args.change):
+                    submit(rnd.choice(hot), rnd.choice(students), rnd)
+                for sub in database.get_exam_submissions(hot[0]["id"])[:10]:
+                    database.update_submission_score(sub["id"], 0, 9.5)
+                for i in range(5):
+                    database.create_user(f"New {r}.{i}", f"new{r}.{i}@backup.test", "pw", "student")
+                database.update_exam(hot[1]["id"], {"title": f"{hot[1]['title']} (rev {r + 1})"})
+                bad += snap(f"incremental {r + 1}")[1]
+        finally:
+            stop.set()
+            thread.join()
+        m, problems = snap("after writers")
+        bad += problems
+        print(f"\n{background['n']} submissions saved by the background writer during the run")
+
+        t = time.perf_counter()
+        target = SCRATCH / "restored"
+        n = backup.restore(m["id"], target)
+        live = live_copy()
+        restored = {rel: dict(backup._records(target / rel)) for rel in live}
+        same = (restored == live
+                and database._load(target / backup.EXAMS_REL) == database._load(database.EXAMS_FILE))
+        print(f"restore: {n} records in {time.perf_counter() - t:.2f} s, "
+              f"{'identical to' if same else 'DIFFERS from'} the live store")
+        return 0 if same and not bad else 1
+    finally:
+        shutil.rmtree(SCRATCH, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+Change feed across processes sharing one data directory.
+
+Several writer processes create users, exams and submissions and override
+scores while a reader process keeps serving lookups from its replica. Then:
+
+  - consistency: every process's replica (users, exams, submission summaries)
+    must equal what the files say once the writers are done
+  - propagation lag: time from a user being written in one process until the
+    reader process sees it
+  - compaction: a replica that fell behind a compacted log reloads and converges
+  - lookup cost through the replica versus re-reading the files (the old path)
+
+Runs against a scratch data directory (EXAMEVAL_DATA_DIR), never ./data.
+
+    python benchmarks/bench_changefeed.py [--writers 4] [--ops 200] [--users 2000] [--subs 5000]
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+DATA_DIR = tempfile.mkdtemp(prefix="exameval_feed_")
+os.environ["EXAMEVAL_DATA_DIR"] = DATA_DIR
+
+import changefeed  # noqa: E402
+import database  # noqa: E402
+from profiler import percentile  # noqa: E402
+
+QUESTION = {"text": "Q", "model_answer": "cells divide by mitosis", "keywords": ["mitosis"],
+            "max_marks": 10, "min_words": 0}
+
+
+def result(rnd):
+    s = round(rnd.uniform(0, 10), 1)
+    return {"s": s, "sim": s / 10, "kw": 1.0, "coh": 1.0, "m": [0], "fb": 0, "a": "mitosis"}
+
+
+def submit(exam, student, rnd):
+    res = [result(rnd) for _ in exam["questions"]]
+    return database.save_submission(exam["id"], student["id"], student["name"], res,
+                                    sum(r["s"] for r in res), 10.0 * len(res),
+                                    exam["title"], exam["subject"])
+
+
+def diverged(replica: changefeed.Replica) -> list:
+    """Tables whose replica contents differ from the files."""
+    truth = {kind: load() for kind, load in replica.loaders.items()}
+    return [kind for kind in truth if replica.table(kind) != truth[kind]]
+
+
+def writer(n, ops, barrier, out):
+    rnd = random.Random(n)
+    teacher = database.create_user(f"Teacher W{n}", f"tw{n}@feed.test", "pw", "teacher")
+    exams = [e for e in database.get_exams().values()]
+    mine = []
+    for i in range(ops):
+        student = database.create_user(f"S{n}.{i}", f"s{n}.{i}@feed.test", "pw", "student")
+        if i % 50 == 0:
+            exams.append(database.create_exam(teacher["id"], f"W{n} exam {i}", "Bio", [QUESTION] * 2, 30))
+        mine.append(submit(rnd.choice(exams), student, rnd)["id"])
+        if i % 5 == 0:
+            database.update_submission_score(rnd.choice(mine), 0, round(rnd.uniform(0, 10), 1))
+    barrier.wait()                  # everyone has finished writing
+    out.put(("writer", n, diverged(database._replica), None))
+
+
+def reader(stop, out):
+    seen, lags = set(database.get_users()), []
+    while not stop.is_set():
+        users = database.get_users()
+        now = time.time()
+        for email in users.keys() - seen:
+            lags.append((now - users[email]["created_at"]) * 1000)
+        seen.update(users)
+        time.sleep(0.001)
+    out.put(("reader", 0, diverged(database._replica), lags))
+
+
+def seed(args):
+    database.init_store()
+    rnd = random.Random(0)
+    teacher = database.create_user("Teacher", "teacher@feed.test", "pw", "teacher")
+    exams = [database.create_exam(teacher["id"], f"Exam {i}", "Bio", [QUESTION] * 2, 30)
+             for i in range(20)]
+    students = [{"id": f"u{i:07d}", "name": f"U{i}", "email": f"u{i}@feed.test",
+                 "password": "", "role": "student", "created_at": 0.0} for i in range(args.users)]
+    with database._locked(database.USERS_FILE):
+        database._append_users(students)
+    for _ in range(args.subs):
+        submit(rnd.choice(exams), rnd.choice(students), rnd)
+    return exams, students
+
+
+def lookup_costs(exams, students, reps=200):
+    rnd = random.Random(1)
+    database._replica.sync()        # catch up once (the compaction above forces a reload)
+    cases = {
+        "authenticate (user by email)": (
+            lambda: database._replica.get("users", rnd.choice(students)["email"]),
+            lambda: dict(database.iter_user_log()).get(rnd.choice(students)["email"])),
+        "get_exam": (
+            lambda: database.get_exam(rnd.choice(exams)["id"]),
+            lambda: database._hydrate(database._load(database.EXAMS_FILE)[rnd.choice(exams)["id"]])),
+        "get_student_submissions": (
+            lambda: database.get_student_submissions(rnd.choice(students)["id"]),
+            lambda: database._index_scan(rnd.choice(students)["id"])),
+    }
+    print(f"\n{'lookup':<30} {'replica µs':>11} {'file µs':>11}")
+    for name, (fast, slow) in cases.items():
+        cost = []
+        for fn in (fast, slow):
+            t = time.perf_counter()
+            for _ in range(reps):
+                fn()
+            cost.append((time.perf_counter() - t) / reps * 1e6)
+        print(f"{name:<30} {cost[0]:>11.1f} {cost[1]:>11.1f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Multi-process change feed check and benchmark.")
+    ap.add_argument("--writers", type=int, default=4)
+    ap.add_argument("--ops", type=int, default=200, help="users + submissions written per writer")
+    ap.add_argument("--users", type=int, default=2000)
+    ap.add_argument("--subs", type=int, default=5000)
+    args = ap.parse_args()
+    try:
+        t = time.perf_counter()
+        exams, students = seed(args)
+        database.get_users()                # parent replica loaded before the writers start
+        print(f"seeded {args.users} users, {len(exams)} exams, {args.subs} submissions "
+              f"in {time.perf_counter() - t:.1f} s")
+
+        ctx = mp.get_context("fork")
+        barrier, stop, out = ctx.Barrier(args.writers), ctx.Event(), ctx.Queue()
+        procs = [ctx.Process(target=writer, args=(n, args.ops, barrier, out)) for n in range(args.writers)]
+        procs.append(ctx.Process(target=reader, args=(stop, out)))
+        t = time.perf_counter()
+        for p in procs:
+            p.start()
+        results = [out.get() for _ in range(args.writers)]
+        stop.set()
+        results.append(out.get())
+        for p in procs:
+            p.join()
+        wall = time.perf_counter() - t
+
+        head = database._feed.head()
+        print(f"{args.writers} writers x {args.ops} ops + 1 reader: {wall:.1f} s, feed head {head}")
+        bad = [(role, n, kinds) for role, n, kinds, _ in results if kinds]
+        bad += [("parent", 0, k) for k in [diverged(database._replica)] if k]
+        lags = next(lag for role, _, _, lag in results if role == "reader")
+        print(f"propagation lag over {len(lags)} users: p50 {percentile(lags, 50):.1f} ms, "
+              f"p95 {percentile(lags, 95):.1f} ms, max {max(lags, default=0):.1f} ms")
+
+        behind = changefeed.Replica(database._feed, database._replica.loaders, database._replica.group_by)
+        behind.sync()
+        rnd = random.Random(2)
+        for i in range(50):
+            submit(rnd.choice(exams), rnd.choice(students), rnd)
+        database._feed.compact(10)
+        behind.sync()
+        compacted = diverged(behind)
+        print(f"compaction: replica reloads {behind.reloads} (expected 2), "
+              f"{'converged' if not compacted else 'DIVERGED: ' + ', '.join(compacted)}")
+
+        lookup_costs(exams, students)
+        print(f"\nreplicas consistent with files: {'yes' if not bad else 'NO ' + str(bad)}")
+        return 1 if bad or compacted or behind.reloads != 2 else 0
+    finally:
+        shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Grading throughput with and without the persistent result cache.
+
+Grades the same synthetic cohort three times: plain grade_answer, a cold
+cache (grade + store) and a warm cache (lookup only), as a re-grade or a
+repeated benchmark run would.
+
+    python benchmarks/bench_grading.py [--answers 5000] [--questions 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import with_profile  # noqa: E402
+from grade_cache import GradeCache, cached_grade  # noqa: E402
+from grader import grade_answer  # noqa: E402
+
+VOCAB = ("cell membrane lipid bilayer controls transport proteins energy light glucose "
+         "photosynthesis chlorophyll oxygen carbon dioxide water mitochondria respiration "
+         "enzyme diffusion osmosis nucleus dna gene protein synthesis ribosome").split()
+
+
+def sentence(rnd, lo, hi):
+    return " ".join(rnd.choice(VOCAB) for _ in range(rnd.randint(lo, hi)))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--answers", type=int, default=5000)
+    ap.add_argument("--questions", type=int, default=5)
+    args = ap.parse_args()
+    rnd = random.Random(0)
+    questions = [with_profile({"text": f"Q{i}", "model_answer": sentence(rnd, 15, 40),
+                               "keywords": [sentence(rnd, 1, 2) for _ in range(5)],
+                               "min_words": 10, "max_marks": 10})
+                 for i in range(args.questions)]
+    work = [(q, sentence(rnd, 5, 80)) for q in questions for _ in range(args.answers // args.questions)]
+
+    def plain():
+        for q, a in work:
+            grade_answer(a, q["model_answer"], q["keywords"], q["max_marks"], q["min_words"],
+                         profile=q["profile"])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = GradeCache(Path(tmp) / "grades.sqlite")
+
+        def cached():
+            for q, a in work:
+                cached_grade(a, q, cache=cache)
+
+        for label, fn in (("grade_answer", plain), ("cache cold", cached), ("cache warm", cached)):
+            t = time.perf_counter()
+            fn()
+            dt = time.perf_counter() - t
+            print(f"{label:<13} {len(work)} answers  {dt:6.2f} s  {dt / len(work) * 1e6:7.0f} µs/answer")
+        s = cache.stats()
+        print(f"cache: {s['entries']} entries, {s['bytes'] / 1024:.0f} KiB, "
+              f"{s['hits']} hits / {s['misses']} misses")
+
+
+if __name__ == "__main__":
+    main()
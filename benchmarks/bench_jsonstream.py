@@ -0,0 +1,79 @@
+"""
+Peak memory of reading submissions.json: json.loads of the whole file versus
+the incremental reader (jsonstream.py) used by get_exam_submissions, across
+growing file sizes. Peaks are measured with tracemalloc.
+
+    python benchmarks/bench_jsonstream.py [--sizes 10 50 200]   (MB)
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jsonstream import iter_file  # noqa: E402
+
+WORDS = "cell membrane lipid bilayer transport proteins energy light glucose oxygen".split()
+
+
+def write_store(path: Path, megabytes: int, exams: int = 50):
+    """A submissions.json of about `megabytes` MB in the app's compact layout, written incrementally."""
+    rnd, target, n = random.Random(0), megabytes * 1024 * 1024, 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{")
+        while f.tell() < target:
+            sid = f"{n:08x}"
+            rec = {"id": sid, "exam_id": f"EX{n % exams:04d}", "exam_title": "Biology", "exam_subject": "Bio",
+                   "student_id": f"st{n}", "student_name": f"Student {n}",
+                   "results": [{"s": 6.5, "sim": 0.61, "kw": 0.5, "coh": 1.0, "m": [0, 2], "fb": 18,
+                                "a": " ".join(rnd.choice(WORDS) for _ in range(40))} for _ in range(5)],
+                   "total_score": 32.5, "total_marks": 50, "percentage": 65.0, "submitted_at": 1.7e9 + n}
+            f.write(("," if n else "") + json.dumps(sid) + ":" + json.dumps(rec, separators=(",", ":")))
+            n += 1
+        f.write("}")
+    return n
+
+
+def measure(fn):
+    tracemalloc.start()
+    t = time.perf_counter()
+    result = fn()
+    dt = time.perf_counter() - t
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, dt, peak / 1024 / 1024
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200])
+    args = ap.parse_args()
+    print(f"{'file':>8} {'records':>9} | {'json.loads peak':>15} {'time':>6} | {'streaming peak':>14} {'time':>6}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "submissions.json"
+        for mb in args.sizes:
+            n = write_store(path, mb)
+
+            def full():
+                with open(path, "rb") as f:
+                    data = json.loads(f.read())
+                return sum(1 for s in data.values() if s["exam_id"] == "EX0001")
+
+            def streamed():
+                return sum(1 for _, s in iter_file(path) if s["exam_id"] == "EX0001")
+
+            a, t_full, m_full = measure(full)
+            b, t_stream, m_stream = measure(streamed)
+            assert a == b
+            print(f"{mb:>6}MB {n:>9} | {m_full:>12.1f} MB {t_full:>5.1f}s | {m_stream:>11.2f} MB {t_stream:>5.1f}s")
+
+
+if __name__ == "__main__":
+    main()
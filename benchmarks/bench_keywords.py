@@ -0,0 +1,65 @@
+"""
+Keyword matching benchmark: the per-keyword loop (stem + set intersection for
+every keyword on every answer) versus the compiled Aho-Corasick matcher.
+
+    python benchmarks/bench_keywords.py [--answers 2000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from grader import compile_question, normalize, preprocess, stem_tokens  # noqa: E402
+from keyword_matcher import matcher_for  # noqa: E402
+
+VOCAB = ("cell membrane lipid bilayer protein channel diffusion osmosis active transport "
+         "energy glucose enzyme substrate nucleus chromosome mitosis meiosis gene allele "
+         "photosynthesis chlorophyll respiration oxygen carbon dioxide water light").split()
+
+
+def loop_match(student: str, keywords):
+    """The original keyword_score inner loop."""
+    student_stems = set(stem_tokens(preprocess(student)))
+    student_raw   = set(normalize(student).split())
+    matched = []
+    for kw in keywords:
+        kw_stems = set(stem_tokens(preprocess(kw)))
+        kw_raw   = set(normalize(kw).split())
+        if (kw_stems and (kw_stems & student_stems)) or (kw_raw and (kw_raw & student_raw)):
+            matched.append(kw)
+    return matched
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--answers", type=int, default=2000)
+    args = ap.parse_args()
+    rnd = random.Random(0)
+    answers = [" ".join(rnd.choice(VOCAB) for _ in range(rnd.randint(20, 120)))
+               for _ in range(args.answers)]
+    print(f"{'keywords':>9} {'loop ms/ans':>12} {'any ms/ans':>11} {'phrase ms/ans':>14}")
+    for k in (5, 50, 200, 500):
+        keywords = [" ".join(rnd.choice(VOCAB) for _ in range(rnd.randint(1, 3))) + f" term{i}"
+                    for i in range(k)]
+        profile = compile_question("", keywords)
+        t = time.perf_counter()
+        for a in answers:
+            loop_match(a, keywords)
+        t_loop = time.perf_counter() - t
+        timings = []
+        for mode in ("any", "phrase"):
+            m = matcher_for(profile, mode)
+            t = time.perf_counter()
+            for a in answers:
+                m.match(stem_tokens(preprocess(a)), normalize(a).split())
+            timings.append(time.perf_counter() - t)
+        n = len(answers)
+        print(f"{k:>9} {t_loop / n * 1000:>12.3f} {timings[0] / n * 1000:>11.3f} {timings[1] / n * 1000:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Latent semantic scoring benchmark: one batch of N synthetic answers to a
+question, timed end to end (tokenize, TF-IDF matrix, truncated SVD, scoring).
+
+    python benchmarks/bench_latent.py [--answers 10000] [--k 100]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from latent import latent_scores  # noqa: E402
+
+MODEL = ("Photosynthesis converts light energy into chemical energy: chlorophyll in the "
+         "chloroplasts absorbs light, water is split releasing oxygen, and carbon dioxide "
+         "is fixed into glucose in the Calvin cycle.")
+VOCAB = ("plants use sunlight light energy chlorophyll chloroplast leaves water oxygen release "
+         "carbon dioxide glucose sugar food make produce convert chemical calvin cycle split "
+         "absorb green pigment stomata roots soil minerals respiration animals eat grow "
+         "photosynthesis process reaction enzyme starch store cell membrane wall").split()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--answers", type=int, default=10000)
+    ap.add_argument("--k", type=int, default=100)
+    args = ap.parse_args()
+    rnd = random.Random(0)
+    answers = [" ".join(rnd.choice(VOCAB) for _ in range(rnd.randint(10, 80)))
+               for _ in range(args.answers)]
+    t = time.perf_counter()
+    scores = latent_scores(MODEL, answers, args.k)
+    dt = time.perf_counter() - t
+    print(f"{args.answers} answers, k={args.k}: {dt:.2f} s "
+          f"({args.answers / dt:,.0f} answers/s), mean similarity {scores.mean():.3f}")
+
+
+if __name__ == "__main__":
+    main()
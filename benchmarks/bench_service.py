@@ -0,0 +1,140 @@
+"""
+Grading service on localhost: many concurrent single-answer /grade requests
+over keep-alive connections, with and without micro-batching. Reports client
+throughput and latency plus the service's own /stats. Before that, malformed
+requests (bad Content-Length, a negative question index) must each get a 400.
+Stored questions come from a scratch data directory (EXAMEVAL_DATA_DIR).
+
+    python benchmarks/bench_service.py [--clients 64] [--requests 2000] [--questions 4]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCRATCH = tempfile.mkdtemp(prefix="exameval_service_")
+os.environ["EXAMEVAL_DATA_DIR"] = SCRATCH
+
+import database  # noqa: E402
+from grading_service import GradingService  # noqa: E402
+from profiler import percentile  # noqa: E402
+
+VOCAB = ("cell membrane lipid bilayer controls transport proteins energy light glucose "
+         "photosynthesis chlorophyll oxygen carbon dioxide water mitochondria respiration").split()
+
+
+async def request(reader, writer, method, path, body=None):
+    raw = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(raw)}\r\n\r\n".encode() + raw)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        h = await reader.readline()
+        if h == b"\r\n":
+            break
+        if h.lower().startswith(b"content-length:"):
+            length = int(h.split(b":")[1])
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def raw_status(port, head: bytes) -> int:
+    """Status line of the reply to a hand-written request head."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(head)
+    await writer.drain()
+    line = await reader.readline()
+    writer.close()
+    return int(line.split()[1]) if line else 0
+
+
+async def malformed(port) -> list:
+    """Requests the service must refuse with a 400; returns those it did not."""
+    database.init_store()
+    exam = database.create_exam("bench", "Bench", "Bio", [{"text": "Q", "model_answer": "cells divide",
+                                                           "keywords": [], "max_marks": 5, "min_words": 0}], 30)
+    bad = []
+    for length in (b"abc", b"-5"):
+        status = await raw_status(port, b"POST /grade HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n")
+        if status != 400:
+            bad.append(f"Content-Length {length.decode()}: {status}")
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for index in (-1, 1, "x"):
+        status, _ = await request(reader, writer, "POST", "/grade", {
+            "question": {"exam_id": exam["id"], "index": index}, "answer": "cells"})
+        if status != 400:
+            bad.append(f"index {index!r}: {status}")
+    writer.close()
+    return bad
+
+
+async def run(port, args, rnd):
+    questions = [{"model_answer": " ".join(rnd.choice(VOCAB) for _ in range(30)),
+                  "keywords": rnd.sample(VOCAB, 4), "max_marks": 10, "min_words": 10}
+                 for _ in range(args.questions)]
+    per_client = args.requests // args.clients
+    latencies = []
+
+    async def client():
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for _ in range(per_client):
+            body = {"question": rnd.choice(questions),
+                    "answer": " ".join(rnd.choice(VOCAB) for _ in range(rnd.randint(5, 60)))}
+            t = time.perf_counter()
+            status, _ = await request(reader, writer, "POST", "/grade", body)
+            latencies.append((time.perf_counter() - t) * 1000)
+            assert status == 200
+        writer.close()
+
+    t = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(args.clients)])
+    dt = time.perf_counter() - t
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    _, stats = await request(reader, writer, "GET", "/stats")
+    writer.close()
+    return len(latencies) / dt, latencies, stats
+
+
+async def main_async(args):
+    for window in (0.0, args.window_ms):
+        service = GradingService(args.workers, window_ms=window)
+        server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            if not window:
+                bad = await malformed(port)
+                print(f"malformed requests: {'all refused with 400' if not bad else bad}")
+            await run(port, argparse.Namespace(**{**vars(args), "requests": args.clients}), random.Random(1))  # warm the pool
+            service.batcher.batch_sizes.clear()
+            rps, lat, stats = await run(port, args, random.Random(0))
+            await asyncio.sleep(0.1)    # let handlers see the clients hang up
+        service.close()
+        print(f"window {window:>4} ms: {rps:7.0f} req/s  latency p50 {percentile(lat, 50):6.1f} ms  "
+              f"p95 {percentile(lat, 95):6.1f} ms  p99 {percentile(lat, 99):6.1f} ms  "
+              f"mean batch {stats['mean_batch_size']:.1f}  batches {stats['batches']}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, default=64)
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--questions", type=int, default=4)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--window-ms", type=float, default=3.0)
+    args = ap.parse_args()
+    try:
+        asyncio.run(main_async(args))
+    finally:
+        shutil.rmtree(SCRATCH, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Startup / rerun benchmark for app.py.
+Runs the app headlessly with Streamlit's AppTest in a scratch data directory and
+reports cold-start time (fresh interpreter, first render) and the mean per-rerun
+overhead for a student and a teacher route.
+
+    python benchmarks/bench_startup.py [--app path/to/app.py] [--reruns 50]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = r"""
+import json, os, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t_import = time.perf_counter()
+at = AppTest.from_file(APP, default_timeout=60)
+at.session_state["user"] = {"id": "s1", "name": "Bench", "role": "student", "email": "b@x"}
+at.session_state["page"] = "student_dashboard"
+at.run()
+t_first = time.perf_counter()
+times = []
+for _ in range(RERUNS):
+    s = time.perf_counter(); at.run(); times.append(time.perf_counter() - s)
+student_rerun = sum(times) / len(times)
+at.session_state["user"] = {"id": "t1", "name": "Bench", "role": "teacher", "email": "t@x"}
+at.session_state["page"] = "teacher_dashboard"
+at.run()
+times = []
+for _ in range(RERUNS):
+    s = time.perf_counter(); at.run(); times.append(time.perf_counter() - s)
+print(json.dumps({
+    "cold_first_render_ms": (t_first - t_import) * 1000,
+    "student_rerun_ms": student_rerun * 1000,
+    "teacher_rerun_ms": sum(times) / len(times) * 1000,
+    "errors": [str(e.value) for e in at.exception],
+}))
+"""
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--app", default=os.path.join(ROOT, "app.py"))
+    ap.add_argument("--reruns", type=int, default=50)
+    ap.add_argument("--rounds", type=int, default=3)
+    args = ap.parse_args()
+
+    app = os.path.abspath(args.app)
+    code = f"APP = {app!r}\nRERUNS = {args.reruns}\nsys_path = {os.path.dirname(app)!r}\n" \
+           "import sys; sys.path.insert(0, sys_path)\n" + _CHILD
+    results = []
+    for _ in range(args.rounds):
+        with tempfile.TemporaryDirectory() as work:
+            out = subprocess.run([sys.executable, "-c", code], cwd=work,
+                                 capture_output=True, text=True, check=True)
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    for key in ("cold_first_render_ms", "student_rerun_ms", "teacher_rerun_ms"):
+        vals = sorted(r[key] for r in results)
+        print(f"{key:22s} median {vals[len(vals) // 2]:8.2f}   min {vals[0]:8.2f}")
+    errors = {e for r in results for e in r["errors"]}
+    if errors:
+        print("errors:", *errors, sep="\n  ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Tokenizer throughput and golden output check, language packs versus the
+per-call tokenizer they replaced.
+
+The previous grader.preprocess / simple_stem / normalize are reproduced below
+as legacy_*. First every English pack function is compared with its legacy
+counterpart on generated answers and on random character soup (all of ASCII,
+control characters included, plus accented letters and non-Latin scripts).
+Any difference fails the run. Then tokens/sec are measured on answer-sized
+texts, plain ASCII and with some accented or non-Latin words mixed in (those
+take the regex path instead of the translation table), for:
+
+  preprocess      tokens only (stop words removed)
+  + stem          tokens then stems, as every metric uses them
+  raw words       normalize(text).split(), the raw keyword tokens
+
+    python benchmarks/bench_tokenizer.py [--answers 2000] [--words 200]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tokenizer import ENGLISH, SPANISH  # noqa: E402
+
+LEGACY_STOP_WORDS = {
+    "a","an","the","is","it","in","on","at","to","for","of","and","or","but",
+    "not","with","this","that","are","was","be","been","being","have","has",
+    "had","do","does","did","will","would","can","could","should","may","might",
+    "shall","from","by","as","so","if","then","than","there","their","they",
+    "we","our","us","you","your","he","she","his","her","its","my","me","i",
+    "am","were","also","into","which","who","what","when","where","how","all",
+    "each","both","more","most","other","some","such","no","only","same","up",
+    "out","about","above","after","before","between","through","during","while",
+    "although","because","since","any","these","those",
+}
+
+
+def legacy_preprocess(text):
+    text = text.lower().strip()
+    text = re.sub(r"[^\w\s]", " ", text)
+    tokens = text.split()
+    return [t for t in tokens if t not in LEGACY_STOP_WORDS and len(t) > 1]
+
+
+def legacy_stem(word):
+    for suffix in ["ation","ations","ing","ings","tion","tions","ness",
+                   "ment","ments","ers","ies","es","ed","ly","s"]:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def legacy_normalize(text):
+    return re.sub(r"\s+", " ", text.lower().strip().translate(
+        str.maketrans("", "", ".,!?;:'\"")
+    ))
+
+
+VOCAB = ("The cell membrane is a lipid bilayer that controls transport of proteins, ions and "
+         "glucose. Photosynthesis converts light energy; mitochondria run respiration! "
+         "Enzymes (catalysts) lower activation-energy: don't they? \"Running\" runners co-operate "
+         "organisations' managements 42 x2 snake_case ...").split()
+NON_ASCII = "ÉCOLE naïve Straße İstanbul ﬁnal Ωmega 日本語 Ⅻ ½".split()
+SPANISH_VOCAB = ("La fotosíntesis convierte la energía luminosa en energía química. ¿Qué "
+                 "organelos participan? ¡Los cloroplastos! Las células vegetales producen "
+                 "glucosa rápidamente y liberan oxígeno durante el día.").split()
+SOUP = "".join(chr(i) for i in range(128)) + "áéíóúüñÉÑçßİıﬁΩωж日本  ​ –—“”‘’…"
+
+
+def answers(rnd, n, words, vocab):
+    return [" ".join(rnd.choice(vocab) for _ in range(rnd.randint(words // 2, words * 3 // 2)))
+            for _ in range(n)]
+
+
+def golden(rnd, texts) -> int:
+    """Differences between the English pack and the legacy functions."""
+    texts = texts + ["".join(rnd.choice(SOUP) for _ in range(rnd.randint(0, 80))) for _ in range(5000)]
+    bad = 0
+    for t in texts:
+        tokens = legacy_preprocess(t)
+        checks = ((ENGLISH.tokens(t), tokens),
+                  (ENGLISH.stems(t), [legacy_stem(w) for w in tokens]),
+                  (ENGLISH.normalize(t), legacy_normalize(t)),
+                  (ENGLISH.words(t), legacy_normalize(t).split()))
+        for got, want in checks:
+            if got != want:
+                bad += 1
+                if bad <= 5:
+                    print(f"DIFF {t[:60]!r}: {got!r} != {want!r}")
+    return bad
+
+
+def rate(fn, texts, n_tokens) -> float:
+    best = float("inf")
+    for _ in range(3):
+        t = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - t)
+    return n_tokens / best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--answers", type=int, default=2000)
+    ap.add_argument("--words", type=int, default=200, help="average words per answer")
+    args = ap.parse_args()
+    rnd = random.Random(0)
+    ascii_texts = answers(rnd, args.answers, args.words, VOCAB)
+    mixed_texts = answers(rnd, args.answers, args.words, VOCAB + NON_ASCII)
+
+    bad = golden(rnd, ascii_texts + mixed_texts)
+    print(f"golden: {2 * args.answers + 5000} texts, {bad} differences from the legacy tokenizer")
+
+    rows = [
+        ("preprocess", lambda t: legacy_preprocess(t), ENGLISH.tokens),
+        ("+ stem", lambda t: [legacy_stem(w) for w in legacy_preprocess(t)], ENGLISH.stems),
+        ("raw words", lambda t: legacy_normalize(t).split(), ENGLISH.words),
+    ]
+    for corpus, texts in (("ASCII", ascii_texts), ("mixed", mixed_texts)):
+        n = sum(len(t.split()) for t in texts)
+        print(f"\n{corpus}: {n} words in {len(texts)} answers")
+        print(f"{'':<12} {'legacy tok/s':>13} {'pack tok/s':>13} {'speedup':>8}")
+        for label, old, new in rows:
+            a, b = rate(old, texts, n), rate(new, texts, n)
+            print(f"{label:<12} {a:>13,.0f} {b:>13,.0f} {b / a:>7.1f}x")
+
+    es = answers(rnd, args.answers, args.words, SPANISH_VOCAB)
+    n_es = sum(len(t.split()) for t in es)
+    print(f"\nSpanish pack (+ stem, accents folded): {rate(SPANISH.stems, es, n_es):,.0f} tok/s")
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
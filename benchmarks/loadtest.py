@@ -0,0 +1,245 @@
+"""
+Deadline-rush load test: drives app.py headlessly with Streamlit's AppTest.
+
+N simulated students each log in through the student portal, join the exam by
+code, type their answers over several reruns and then submit together (a
+barrier releases every submit at once). Meanwhile M teachers log in and keep
+re-rendering the exam's results page.
+
+Every session is a thread, but AppTest installs a process-global Streamlit
+runtime for each run, so runs inside one process are serialized. Concurrency
+against the store comes from --processes: the crowd is split across P
+processes sharing one data directory, the way several server processes (or
+one server's script threads) would contend for it.
+
+Reported:
+  - per-page render latency percentiles, as seen by the client (AppTest.run)
+  - store write-lock waits from the page profiler (profiler.py)
+  - lost submissions: students whose submit completed but whose submission is
+    missing from the exam shard, the submission index or the columnar scores
+
+Runs against a scratch data directory (EXAMEVAL_DATA_DIR), never ./data.
+
+    python benchmarks/loadtest.py [--students 30] [--teachers 3] [--reruns 5]
+                                  [--processes 4] [--questions 3]
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP  = os.path.join(REPO, "app.py")
+sys.path.insert(0, REPO)
+
+WORDS = ("cell membrane lipid bilayer controls transport proteins energy light glucose "
+         "photosynthesis chlorophyll oxygen carbon dioxide water mitochondria").split()
+PASSWORD = "loadtest1"
+
+
+_run_lock = threading.Lock()      # one AppTest run at a time per process (see above)
+
+
+def _app():
+    from streamlit.testing.v1 import AppTest
+    return AppTest.from_file(APP, default_timeout=120)
+
+
+class Client:
+    """One browser session; every rerun is timed under the page it started on."""
+
+    def __init__(self, timings):
+        self.at = _app()
+        self.timings = timings
+
+    def run(self, label=None):
+        if label is None:
+            label = self.at.session_state["page"] if "page" in self.at.session_state else "home"
+        with _run_lock:
+            t = time.perf_counter()
+            self.at.run()
+            self.timings[label].append((time.perf_counter() - t) * 1000)
+        if self.at.exception:
+            raise RuntimeError(f"{label}: {self.at.exception[0].value}")
+
+    def login(self, role, email):
+        self.at.session_state["page"] = f"login_{role}"
+        self.run()
+        self.at.text_input[0].input(email)
+        self.at.text_input[1].input(PASSWORD)
+        [b for b in self.at.button if b.label.startswith("Login")][0].click()
+        self.run(f"login_{role} (submit)")
+
+
+def student(n, exam, barrier, timings, outcome, reruns, rnd):
+    c = Client(timings)
+    c.login("student", f"student{n}@load.test")
+    c.at.text_input[0].input(exam["id"])
+    [b for b in c.at.button if b.label.startswith("Join")][0].click()
+    c.run("student_dashboard (join)")
+    answers = [" ".join(rnd.choice(WORDS) for _ in range(rnd.randint(15, 40)))
+               for _ in exam["questions"]]
+    for r in range(1, reruns + 1):              # typing: each rerun adds a bit more text
+        for qi, text in enumerate(answers):
+            words = text.split()
+            c.at.text_area(key=f"ans_{qi}").input(" ".join(words[: len(words) * r // reruns]))
+        c.run()
+    barrier.wait()
+    [b for b in c.at.button if "Submit" in b.label][0].click()
+    c.run("take_exam (submit)")
+    outcome[c.at.session_state["user"]["id"]] = c.at.session_state["selected_submission_id"]
+
+
+def teacher(n, exam, stop, timings, rnd):
+    c = Client(timings)
+    c.login("teacher", f"teacher{n}@load.test")
+    c.at.session_state["selected_exam_id"] = exam["id"]
+    c.at.session_state["page"] = "exam_results"
+    while not stop.is_set():
+        c.run()
+        time.sleep(rnd.uniform(0.05, 0.2))
+
+
+def crowd(students, teachers, exam, reruns, barrier, seed, queue=None):
+    """Run one process's share of the crowd; returns (timings, lock waits, outcomes, errors)."""
+    import profiler
+    profiler.MAX_SAMPLES = 10 ** 6
+    timings, outcome, errors = defaultdict(list), {}, []
+    stop = threading.Event()
+
+    def guard(fn, *args):
+        try:
+            fn(*args)
+        except Exception as e:          # a failed session is reported, not fatal
+            errors.append(f"{type(e).__name__}: {e}")
+            if fn is student:
+                barrier.abort()         # don't leave the other students waiting forever
+
+    rnd = random.Random(seed)
+    threads = [threading.Thread(target=guard, args=(student, n, exam, barrier, timings, outcome,
+                                                    reruns, random.Random(rnd.random())))
+               for n in students]
+    watchers = [threading.Thread(target=guard, args=(teacher, n, exam, stop, timings,
+                                                     random.Random(rnd.random())))
+                for n in teachers]
+    for t in threads + watchers:
+        t.start()
+    for t in threads:
+        t.join()
+    stop.set()
+    for t in watchers:
+        t.join()
+    waits = [(r["page"], r["lock_wait_ms"]) for r in profiler.samples() if r.get("lock_wait_ms")]
+    result = (dict(timings), waits, outcome, errors)
+    if queue is not None:
+        queue.put(result)
+    return result
+
+
+def setup(args):
+    import database
+    database.init_store()
+    for n in range(args.teachers or 1):
+        database.create_user(f"Teacher {n}", f"teacher{n}@load.test", PASSWORD, "teacher")
+    for n in range(args.students):
+        database.create_user(f"Student {n}", f"student{n}@load.test", PASSWORD, "student")
+    teacher_id = database.get_user("teacher0@load.test")["id"]
+    rnd = random.Random(0)
+    questions = [{"text": f"Question {i + 1}", "model_answer": " ".join(rnd.choice(WORDS) for _ in range(25)),
+                  "keywords": rnd.sample(WORDS, 3), "max_marks": 10, "min_words": 10,
+                  "keyword_mode": "any", "synonyms": False}
+                 for i in range(args.questions)]
+    return database.create_exam(teacher_id, "Load Test", "Biology", questions, 60)
+
+
+def report(args, timings, waits, outcome, errors, wall):
+    import database
+    from profiler import percentile
+    print(f"\n{args.students} students, {args.teachers} teachers, {args.processes} process(es), "
+          f"{args.reruns} typing reruns each — {wall:.1f} s\n")
+    print(f"{'page':<28} {'renders':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for page in sorted(timings):
+        v = timings[page]
+        print(f"{page:<28} {len(v):>8} {percentile(v, 50):>8.1f} {percentile(v, 95):>8.1f} "
+              f"{percentile(v, 99):>8.1f} {max(v):>8.1f}")
+
+    lock_ms = [w for _, w in waits]
+    print(f"\nstore write-lock waits over {len(lock_ms)} locking render(s): "
+          f"p50 {percentile(lock_ms, 50):.1f} ms, p95 {percentile(lock_ms, 95):.1f} ms, "
+          f"max {max(lock_ms, default=0):.1f} ms")
+
+    expected = set(outcome.values())
+    shard    = {s["id"] for s in database.iter_exam_submissions(args.exam_id)}
+    indexed  = {sid for sid in expected if database.get_submission(sid)}   # via _index.jsonl
+    columns  = set(database.get_exam_columns(args.exam_id)["sid"].tolist())
+    print(f"\nsubmissions: {len(expected)} completed, {len(shard)} in shard, "
+          f"{len(indexed)} in index, {len(columns)} in columns")
+    lost = expected - (shard & indexed & columns)
+    print(f"lost submissions: {len(lost)}" + (f" {sorted(lost)}" if lost else ""))
+    if errors:
+        print(f"\n{len(errors)} session error(s):")
+        for e in errors[:10]:
+            print("  " + e)
+    return 1 if lost or errors else 0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Concurrent-session load test for app.py.")
+    ap.add_argument("--students", type=int, default=30)
+    ap.add_argument("--teachers", type=int, default=3)
+    ap.add_argument("--reruns", type=int, default=5, help="typing reruns per student before submitting")
+    ap.add_argument("--processes", type=int, default=4)
+    ap.add_argument("--questions", type=int, default=3)
+    ap.add_argument("--keep", action="store_true", help="keep the scratch data directory")
+    args = ap.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="exameval_load_")
+    os.environ["EXAMEVAL_DATA_DIR"] = data_dir
+    os.chdir(REPO)                       # app.py resolves static/ relative to itself; data is in the env dir
+    try:
+        exam = setup(args)
+        args.exam_id = exam["id"]
+        parts    = max(1, args.processes)
+        students = [list(range(args.students))[i::parts] for i in range(parts)]
+        teachers = [list(range(args.teachers))[i::parts] for i in range(parts)]
+        t = time.perf_counter()
+        if parts == 1:
+            barrier = threading.Barrier(args.students)
+            results = [crowd(students[0], teachers[0], exam, args.reruns, barrier, 0)]
+        else:
+            ctx = mp.get_context("fork")
+            barrier, queue = ctx.Barrier(args.students), ctx.Queue()
+            procs = [ctx.Process(target=crowd, args=(students[i], teachers[i], exam, args.reruns,
+                                                     barrier, i, queue))
+                     for i in range(parts)]
+            for p in procs:
+                p.start()
+            results = [queue.get() for _ in procs]
+            for p in procs:
+                p.join()
+        wall = time.perf_counter() - t
+
+        timings, waits, outcome, errors = defaultdict(list), [], {}, []
+        for tm, w, o, e in results:
+            for page, v in tm.items():
+                timings[page].extend(v)
+            waits += w
+            outcome.update(o)
+            errors += e
+        return report(args, timings, waits, outcome, errors, wall)
+    finally:
+        if args.keep:
+            print(f"\ndata kept in {data_dir}")
+        else:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+Weight calibration from teacher overrides.
+grade_answer blends the semantic, keyword and coherence components with fixed
+weights. Every score a teacher corrects through update_submission_score is a
+labelled example: the columnar store keeps its components next to the
+corrected score. This module gathers those examples for one exam or for all
+of one teacher's exams in a subject into NumPy arrays and fits weights two ways:
+
+  grid    — every weight triple on the simplex (w >= 0, sum 1) at GRID_STEP.
+            Components lie in [0, 1], so on the simplex the grader's clip
+            min(X·w, 1) never applies and the squared error of a candidate is
+            the quadratic form w'Gw - 2b'w + c of the 3x3 Gram matrix: one
+            pass over the overrides, then all candidates in one einsum
+  lstsq   — unconstrained least squares, projected back onto the simplex
+
+The grid fit is the suggestion; nothing is applied automatically.
+
+CLI:  python calibration.py EXAM_ID | --subject NAME --teacher-email EMAIL [--step 0.01]
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from database import get_exam_columns, get_teacher_exams
+from grader import DEFAULT_WEIGHTS
+
+GRID_STEP     = 0.01
+MIN_OVERRIDES = 10       # below this the fit is shown but not suggested
+
+
+def load_overrides(exams: List[dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """(X, y): component rows (semantic, keyword, coherence) and corrected score fractions."""
+    xs, ys = [], []
+    for exam in exams:
+        cols = get_exam_columns(exam["id"])
+        nq   = len(exam["questions"])
+        mask = cols["overridden"][:, :nq]
+        if not mask.any():
+            continue
+        max_marks = np.array([q["max_marks"] for q in exam["questions"]], dtype=float)
+        rows, qs  = np.nonzero(mask)
+        xs.append(np.column_stack([cols[c][rows, qs] for c in ("semantic", "keyword", "coherence")]))
+        ys.append(cols["score"][rows, qs] / max_marks[qs])
+    if not xs:
+        return np.zeros((0, 3)), np.zeros(0)
+    X, y = np.vstack(xs), np.concatenate(ys)
+    keep = np.isfinite(X).all(axis=1) & np.isfinite(y)
+    return X[keep], np.clip(y[keep], 0.0, 1.0)
+
+
+def simplex_grid(step: float = GRID_STEP) -> np.ndarray:
+    """All (w_sem, w_kw, w_coh) with non-negative multiples of `step` summing to 1."""
+    n = int(round(1 / step))
+    i, j = np.meshgrid(np.arange(n + 1), np.arange(n + 1), indexing="ij")
+    i, j = i[i + j <= n], j[i + j <= n]
+    return np.column_stack([i, j, n - i - j]) / n
+
+
+def grid_sse(X: np.ndarray, y: np.ndarray, W: np.ndarray) -> np.ndarray:
+    """Sum of squared errors of every candidate (rows of W) via the Gram matrix."""
+    G, b, c = X.T @ X, X.T @ y, y @ y
+    return np.einsum("ij,jk,ik->i", W, G, W) - 2 * W @ b + c
+
+
+def _summary(X: np.ndarray, y: np.ndarray, weights: np.ndarray) -> dict:
+    resid = np.minimum(X @ weights, 1.0) - y
+    return {"weights": tuple(round(float(w), 3) for w in weights),
+            "rmse": round(float(np.sqrt(np.mean(resid ** 2))), 4),
+            "mae": round(float(np.mean(np.abs(resid))), 4)}
+
+
+def project_simplex(w: np.ndarray) -> np.ndarray:
+    """Euclidean projection onto {w >= 0, sum(w) = 1}."""
+    u = np.sort(w)[::-1]
+    css = np.cumsum(u) - 1
+    k = np.nonzero(u - css / np.arange(1, len(w) + 1) > 0)[0][-1]
+    return np.maximum(w - css[k] / (k + 1), 0.0)
+
+
+def fit(X: np.ndarray, y: np.ndarray, step: float = GRID_STEP) -> Optional[dict]:
+    """Current, grid-searched and least-squares weights with their errors on (X, y)."""
+    n = len(y)
+    if not n:
+        return None
+    W = simplex_grid(step)
+    best = W[int(np.argmin(grid_sse(X, y, W)))]
+    ls, *_ = np.linalg.lstsq(X, y, rcond=None)
+    return {
+        "overrides": n,
+        "candidates": len(W),
+        "current": _summary(X, y, np.array(DEFAULT_WEIGHTS)),
+        "grid":    _summary(X, y, best),
+        "lstsq":   _summary(X, y, project_simplex(ls)),
+        "suggested": tuple(round(float(w), 3) for w in best) if n >= MIN_OVERRIDES else None,
+    }
+
+
+def calibrate_exam(exam: dict, step: float = GRID_STEP) -> Optional[dict]:
+    return fit(*load_overrides([exam]), step)
+
+
+def calibrate_subject(teacher_id: str, subject: str, step: float = GRID_STEP) -> Optional[dict]:
+    """Fit over one teacher's exams in `subject`; other teachers' overrides never count."""
+    exams = [e for e in get_teacher_exams(teacher_id) if e.get("subject", "").lower() == subject.lower()]
+    return fit(*load_overrides(exams), step)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from database import get_exam, get_user
+
+    ap = argparse.ArgumentParser(description="Suggest grading weights from teacher overrides.")
+    ap.add_argument("exam_id", nargs="?")
+    ap.add_argument("--subject")
+    ap.add_argument("--teacher-email", help="whose exams --subject covers")
+    ap.add_argument("--step", type=float, default=GRID_STEP)
+    args = ap.parse_args()
+    if bool(args.exam_id) == bool(args.subject):
+        ap.error("give either an exam id or --subject")
+    if args.subject and not args.teacher_email:
+        ap.error("--subject needs --teacher-email")
+
+    t = time.perf_counter()
+    if args.subject:
+        teacher = get_user(args.teacher_email)
+        if not teacher or teacher["role"] != "teacher":
+            raise SystemExit(f"No teacher account for {args.teacher_email}")
+        report = calibrate_subject(teacher["id"], args.subject, args.step)
+    else:
+        exam = get_exam(args.exam_id.upper())
+        if not exam:
+            raise SystemExit(f"Unknown exam: {args.exam_id}")
+        report = calibrate_exam(exam, args.step)
+    if not report:
+        raise SystemExit("No overridden results to calibrate from.")
+    print(f"{report['overrides']} override(s), {report['candidates']} grid candidates, "
+          f"{time.perf_counter() - t:.2f} s")
+    for name in ("current", "grid", "lstsq"):
+        r = report[name]
+        print(f"{name:>8}  weights {r['weights']}  rmse {r['rmse']:.4f}  mae {r['mae']:.4f}")
+    if report["suggested"] is None:
+        print(f"Fewer than {MIN_OVERRIDES} overrides; no suggestion.")
+    else:
+        print(f"suggested (semantic, keyword, coherence): {report['suggested']}")
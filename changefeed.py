@@ -0,0 +1,224 @@
+"""
+Cross-process change feed for the JSON store.
+
+Several app processes can share one data directory. Each keeps in-memory
+copies of the small, hot tables (users, exams, submission summaries), and a
+write made by one process has to reach the others without them re-reading
+whole files on every lookup. Every store write therefore also appends an
+event (kind, key, record) to a SQLite log whose AUTOINCREMENT rowid is a
+monotonic sequence number shared by all processes. A Replica remembers the
+last sequence number it applied and, before each read, fetches only the
+events after it (one indexed query; nothing at all when idle).
+
+Events carry the full new record and are applied as upserts, so replaying an
+event the replica already has is harmless. That makes start-up simple: note
+the feed head, then load the files; anything written in between is in both.
+A replica reloads from the files when it cannot trust the log to be complete:
+on first use, when it has fallen behind a compact() of the log, and when the
+feed file itself was replaced (a new or restored data directory).
+
+Writers append while still holding the store file's lock (database._locked),
+so events for one record are in the same order as the writes to its file.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+KEEP_EVENTS = 100_000       # compact() default: replicas further behind reload from the files
+
+Event = Tuple[int, str, str, Any]       # (seq, kind, key, record)
+
+
+class ChangeFeed:
+    """Append-only event log in a SQLite file (WAL mode, shared by processes)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._db: Optional[sqlite3.Connection] = None
+        self._pid = 0
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        # a connection must not cross fork(): open a fresh one in each process
+        if self._db is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), check_same_thread=False,
+                                 isolation_level=None, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("CREATE TABLE IF NOT EXISTS changes ("
+                       "seq INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, "
+                       "key TEXT NOT NULL, record TEXT)")
+            self._db, self._pid = db, os.getpid()
+        return self._db
+
+    def identity(self) -> Optional[Tuple[int, int]]:
+        """Changes when the feed file is replaced; None if it does not exist yet."""
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return st.st_dev, st.st_ino
+
+    def append(self, kind: str, key: str, record: Any) -> int:
+        """Log one change (record None for a delete); returns its sequence number."""
+        return self.append_many([(kind, key, record)])
+
+    def append_many(self, events: Iterable[Tuple[str, str, Any]]) -> int:
+        rows = [(kind, key, None if rec is None else
+                 json.dumps(rec, separators=(",", ":"), ensure_ascii=False))
+                for kind, key, rec in events]
+        with self._lock:
+            db = self._conn()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.executemany("INSERT INTO changes (kind, key, record) VALUES (?, ?, ?)", rows)
+                seq = db.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return seq[0] if seq else 0
+
+    def head(self) -> int:
+        """Sequence number of the latest event (0 for an empty feed)."""
+        with self._lock:
+            row = self._conn().execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+        return row[0] if row else 0
+
+    def since(self, seq: int, limit: int = -1) -> List[Event]:
+        """Events after `seq`, oldest first."""
+        with self._lock:
+            rows = self._conn().execute(
+                "SELECT seq, kind, key, record FROM changes WHERE seq > ? ORDER BY seq LIMIT ?",
+                (seq, limit)).fetchall()
+        return [(s, kind, key, None if rec is None else json.loads(rec)) for s, kind, key, rec in rows]
+
+    def compact(self, keep: int = KEEP_EVENTS) -> int:
+        """Drop all but the newest `keep` (at least 1) events; returns events removed."""
+        head = self.head()
+        with self._lock:
+            cur = self._conn().execute("DELETE FROM changes WHERE seq <= ?", (head - max(1, keep),))
+        return cur.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            db = self._conn()
+            lo, hi, n = db.execute("SELECT MIN(seq), MAX(seq), COUNT(*) FROM changes").fetchone()
+            kinds = dict(db.execute("SELECT kind, COUNT(*) FROM changes GROUP BY kind").fetchall())
+        return {"first": lo or 0, "head": hi or 0, "events": n, "kinds": kinds}
+
+
+class Replica:
+    """In-process copy of some store tables, brought up to date from a ChangeFeed.
+
+    `loaders` map each kind to a function returning the whole table from the
+    files ({key: record}). `group_by` maintains a secondary index per kind
+    (kind -> record field) for group() lookups. Events replace records rather
+    than mutate them, so the records handed out are shared: do not mutate.
+    """
+
+    def __init__(self, feed: ChangeFeed, loaders: Dict[str, Callable[[], Dict[str, Any]]],
+                 group_by: Optional[Dict[str, str]] = None):
+        self.feed = feed
+        self.loaders = loaders
+        self.group_by = group_by or {}
+        self.seq = -1                   # nothing loaded yet
+        self.reloads = self.applied = 0
+        self._ident: Optional[Tuple[int, int]] = None
+        self._tables: Dict[str, Dict[str, Any]] = {}
+        self._groups: Dict[str, Dict[Any, Dict[str, None]]] = {}
+        self._lock = threading.Lock()
+
+    def _reload(self):
+        head = self.feed.head()         # before loading: later writes are replayed on top
+        self._ident = self.feed.identity()
+        self._tables = {kind: dict(load()) for kind, load in self.loaders.items()}
+        self._groups = {}
+        for kind, field in self.group_by.items():
+            groups = self._groups[kind] = {}
+            for key, rec in self._tables[kind].items():
+                groups.setdefault(rec.get(field), {})[key] = None
+        self.seq = head
+        self.reloads += 1
+
+    def _apply(self, kind: str, key: str, record: Any):
+        table = self._tables.get(kind)
+        if table is None:
+            return                      # a kind this replica does not keep
+        old = table.pop(key, None) if record is None else table.get(key)
+        if record is not None:
+            table[key] = record
+        field = self.group_by.get(kind)
+        if field:
+            groups = self._groups[kind]
+            before = None if old is None else old.get(field)
+            after  = None if record is None else record.get(field)
+            if old is not None and (record is None or before != after):
+                groups.get(before, {}).pop(key, None)
+            if record is not None and (old is None or before != after):
+                groups.setdefault(after, {})[key] = None
+        self.applied += 1
+
+    def _sync(self):
+        if self.seq < 0 or self.feed.identity() != self._ident:
+            self._reload()
+        events = self.feed.since(self.seq)
+        if events and events[0][0] > self.seq + 1:
+            self._reload()              # fell behind a compaction: the log has a hole
+            events = self.feed.since(self.seq)
+        for seq, kind, key, record in events:
+            self._apply(kind, key, record)
+            self.seq = seq
+
+    def sync(self) -> int:
+        """Apply pending events; returns the sequence number now reflected."""
+        with self._lock:
+            self._sync()
+            return self.seq
+
+    def get(self, kind: str, key: str) -> Any:
+        with self._lock:
+            self._sync()
+            return self._tables[kind].get(key)
+
+    def table(self, kind: str) -> Dict[str, Any]:
+        """A copy of the whole mapping (the records themselves are shared)."""
+        with self._lock:
+            self._sync()
+            return dict(self._tables[kind])
+
+    def group(self, kind: str, value: Any) -> List[Any]:
+        """Records of `kind` whose group_by field equals `value`, in insertion order."""
+        with self._lock:
+            self._sync()
+            table = self._tables[kind]
+            return [table[k] for k in self._groups[kind].get(value, ())]
+
+    def invalidate(self):
+        """Force a reload from the files on the next read."""
+        with self._lock:
+            self.seq = -1
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import FEED_FILE
+    ap = argparse.ArgumentParser(description="Inspect, tail or compact the store change feed.")
+    ap.add_argument("--tail", type=int, metavar="N", help="print the last N events")
+    ap.add_argument("--compact", type=int, metavar="KEEP", help="keep only the newest KEEP events")
+    args = ap.parse_args()
+    feed = ChangeFeed(FEED_FILE)
+    if args.compact is not None:
+        print(f"removed {feed.compact(args.compact)} events")
+    s = feed.stats()
+    print(f"{feed.path}: {s['events']} events (seq {s['first']}–{s['head']}) " +
+          ", ".join(f"{k}: {n}" for k, n in sorted(s["kinds"].items())))
+    if args.tail:
+        for seq, kind, key, rec in feed.since(max(0, s["head"] - args.tail)):
+            print(f"{seq:>8}  {kind:<12} {key:<24} {json.dumps(rec)[:80]}")
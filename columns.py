@@ -0,0 +1,220 @@
+"""
+Columnar per-exam score store.
+A side copy of the numbers in an exam's submissions, one .npz file per exam with
+one row per submission, so analytics run as NumPy operations over contiguous
+arrays instead of walking nested result dicts. The submission shards stay the
+source of truth; these files can always be rebuilt from them.
+
+Columns (n = submissions, Q = questions):
+    sid, submitted_at, total_score, total_marks, percentage      shape (n,)
+    score, semantic, keyword, coherence, overridden              shape (n, Q)
+Questions a submission has no result for are NaN (False for `overridden`).
+
+Keyword matches are kept as coordinate lists, one entry per matched keyword:
+    hit_row, hit_q, hit_kw                                       shape (hits,)
+(row index, question index, keyword index within the question).
+
+Saving a submission does not rewrite the .npz. Its row goes on the end of a
+segment log next to it (<exam>.seg, one JSON line per submission or score
+override), and load() replays the log over the base file. Once the log
+outgrows the base file (and SEGMENT_MIN_BYTES), the next append folds it into
+a new base, so rewrites get rarer as the exam grows and a submission costs
+amortized O(1) instead of O(n). Writers hold the exam's shard lock.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from results import result_score
+
+VERSION     = 2           # bump when the set of columns changes; old files get rebuilt
+ROW_FIELDS  = ("submitted_at", "total_score", "total_marks", "percentage")
+CELL_FIELDS = ("score", "semantic", "keyword", "coherence")
+HIT_FIELDS  = ("hit_row", "hit_q", "hit_kw")
+SEGMENT_MIN_BYTES = 64 * 1024   # the log is folded into the base once past this and the base's size
+# the parts of a stored result the columns use (compact and pre-compact names)
+RESULT_KEYS = ("s", "sim", "kw", "coh", "m", "ov",
+               "score", "semantic_similarity", "keyword_score", "coherence_score", "overridden")
+
+
+def _component(res: dict, compact_key: str, legacy_key: str) -> float:
+    return res[compact_key] if compact_key in res else res.get(legacy_key, np.nan)
+
+
+def _row(sub: dict, width: int, row_index: int) -> Dict[str, np.ndarray]:
+    cells = {f: np.full(width, np.nan) for f in CELL_FIELDS}
+    overridden = np.zeros(width, dtype=bool)
+    hit_q, hit_kw = [], []
+    for qi, res in enumerate(sub["results"][:width]):
+        cells["score"][qi]     = result_score(res)
+        cells["semantic"][qi]  = _component(res, "sim", "semantic_similarity")
+        cells["keyword"][qi]   = _component(res, "kw", "keyword_score")
+        cells["coherence"][qi] = _component(res, "coh", "coherence_score")
+        overridden[qi] = bool(res.get("ov", res.get("overridden", False)))
+        for ki in res.get("m", ()):
+            hit_q.append(qi); hit_kw.append(ki)
+    row = {f: np.array([float(sub.get(f, 0.0))]) for f in ROW_FIELDS}
+    row.update({f: v[None, :] for f, v in cells.items()})
+    row["overridden"] = overridden[None, :]
+    row["sid"] = np.array([sub["id"]])
+    row["hit_row"] = np.full(len(hit_q), row_index, dtype=np.int32)
+    row["hit_q"]   = np.array(hit_q, dtype=np.int32)
+    row["hit_kw"]  = np.array(hit_kw, dtype=np.int32)
+    return row
+
+
+def empty(width: int) -> Dict[str, np.ndarray]:
+    cols = {f: np.zeros(0) for f in ROW_FIELDS}
+    cols.update({f: np.zeros((0, width)) for f in CELL_FIELDS})
+    cols["overridden"] = np.zeros((0, width), dtype=bool)
+    cols["sid"] = np.zeros(0, dtype="<U16")
+    cols.update({f: np.zeros(0, dtype=np.int32) for f in HIT_FIELDS})
+    return cols
+
+
+def _widen(cols: Dict[str, np.ndarray], width: int) -> Dict[str, np.ndarray]:
+    have = cols["score"].shape[1]
+    if have >= width:
+        return cols
+    n, pad = cols["score"].shape[0], width - have
+    for f in CELL_FIELDS:
+        cols[f] = np.hstack([cols[f], np.full((n, pad), np.nan)])
+    cols["overridden"] = np.hstack([cols["overridden"], np.zeros((n, pad), dtype=bool)])
+    return cols
+
+
+def _segment_path(path: Path) -> Path:
+    return path.with_suffix(".seg")
+
+
+def stamp(path: Path) -> int:
+    """Changes whenever the base file is replaced or the segment log grows (0 if not built).
+    The base is replaced atomically, so its inode changes on every rewrite even
+    within the filesystem's mtime granularity."""
+    try:
+        st = path.stat()
+    except OSError:
+        return 0
+    try:
+        seg = _segment_path(path).stat()
+        seg_id = (seg.st_ino, seg.st_size)
+    except OSError:
+        seg_id = None
+    return hash((st.st_ino, st.st_mtime_ns, st.st_size, seg_id)) or 1
+
+
+def _load_base(path: Path) -> Optional[Dict[str, np.ndarray]]:
+    if not path.exists():
+        return None
+    with np.load(path, allow_pickle=False) as npz:
+        if "version" not in npz.files or int(npz["version"]) != VERSION:
+            return None  # written by an older layout: caller rebuilds
+        return {k: npz[k] for k in npz.files if k != "version"}
+
+
+def _replay(cols: Dict[str, np.ndarray], raw: bytes) -> Dict[str, np.ndarray]:
+    """Apply segment log lines: a new submission id adds a row, a known one is re-scored."""
+    subs = []
+    for line in raw.splitlines():
+        try:
+            subs.append(json.loads(line))
+        except ValueError:
+            continue            # a line torn by a crashed writer
+    if not subs:
+        return cols
+    width = max([cols["score"].shape[1]] + [len(s["results"]) for s in subs])
+    cols  = _widen(cols, width)
+    n     = len(cols["sid"])
+    pos   = {sid: i for i, sid in enumerate(cols["sid"].tolist())}
+    rows  = []
+    for sub in subs:
+        i = pos.get(sub["id"])
+        if i is None:
+            pos[sub["id"]] = len(pos)
+            rows.append(_row(sub, width, len(pos) - 1))
+            continue
+        row = _row(sub, width, i)
+        target = cols if i < n else rows[i - n]
+        at = i if i < n else 0
+        for f in ROW_FIELDS + CELL_FIELDS + ("overridden",):
+            target[f][at] = row[f][0]   # keyword hits never change on override
+    if rows:
+        cols = {f: np.concatenate([cols[f]] + [r[f] for r in rows]) for f in cols}
+    return cols
+
+
+def load(path: Path) -> Optional[Dict[str, np.ndarray]]:
+    """The base file with its segment log applied; None if it must be rebuilt."""
+    for _ in range(3):
+        before = stamp(path)
+        cols = _load_base(path)
+        if cols is None:
+            return None
+        try:
+            with open(_segment_path(path), "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            raw = b""
+        if stamp(path) == before:
+            break       # otherwise the log was folded in between the two reads: read again
+    raw = raw[: raw.rfind(b"\n") + 1]    # a line still being appended is skipped
+    return _replay(cols, raw)
+
+
+def save(path: Path, cols: Dict[str, np.ndarray]):
+    """Write `cols` as the new base file and drop the segment log it includes."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp.npz")
+    np.savez(tmp, version=np.array(VERSION), **cols)
+    os.replace(tmp, path)  # readers never see a half-written file
+    _segment_path(path).unlink(missing_ok=True)
+
+
+def build(subs: List[dict], width: int) -> Dict[str, np.ndarray]:
+    width = max([width] + [len(s["results"]) for s in subs])
+    cols = empty(width)
+    if not subs:
+        return cols
+    ordered = sorted(subs, key=lambda s: s["submitted_at"])
+    rows = [_row(s, width, i) for i, s in enumerate(ordered)]
+    return {f: np.concatenate([r[f] for r in rows]) for f in cols}
+
+
+def _log(path: Path, sub: dict):
+    rec = {"id": sub["id"], **{f: sub.get(f, 0.0) for f in ROW_FIELDS},
+           "results": [{k: r[k] for k in RESULT_KEYS if k in r} for r in sub["results"]]}
+    raw = (json.dumps(rec, separators=(",", ":")) + "\n").encode()
+    seg = _segment_path(path)
+    seg.parent.mkdir(parents=True, exist_ok=True)
+    with open(seg, "ab+") as f:
+        if f.tell():
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                raw = b"\n" + raw        # start clean after a torn line
+        f.write(raw)
+        size = f.tell()
+    try:
+        base = path.stat().st_size
+    except OSError:
+        return          # no base yet: built from the submissions on first read
+    if size > max(SEGMENT_MIN_BYTES, base):
+        cols = load(path)
+        if cols is not None:
+            save(path, cols)
+
+
+def append(path: Path, sub: dict):
+    """Add a new submission's row. Caller holds the exam's shard lock."""
+    _log(path, sub)
+
+
+def patch(path: Path, sub: dict):
+    """Rewrite the row of an existing submission (e.g. after a score override).
+    Caller holds the exam's shard lock."""
+    if path.exists():
+        _log(path, sub)
@@ -6,34 +6,138 @@ On Streamlit Cloud, session_state is the source of truth.
 """
 
 import json
+import logging
 import os
 import uuid
 import hashlib
+import secrets
 import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
-
-DATA_DIR = Path("data")
-DATA_DIR.mkdir(exist_ok=True)
-
-USERS_FILE = DATA_DIR / "users.json"
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:     # Windows: locks are per process only
+    fcntl = None
+
+import changefeed
+import columns
+import jsonstream
+import score_index
+from grader import PROFILE_VERSION, compile_question
+from profiler import record_io, timed
+from results import compact_legacy, is_compact, result_score
+
+DATA_DIR = Path(os.environ.get("EXAMEVAL_DATA_DIR", "data"))
+log = logging.getLogger("exameval.store")
+
+USERS_FILE = DATA_DIR / "users.jsonl"
+LEGACY_USERS_FILE = DATA_DIR / "users.json"               # pre-log layout
 EXAMS_FILE = DATA_DIR / "exams.json"
-SUBMISSIONS_FILE = DATA_DIR / "submissions.json"
+EXAM_VERSIONS_DIR = DATA_DIR / "exam_versions"
+QUESTIONS_FILE = DATA_DIR / "questions.json"
+SUBMISSIONS_DIR = DATA_DIR / "submissions"
+SUBMISSION_INDEX = SUBMISSIONS_DIR / "_index.jsonl"
+COMPACT_MARKER = SUBMISSIONS_DIR / "_compact"             # every shard is in the compact format
+LEGACY_SUBMISSIONS_FILE = DATA_DIR / "submissions.json"   # pre-sharding layout
+COLUMNS_DIR = DATA_DIR / "columns"
+FEED_FILE = DATA_DIR / "changes.sqlite"
+
+
+def init_store():
+    """One-time store setup. The app runs this once per process (st.cache_resource);
+    scripts using this module directly must call it before writing."""
+    DATA_DIR.mkdir(exist_ok=True)
+    SUBMISSIONS_DIR.mkdir(exist_ok=True)
+    migrate_users()
+    migrate_exams()
+    shard_submissions()
+    migrate_submissions()
+    if not COLUMNS_DIR.exists():
+        rebuild_columns()
+    _feed.compact()
 
 
 def _load(path: Path) -> dict:
-    if path.exists():
-        try:
-            with open(path) as f:
-                return json.load(f)
-        except Exception:
-            pass
-    return {}
+    """A store file's contents, or {} if it does not exist. A file that exists
+    but does not parse raises: read-modify-write callers would otherwise save
+    just their new record over it."""
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return {}
+    record_io("load", len(raw))
+    try:
+        return json.loads(raw)
+    except ValueError as e:
+        log.error("corrupt store file %s: %s", path, e)
+        raise ValueError(f"corrupt store file {path}: {e}") from e
+
+
+def _iter_load(path: Path):
+    """Stream a store file's (id, record) pairs without materialising the whole file.
+    A corrupt file raises (after the records before the damage) rather than
+    passing off a truncated list as the whole file."""
+    try:
+        yield from jsonstream.iter_file(path, on_done=lambda n: record_io("load", n))
+    except ValueError as e:
+        log.error("corrupt store file %s: %s", path, e)
+        raise ValueError(f"corrupt store file {path}: {e}") from e
 
 
 def _save(path: Path, data: dict):
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
+    raw = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(raw)
+    os.replace(tmp, path)   # readers and backups never see a half-written file
+    record_io("save", len(raw))
+
+
+_path_locks: Dict[Path, threading.Lock] = {}
+_path_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _locked(path: Path):
+    """Exclusive lock for a read-modify-write of `path`, across threads and processes
+    (flock on a sibling .lock file). Readers do not take it."""
+    with _path_locks_guard:
+        tlock = _path_locks.setdefault(path, threading.Lock())
+    with timed("lock_wait_ms"):
+        tlock.acquire()
+    try:
+        if fcntl is None:
+            yield
+            return
+        with open(path.with_name(path.name + ".lock"), "ab") as lf:
+            with timed("lock_wait_ms"):
+                fcntl.flock(lf, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lf, fcntl.LOCK_UN)
+    finally:
+        tlock.release()
+
+
+# ── CHANGE FEED ───────────────────────────────────────────────────────────────
+# Users, exams and submission summaries are read from an in-process replica
+# kept current by tailing the change feed (see changefeed.py), so a lookup does
+# not re-read the whole file and writes from other processes still show up.
+# Every write publishes the new record while it holds the file's lock.
+_feed = changefeed.ChangeFeed(FEED_FILE)
+_replica = changefeed.Replica(
+    _feed,
+    {"users": lambda: dict(iter_user_log()),
+     "exams": lambda: _load(EXAMS_FILE),
+     "submissions": lambda: _index_scan("")},
+    group_by={"exams": "teacher_id", "submissions": "student_id"},
+)
 
 
 def hash_password(pw: str) -> str:
@@ -41,125 +145,600 @@ def hash_password(pw: str) -> str:
 
 
 # ── USERS ─────────────────────────────────────────────────────────────────────
+# users.jsonl is an append-only log of user records, one JSON line each; the
+# last line for an email wins. A signup appends one line under the file's lock
+# instead of rewriting every account, and the email index is the replica's
+# "users" table, so a lookup never reads the file.
+def read_user_log(path: Path = USERS_FILE, start: int = 0, limit: int = -1) -> Tuple[list, int]:
+    """(user records, offset after the last of them) for the complete lines of a
+    users log between byte `start` and byte `limit` (-1 = the end of the file)."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(start)
+            raw = f.read(limit - start if limit >= 0 else -1)
+    except FileNotFoundError:
+        return [], start
+    record_io("load", len(raw))
+    end = raw.rfind(b"\n")                 # a line still being appended is skipped
+    if end <= 0:
+        return [], start + max(end, -1) + 1
+    body = raw[:end]
+    try:
+        # one parse for the whole log: JSON text never holds a raw newline, so lines join into a list
+        users = json.loads(b"[" + body.replace(b"\n", b",") + b"]")
+    except ValueError:                      # a torn line left by a crashed writer
+        users = []
+        for line in body.splitlines():
+            try:
+                users.append(json.loads(line))
+            except ValueError:
+                continue
+    return users, start + end + 1
+
+
+def iter_user_log(path: Path = USERS_FILE, limit: int = -1):
+    """(email, user) for each complete line of a users log, within its first `limit` bytes."""
+    for user in read_user_log(path, 0, limit)[0]:
+        yield user["email"], user
+
+
+def _append_users(users: list):
+    """Append user records to the log and publish them. Caller holds _locked(USERS_FILE)."""
+    raw = "".join(json.dumps(u, separators=(",", ":"), ensure_ascii=False) + "\n"
+                  for u in users).encode()
+    with open(USERS_FILE, "ab+") as f:
+        if f.tell():
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                raw = b"\n" + raw            # start clean after a torn line
+        f.write(raw)
+    _feed.append_many(("users", u["email"], u) for u in users)
+    record_io("save", len(raw))
+
+
 def get_users() -> dict:
-    return _load(USERS_FILE)
+    """Every account by email (a copy; use get_user for a single lookup)."""
+    return _replica.table("users")
+
+
+def get_user(email: str) -> Optional[dict]:
+    return _replica.get("users", email)
 
 
 def create_user(name: str, email: str, password: str, role: str) -> Optional[dict]:
-    users = get_users()
-    if email in users:
-        return None  # already exists
-    uid = str(uuid.uuid4())[:8]
-    users[email] = {
-        "id": uid, "name": name, "email": email,
-        "password": hash_password(password),
-        "role": role,  # "teacher" or "student"
-        "created_at": time.time(),
-    }
-    _save(USERS_FILE, users)
-    return users[email]
+    with _locked(USERS_FILE):
+        if _replica.get("users", email):
+            return None  # already exists (the replica has every signup committed before the lock)
+        user = {
+            "id": str(uuid.uuid4())[:8], "name": name, "email": email,
+            "password": hash_password(password),
+            "role": role,  # "teacher" or "student"
+            "created_at": time.time(),
+        }
+        _append_users([user])
+    return user
 
 
 def authenticate(email: str, password: str) -> Optional[dict]:
-    users = get_users()
-    user = users.get(email)
+    user = _replica.get("users", email)
     if user and user["password"] == hash_password(password):
         return user
     return None
 
 
+def migrate_users() -> int:
+    """Move accounts from a pre-log users.json into users.jsonl. The old file is
+    kept as users.json.migrated. Returns accounts moved."""
+    if not LEGACY_USERS_FILE.exists():
+        return 0
+    with _locked(USERS_FILE):
+        if not LEGACY_USERS_FILE.exists():
+            return 0    # another process got here first
+        existing = dict(iter_user_log())
+        moved = [u for email, u in _load(LEGACY_USERS_FILE).items() if email not in existing]
+        if moved:
+            _append_users(moved)
+        LEGACY_USERS_FILE.rename(LEGACY_USERS_FILE.with_name("users.json.migrated"))
+    return len(moved)
+
+
+# ── SESSIONS ──────────────────────────────────────────────────────────────────
+# A signed-in user is cached in memory under an opaque token, kept only in the
+# Streamlit session state, so reruns and page changes resolve the user without
+# reading the user store. Sessions live in this server process (a browser
+# refresh signs in again) and expire SESSION_TTL seconds after they are
+# created; the oldest are dropped beyond MAX_SESSIONS.
+SESSION_TTL  = 12 * 3600
+MAX_SESSIONS = 100_000
+
+_sessions: "OrderedDict[str, tuple]" = OrderedDict()     # token -> (user, expires)
+_sessions_lock = threading.Lock()
+
+
+def create_session(user: dict) -> str:
+    token = secrets.token_urlsafe(24)
+    with _sessions_lock:
+        _sessions[token] = (user, time.time() + SESSION_TTL)
+        while len(_sessions) > MAX_SESSIONS:
+            _sessions.popitem(last=False)
+    return token
+
+
+def session_user(token: str) -> Optional[dict]:
+    """The user signed in under `token`, or None if it is unknown or expired."""
+    with _sessions_lock:
+        entry = _sessions.get(token)
+        if entry is None:
+            return None
+        if entry[1] < time.time():
+            del _sessions[token]
+            return None
+        return entry[0]
+
+
+def end_session(token: str):
+    with _sessions_lock:
+        _sessions.pop(token, None)
+
+
+# ── QUESTION BANK ─────────────────────────────────────────────────────────────
+# Questions are stored once, keyed by a hash of their content, and exams refer
+# to them by that key. A bank entry never changes (editing a question makes a
+# new entry), so its compiled grading profile can be cached for the lifetime of
+# the process and shared by every exam that reuses the question.
+QUESTION_FIELDS = ("text", "model_answer", "keywords", "min_words", "max_marks")
+# hashed only when not the default; max_tokens caps the words graded (0 = tokenizer default),
+# language picks the tokenizer's language pack
+OPTIONAL_FIELDS = {"keyword_mode": "any", "synonyms": False, "max_tokens": 0, "language": "en"}
+
+_bank: dict = {}  # hash -> question with profile, filled lazily from QUESTIONS_FILE
+
+
+def _question_entry(question: dict) -> dict:
+    entry = {f: question.get(f, [] if f == "keywords" else 0) for f in QUESTION_FIELDS}
+    for f, default in OPTIONAL_FIELDS.items():
+        if question.get(f, default) != default:
+            entry[f] = question[f]
+    return entry
+
+
+def question_hash(question: dict) -> str:
+    entry = _question_entry(question)
+    canonical = json.dumps([entry[f] for f in QUESTION_FIELDS]
+                           + [[f, entry[f]] for f in OPTIONAL_FIELDS if f in entry],
+                           separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def with_profile(question: dict) -> dict:
+    """Attach the compiled grading profile (see grader.compile_question) if missing."""
+    prof = question.get("profile")
+    synonyms = bool(question.get("synonyms", False))
+    language = question.get("language") or "en"
+    if (not prof or prof.get("v") != PROFILE_VERSION or prof.get("syn", False) != synonyms
+            or prof.get("lang", "en") != language):
+        question = {**question, "profile": compile_question(question["model_answer"],
+                                                            question.get("keywords", []),
+                                                            synonyms, language)}
+    return question
+
+
+def get_question_bank() -> dict:
+    return _load(QUESTIONS_FILE)
+
+
+def put_questions(questions: list) -> list:
+    """Add questions to the bank (deduplicated by content); returns their ids in order."""
+    refs = [question_hash(q) for q in questions]
+    if all(h in _bank for h in refs):
+        return refs
+    with _locked(QUESTIONS_FILE):
+        if all(h in _bank for h in refs):      # added by another thread meanwhile
+            return refs
+        bank  = get_question_bank()
+        fresh = False
+        for h, q in zip(refs, questions):
+            if h not in bank:
+                entry = _question_entry(q)
+                prof  = q.get("profile")
+                bank[h] = {**with_profile({**entry, **({"profile": prof} if prof else {})}), "id": h}
+                fresh = True
+        if fresh:
+            _save(QUESTIONS_FILE, bank)
+        _bank.update({h: bank[h] for h in refs})
+    return refs
+
+
+def _bank_entries(refs: list) -> dict:
+    if any(h not in _bank for h in refs):
+        # Entries compiled by an older grader get a fresh profile in memory
+        _bank.update({h: with_profile(q) for h, q in get_question_bank().items()})
+    return _bank
+
+
+def _hydrate(exam: dict) -> dict:
+    """Resolve an exam's question refs into question dicts (shared, do not mutate)."""
+    if "question_refs" not in exam:
+        return exam  # created before the question bank: questions stored inline
+    bank = _bank_entries(exam["question_refs"])
+    return {**exam, "questions": [bank[h] for h in exam["question_refs"]]}
+
+
+def migrate_exams() -> int:
+    """Move inline exam questions into the question bank and give exams from before
+    versioning version 1. Returns exams converted."""
+    with _locked(EXAMS_FILE):
+        exams = _load(EXAMS_FILE)
+        legacy = [e for e in exams.values() if "question_refs" not in e or "version" not in e]
+        for exam in legacy:
+            if "question_refs" not in exam:
+                exam["question_refs"] = put_questions(exam.pop("questions"))
+            exam["version"] = 1
+            _write_version(exam)
+        if legacy:
+            _save(EXAMS_FILE, exams)
+            _feed.append_many(("exams", e["id"], e) for e in legacy)
+    return len(legacy)
+
+
 # ── EXAMS ─────────────────────────────────────────────────────────────────────
+# Exams are versioned: every create or update writes the whole exam record to
+# exam_versions/<ID>/v<N>.json (a one-entry {version: exam} map) before
+# exams.json points at it, and the version goes up by one each time. A version
+# file is never changed afterwards, so (exam id, version) names one question
+# set for good: submissions record the version they were graded against, and
+# anything cached under that key stays valid in every process.
+MAX_CACHED_VERSIONS = 1024
+
+_versions: "OrderedDict[tuple, dict]" = OrderedDict()   # (exam id, version) -> exam record
+_versions_lock = threading.Lock()
+
+
+def _version_path(exam_id: str, version: int) -> Path:
+    name = exam_id if exam_id.isalnum() else f"_{hashlib.sha256(exam_id.encode()).hexdigest()[:16]}"
+    return EXAM_VERSIONS_DIR / name / f"v{int(version)}.json"
+
+
+def _write_version(exam: dict):
+    """Write an exam record's version file. Caller holds _locked(EXAMS_FILE)."""
+    path = _version_path(exam["id"], exam["version"])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _save(path, {str(exam["version"]): exam})
+
+
+def _exam_version(exam_id: str, version: int) -> Optional[dict]:
+    key = (exam_id, int(version))
+    with _versions_lock:
+        exam = _versions.get(key)
+        if exam is not None:
+            _versions.move_to_end(key)
+            return exam
+    exam = _load(_version_path(exam_id, version)).get(str(int(version)))
+    if exam is not None:
+        with _versions_lock:
+            _versions[key] = exam
+            while len(_versions) > MAX_CACHED_VERSIONS:
+                _versions.popitem(last=False)
+    return exam
+
+
 def get_exams() -> dict:
-    return _load(EXAMS_FILE)
+    return {eid: _hydrate(e) for eid, e in _replica.table("exams").items()}
 
 
 def create_exam(teacher_id: str, title: str, subject: str,
                 questions: list, duration_minutes: int) -> dict:
-    exams = get_exams()
-    eid = str(uuid.uuid4())[:6].upper()
-    exams[eid] = {
+    refs = put_questions(questions)
+    eid  = str(uuid.uuid4())[:6].upper()
+    exam = {
         "id": eid,
         "teacher_id": teacher_id,
         "title": title,
         "subject": subject,
-        "questions": questions,      # list of {text, model_answer, keywords, max_marks, min_words}
+        "question_refs": refs,       # question bank ids; get_exams() resolves them to "questions"
         "duration_minutes": duration_minutes,
         "created_at": time.time(),
         "published": True,
+        "version": 1,
     }
-    _save(EXAMS_FILE, exams)
-    return exams[eid]
+    with _locked(EXAMS_FILE):
+        _write_version(exam)
+        exams = _load(EXAMS_FILE)
+        exams[eid] = exam
+        _save(EXAMS_FILE, exams)
+        _feed.append("exams", eid, exam)
+    return _hydrate(exam)
 
 
-def get_exam(exam_id: str) -> Optional[dict]:
-    return get_exams().get(exam_id.upper())
+def get_exam(exam_id: str, version: Optional[int] = None) -> Optional[dict]:
+    """The exam as it is now, or as it was at `version`."""
+    exam_id = exam_id.upper()
+    exam = _replica.get("exams", exam_id)
+    if version is not None and exam and exam.get("version", 1) != version:
+        exam = _exam_version(exam_id, version)
+    return _hydrate(exam) if exam else None
 
 
-def get_teacher_exams(teacher_id: str) -> list:
-    return [e for e in get_exams().values() if e["teacher_id"] == teacher_id]
+def get_exams_by_ids(exam_ids) -> dict:
+    """Batch lookup: one replica sync for any number of ids."""
+    ids = {e.upper() for e in exam_ids}
+    if not ids:
+        return {}
+    exams = _replica.table("exams")
+    return {eid: _hydrate(exams[eid]) for eid in ids if eid in exams}
 
 
-def update_exam(exam_id: str, data: dict):
-    exams = get_exams()
-    if exam_id in exams:
-        exams[exam_id].update(data)
+def get_teacher_exams(teacher_id: str) -> list:
+    return [_hydrate(e) for e in _replica.group("exams", teacher_id)]
+
+
+def update_exam(exam_id: str, data: dict) -> Optional[dict]:
+    """Publish the next version of an exam with `data` applied. Earlier versions
+    stay readable through get_exam(exam_id, version)."""
+    data = {k: v for k, v in data.items() if k not in ("id", "version")}
+    if "questions" in data:
+        data["question_refs"] = put_questions([_question_entry(q) for q in data.pop("questions")])
+    with _locked(EXAMS_FILE):
+        exams = _load(EXAMS_FILE)
+        if exam_id not in exams:
+            return None
+        exam = dict(exams[exam_id])     # a new record: the stored versions are never mutated
+        if "question_refs" in data:
+            exam.pop("questions", None)
+        exam.update(data)
+        exam["version"] = exams[exam_id].get("version", 1) + 1
+        exam["updated_at"] = time.time()
+        _write_version(exam)
+        exams[exam_id] = exam
         _save(EXAMS_FILE, exams)
+        _feed.append("exams", exam_id, exam)
+    return _hydrate(exam)
 
 
 # ── SUBMISSIONS ───────────────────────────────────────────────────────────────
+# One shard per exam (submissions/<EXAM_ID>.json, {sid: submission}), so writes
+# for one exam never rewrite or lock another exam's history. _index.jsonl is an
+# append-only log of per-submission summaries (the fields below, no answers);
+# the last line for an id wins. It answers "which exam is this submission in"
+# and "what has this student submitted" without opening any shard; the change
+# feed replica keeps the same summaries in memory.
+SUMMARY_FIELDS = ("id", "exam_id", "exam_title", "exam_subject", "student_id",
+                  "total_score", "total_marks", "percentage", "submitted_at")
+
+
+def _shard_path(exam_id: str) -> Path:
+    if exam_id.isalnum():
+        return SUBMISSIONS_DIR / f"{exam_id}.json"
+    # never build a path from unexpected characters in a user-typed code
+    return SUBMISSIONS_DIR / f"_{hashlib.sha256(exam_id.encode()).hexdigest()[:16]}.json"
+
+
+def _summary(sub: dict) -> dict:
+    return {f: sub.get(f, "") for f in SUMMARY_FIELDS}
+
+
+def _index_append(subs: list):
+    raw = "".join(json.dumps(_summary(s), separators=(",", ":"), ensure_ascii=False) + "\n"
+                  for s in subs).encode()
+    with _locked(SUBMISSION_INDEX):
+        with open(SUBMISSION_INDEX, "ab") as f:
+            f.write(raw)
+        _feed.append_many(("submissions", s["id"], _summary(s)) for s in subs)
+    record_io("save", len(raw))
+
+
+def _index_scan(needle: str) -> dict:
+    """Latest summary per id among index lines containing `needle`."""
+    found, nbytes, key = {}, 0, needle.encode()
+    try:
+        with open(SUBMISSION_INDEX, "rb") as f:
+            for line in f:
+                nbytes += len(line)
+                if key in line:
+                    rec = json.loads(line)
+                    found[rec["id"]] = rec
+    except FileNotFoundError:
+        pass
+    record_io("load", nbytes)
+    return found
+
+
 def get_submissions() -> dict:
-    return _load(SUBMISSIONS_FILE)
+    """Every submission of every exam (migrations and maintenance only)."""
+    subs = {}
+    for shard in sorted(SUBMISSIONS_DIR.glob("*.json")):
+        subs.update(_load(shard))
+    return subs
 
 
 def save_submission(exam_id: str, student_id: str, student_name: str,
-                    results: list, total_score: float, total_marks: float) -> dict:
-    submissions = get_submissions()
+                    results: list, total_score: float, total_marks: float,
+                    exam_title: str = "", exam_subject: str = "",
+                    exam_version: Optional[int] = None) -> dict:
     sid = str(uuid.uuid4())[:8]
-    submissions[sid] = {
+    sub = {
         "id": sid,
         "exam_id": exam_id,
+        "exam_version": exam_version,   # the question set these results were graded against
+        "exam_title": exam_title,       # denormalized so result lists need no exam lookup
+        "exam_subject": exam_subject,
         "student_id": student_id,
         "student_name": student_name,
         "results": results,
-        "total_score": total_score,
+        "total_score": round(total_score, 2),
         "total_marks": total_marks,
         "percentage": round((total_score / total_marks * 100) if total_marks else 0, 1),
         "submitted_at": time.time(),
     }
-    _save(SUBMISSIONS_FILE, submissions)
-    return submissions[sid]
+    shard = _shard_path(exam_id)
+    with _locked(shard):
+        submissions = _load(shard)
+        submissions[sid] = sub
+        _save(shard, submissions)
+        stamp = exam_columns_stamp(exam_id)
+        columns.append(_columns_path(exam_id), sub)
+        score_index.apply(exam_id, stamp, exam_columns_stamp(exam_id), sid, sub["percentage"])
+        _index_append([sub])
+    return sub
 
 
 def get_exam_submissions(exam_id: str) -> list:
-    return [s for s in get_submissions().values() if s["exam_id"] == exam_id]
+    return list(iter_exam_submissions(exam_id))
+
+
+def iter_exam_submissions(exam_id: str):
+    """Yield an exam's submissions one at a time (for exports and other scans);
+    the shard is parsed incrementally, so memory does not grow with history."""
+    for _, s in _iter_load(_shard_path(exam_id)):
+        yield s
 
 
 def get_student_submissions(student_id: str) -> list:
-    return [s for s in get_submissions().values() if s["student_id"] == student_id]
+    """Summaries (SUMMARY_FIELDS, no per-answer results) of a student's submissions."""
+    return _replica.group("submissions", student_id)
 
 
 def get_submission(sid: str) -> Optional[dict]:
-    return get_submissions().get(sid)
+    summary = _replica.get("submissions", sid)
+    if not summary:
+        return None
+    for key, s in _iter_load(_shard_path(summary["exam_id"])):
+        if key == sid:
+            return s
+    return None
 
 
 def update_submission_score(sid: str, q_index: int, new_score: float):
     """Allow teacher to override a question score."""
-    submissions = get_submissions()
-    if sid not in submissions:
+    summary = _replica.get("submissions", sid)
+    if not summary:
         return
-    sub = submissions[sid]
-    sub["results"][q_index]["score"] = new_score
-    sub["results"][q_index]["overridden"] = True
-    # Recalculate total
-    sub["total_score"] = sum(r["score"] for r in sub["results"])
-    sub["percentage"] = round(
-        (sub["total_score"] / sub["total_marks"] * 100) if sub["total_marks"] else 0, 1
-    )
-    _save(SUBMISSIONS_FILE, submissions)
+    shard = _shard_path(summary["exam_id"])
+    with _locked(shard):
+        submissions = _load(shard)
+        if sid not in submissions:
+            return
+        sub = submissions[sid]
+        res = sub["results"][q_index]
+        if is_compact(res):
+            res["s"], res["ov"] = new_score, True
+        else:
+            res["score"], res["overridden"] = new_score, True
+        # Recalculate total
+        sub["total_score"] = round(sum(result_score(r) for r in sub["results"]), 2)
+        sub["percentage"] = round(
+            (sub["total_score"] / sub["total_marks"] * 100) if sub["total_marks"] else 0, 1
+        )
+        _save(shard, submissions)
+        stamp = exam_columns_stamp(sub["exam_id"])
+        columns.patch(_columns_path(sub["exam_id"]), sub)
+        score_index.apply(sub["exam_id"], stamp, exam_columns_stamp(sub["exam_id"]),
+                          sid, sub["percentage"])
+        _index_append([sub])
 
 
 def has_student_submitted(exam_id: str, student_id: str) -> bool:
-    return any(
-        s["exam_id"] == exam_id and s["student_id"] == student_id
-        for s in get_submissions().values()
-    )
+    return any(s["student_id"] == student_id for s in iter_exam_submissions(exam_id))
+
+
+def shard_submissions() -> int:
+    """Split a pre-sharding submissions.json into per-exam shards plus the index.
+    The old file is kept as submissions.json.migrated. Returns submissions moved."""
+    if not LEGACY_SUBMISSIONS_FILE.exists():
+        return 0
+    with _locked(LEGACY_SUBMISSIONS_FILE):
+        if not LEGACY_SUBMISSIONS_FILE.exists():
+            return 0    # another process got here first
+        legacy = _load(LEGACY_SUBMISSIONS_FILE)
+        by_exam = {}
+        for sub in legacy.values():
+            by_exam.setdefault(sub["exam_id"], []).append(sub)
+        SUBMISSIONS_DIR.mkdir(parents=True, exist_ok=True)
+        COMPACT_MARKER.unlink(missing_ok=True)    # legacy records need migrate_submissions again
+        for exam_id, subs in by_exam.items():
+            shard = _shard_path(exam_id)
+            with _locked(shard):
+                submissions = _load(shard)
+                submissions.update((s["id"], s) for s in subs)
+                _save(shard, submissions)
+        _index_append(list(legacy.values()))
+        LEGACY_SUBMISSIONS_FILE.rename(LEGACY_SUBMISSIONS_FILE.with_name("submissions.json.migrated"))
+    return len(legacy)
+
+
+# ── COLUMNAR SCORES ───────────────────────────────────────────────────────────
+def _columns_path(exam_id: str) -> Path:
+    return COLUMNS_DIR / f"{exam_id}.npz"
+
+
+def get_exam_columns(exam_id: str) -> dict:
+    """Score arrays for one exam (see columns.py); built from submissions on first use."""
+    cols = columns.load(_columns_path(exam_id))
+    if cols is None:
+        cols = rebuild_columns(exam_id)[exam_id]
+    return cols
+
+
+def exam_columns_stamp(exam_id: str) -> int:
+    """Changes whenever the exam's columns change (0 if not built yet)."""
+    return columns.stamp(_columns_path(exam_id))
+
+
+def get_score_index(exam_id: str) -> score_index.ScoreIndex:
+    """Rank / percentile / top-k index over the exam's submission percentages."""
+    stamp = exam_columns_stamp(exam_id)
+    index = score_index.cached(exam_id, stamp)
+    if index is None:
+        cols  = get_exam_columns(exam_id)
+        index = score_index.ScoreIndex(zip(cols["sid"].tolist(), cols["percentage"].tolist()))
+        # a write racing the load leaves the index tagged older than its data: rebuilt next time
+        score_index.store(exam_id, stamp or exam_columns_stamp(exam_id), index)
+    return index
+
+
+def rebuild_columns(exam_id: Optional[str] = None) -> dict:
+    """Regenerate the columnar files from the submission shards (all exams by default)."""
+    COLUMNS_DIR.mkdir(parents=True, exist_ok=True)
+    exams = get_exams()
+    built = {}
+    for eid in ([exam_id] if exam_id else exams):
+        exam = exams.get(eid)
+        with _locked(_shard_path(eid)):
+            built[eid] = columns.build(list(iter_exam_submissions(eid)),
+                                       len(exam["questions"]) if exam else 0)
+            columns.save(_columns_path(eid), built[eid])
+    return built
+
+
+def migrate_submissions() -> int:
+    """Rewrite submissions stored with full per-answer result dicts in the compact
+    format (see results.py), against the exam version each was graded on.
+    Returns the number of submissions converted. Once a pass finishes,
+    COMPACT_MARKER is written and later calls skip the scan."""
+    if COMPACT_MARKER.exists():
+        return 0
+    converted = 0
+    for shard in sorted(SUBMISSIONS_DIR.glob("*.json")):
+        with _locked(shard):
+            submissions = _load(shard)
+            pending = [s for s in submissions.values()
+                       if any(not is_compact(r) for r in s["results"])]
+            changed = 0
+            for sub in pending:
+                exam = get_exam(sub["exam_id"], sub.get("exam_version"))
+                if not exam:
+                    continue  # question data is gone; keep the self-contained legacy record
+                questions = exam["questions"]
+                sub["results"] = [
+                    r if is_compact(r) or i >= len(questions) else compact_legacy(r, questions[i])
+                    for i, r in enumerate(sub["results"])
+                ]
+                sub.setdefault("exam_title", exam["title"])
+                sub.setdefault("exam_subject", exam["subject"])
+                changed += 1
+            if changed:
+                _save(shard, submissions)
+                _index_append(pending)
+            converted += changed
+    COMPACT_MARKER.touch()
+    return converted
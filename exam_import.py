@@ -0,0 +1,159 @@
+"""
+Bulk exam import from CSV or JSON.
+
+CSV:  one question per row with a header of
+      text, model_answer, keywords, max_marks, min_words, keyword_mode, synonyms, max_tokens,
+      language
+      (keywords comma-separated inside the cell; the rest optional — keyword_mode
+      is "phrase" (default) or "any", see keyword_matcher.py; synonyms is
+      true/false and also accepts lexicon synonyms of keywords, see lexicon.py
+      (English only);
+      max_tokens caps the words graded per answer, 0/empty = default, and
+      language is a language pack code, "en" (default) or "es", see tokenizer.py)
+JSON: a list of question objects with the same fields, or an object
+      {"title", "subject", "duration_minutes", "questions": [...]}
+
+All rows are validated up front (every error is reported, not just the first),
+model answers and keywords are compiled into grading profiles in one pass,
+and the exam is written with a single create_exam call.
+
+CLI:  python exam_import.py questions.csv --teacher-email t@school.edu \\
+          --title "Biology Final" --subject Biology [--duration 60]
+"""
+
+import csv
+import io
+import json
+import sys
+from typing import List, Tuple
+
+from database import create_exam, get_user, init_store, with_profile
+from keyword_matcher import KEYWORD_MODES
+from tokenizer import LANGUAGES, SYNONYM_LANGUAGES
+
+DEFAULT_MARKS = 10
+MAX_QUESTIONS = 1000
+MAX_TOKENS_LIMIT = 100_000   # highest per-question word cap accepted
+DEFAULT_DURATION = 60
+MIN_DURATION, MAX_DURATION = 5, 180     # minutes, as the create-exam form allows
+
+
+def _keywords(value) -> List[str]:
+    if isinstance(value, list):
+        return [str(k).strip() for k in value if str(k).strip()]
+    return [k.strip() for k in str(value or "").split(",") if k.strip()]
+
+
+def parse_csv(data: bytes) -> List[dict]:
+    reader = csv.DictReader(io.StringIO(data.decode("utf-8-sig")))
+    return [{(k or "").strip().lower(): v for k, v in row.items()} for row in reader]
+
+
+def parse_json(data: bytes) -> Tuple[List[dict], dict]:
+    """Returns (question rows, exam metadata found in the file)."""
+    doc = json.loads(data.decode("utf-8-sig"))
+    if isinstance(doc, list):
+        return doc, {}
+    if isinstance(doc, dict) and isinstance(doc.get("questions"), list):
+        meta = {k: doc[k] for k in ("title", "subject", "duration_minutes") if k in doc}
+        return doc["questions"], meta
+    raise ValueError("JSON must be a list of questions or an object with a \"questions\" list.")
+
+
+def parse_file(name: str, data: bytes) -> Tuple[List[dict], dict]:
+    if name.lower().endswith(".json"):
+        return parse_json(data)
+    return parse_csv(data), {}
+
+
+def validate_questions(rows: List[dict]) -> Tuple[List[dict], List[str]]:
+    """Normalise rows into question dicts; returns (questions, error messages)."""
+    questions, errors = [], []
+    if not rows:
+        errors.append("No questions found in the file.")
+    if len(rows) > MAX_QUESTIONS:
+        errors.append(f"Too many questions ({len(rows)}); the limit is {MAX_QUESTIONS}.")
+    for n, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append(f"Question {n}: expected an object, got {type(row).__name__}."); continue
+        text  = str(row.get("text") or row.get("question") or "").strip()
+        model = str(row.get("model_answer") or row.get("answer") or "").strip()
+        if not text:
+            errors.append(f"Question {n}: missing question text.")
+        if not model:
+            errors.append(f"Question {n}: missing model answer.")
+        try:
+            marks = int(float(row.get("max_marks") or DEFAULT_MARKS))
+            min_w = int(float(row.get("min_words") or 0))
+            cap   = int(float(row.get("max_tokens") or 0))
+        except (TypeError, ValueError, OverflowError):
+            errors.append(f"Question {n}: max_marks, min_words and max_tokens must be numbers."); continue
+        if not 1 <= marks <= 100:
+            errors.append(f"Question {n}: max_marks must be between 1 and 100.")
+        if not 0 <= min_w <= 200:
+            errors.append(f"Question {n}: min_words must be between 0 and 200.")
+        if not 0 <= cap <= MAX_TOKENS_LIMIT:
+            errors.append(f"Question {n}: max_tokens must be between 0 and {MAX_TOKENS_LIMIT}.")
+        mode = str(row.get("keyword_mode") or "phrase").strip().lower()
+        if mode not in KEYWORD_MODES:
+            errors.append(f"Question {n}: keyword_mode must be one of {', '.join(KEYWORD_MODES)}.")
+        synonyms = str(row.get("synonyms") or "").strip().lower() in ("1", "true", "yes", "y")
+        language = str(row.get("language") or "en").strip().lower()
+        if language not in LANGUAGES:
+            errors.append(f"Question {n}: language must be one of {', '.join(LANGUAGES)}.")
+        elif synonyms and language not in SYNONYM_LANGUAGES:
+            errors.append(f"Question {n}: synonyms are only available for {', '.join(SYNONYM_LANGUAGES)}.")
+        questions.append({
+            "text": text, "model_answer": model, "keywords": _keywords(row.get("keywords")),
+            "max_marks": marks, "min_words": min_w, "keyword_mode": mode, "synonyms": synonyms,
+            "max_tokens": cap, "language": language,
+        })
+    return questions, errors
+
+
+def meta_duration(meta: dict) -> int:
+    """The file's duration_minutes clamped to MIN_DURATION..MAX_DURATION (default if not a number)."""
+    try:
+        minutes = int(float(meta.get("duration_minutes", DEFAULT_DURATION)))
+    except (TypeError, ValueError, OverflowError):
+        return DEFAULT_DURATION
+    return min(max(minutes, MIN_DURATION), MAX_DURATION)
+
+
+def compile_questions(questions: List[dict]) -> List[dict]:
+    """Tokenize / stem every model answer and keyword list once, up front."""
+    return [with_profile(q) for q in questions]
+
+
+def import_exam(teacher_id: str, title: str, subject: str, duration_minutes: int,
+                questions: List[dict]) -> dict:
+    return create_exam(teacher_id=teacher_id, title=title, subject=subject,
+                       questions=compile_questions(questions),
+                       duration_minutes=duration_minutes)
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Import an exam from a CSV or JSON question file.")
+    ap.add_argument("file")
+    ap.add_argument("--teacher-email", required=True)
+    ap.add_argument("--title")
+    ap.add_argument("--subject")
+    ap.add_argument("--duration", type=int)
+    args = ap.parse_args()
+
+    init_store()
+    teacher = get_user(args.teacher_email)
+    if not teacher or teacher["role"] != "teacher":
+        sys.exit(f"No teacher account for {args.teacher_email}")
+    with open(args.file, "rb") as f:
+        rows, meta = parse_file(args.file, f.read())
+    questions, errors = validate_questions(rows)
+    if errors:
+        sys.exit("\n".join(errors))
+    title = args.title or meta.get("title")
+    if not title:
+        sys.exit("An exam title is required (--title or \"title\" in the JSON file).")
+    exam = import_exam(teacher["id"], title, args.subject or meta.get("subject", ""),
+                       args.duration or meta_duration(meta), questions)
+    print(f"Imported {len(questions)} question(s). Exam code: {exam['id']}")
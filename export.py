@@ -0,0 +1,139 @@
+"""
+Streaming export of exam results.
+Rows are produced one submission at a time from database.iter_exam_submissions
+and written in fixed-size chunks, so memory stays bounded by the chunk size
+rather than the cohort size. CSV uses the stdlib; Parquet needs pyarrow
+(optional — `parquet_available()` tells the UI whether to offer it).
+
+CLI:  python export.py EXAM_ID out.csv|out.parquet [--chunk-size N]
+"""
+
+import csv
+import io
+import sys
+from itertools import islice
+from typing import BinaryIO, Iterable, Iterator, List
+
+from database import get_exam, iter_exam_submissions
+from results import is_compact
+
+CHUNK_SIZE  = 1000
+QUESTION_FIELDS = ("score", "semantic", "keyword", "coherence", "overridden")
+
+
+def columns_for(exam: dict) -> List[str]:
+    cols = ["submission_id", "student_id", "student_name", "submitted_at", "exam_version",
+            "total_score", "total_marks", "percentage"]
+    for i in range(len(exam["questions"])):
+        cols += [f"q{i+1}_{f}" for f in QUESTION_FIELDS]
+    return cols
+
+
+def _cells(res: dict) -> tuple:
+    if is_compact(res):
+        return res["s"], res["sim"], res["kw"], res["coh"], bool(res.get("ov", False))
+    return (res["score"], res["semantic_similarity"], res["keyword_score"],
+            res["coherence_score"], bool(res.get("overridden", False)))
+
+
+def iter_rows(exam: dict) -> Iterator[list]:
+    """One flat row per submission, in columns_for(exam) order."""
+    nq = len(exam["questions"])
+    for sub in iter_exam_submissions(exam["id"]):
+        row = [sub["id"], sub["student_id"], sub["student_name"], sub["submitted_at"],
+               sub.get("exam_version"), sub["total_score"], sub["total_marks"], sub["percentage"]]
+        results = sub["results"]
+        for i in range(nq):
+            row += _cells(results[i]) if i < len(results) else (None,) * len(QUESTION_FIELDS)
+        yield row
+
+
+def iter_chunks(rows: Iterable[list], chunk_size: int = CHUNK_SIZE) -> Iterator[List[list]]:
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# ── Writers ───────────────────────────────────────────────────────────────────
+def write_csv(exam: dict, out: BinaryIO, chunk_size: int = CHUNK_SIZE) -> int:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns_for(exam))
+    n = 0
+    for chunk in iter_chunks(iter_rows(exam), chunk_size):
+        writer.writerows(chunk)
+        out.write(buf.getvalue().encode())
+        buf.seek(0); buf.truncate()
+        n += len(chunk)
+    if buf.tell():  # header only: no submissions
+        out.write(buf.getvalue().encode())
+    return n
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _parquet_schema(exam: dict):
+    import pyarrow as pa
+    fields = [("submission_id", pa.string()), ("student_id", pa.string()),
+              ("student_name", pa.string()), ("submitted_at", pa.float64()),
+              ("exam_version", pa.int64()), ("total_score", pa.float64()), ("total_marks", pa.float64()),
+              ("percentage", pa.float64())]
+    for i in range(len(exam["questions"])):
+        fields += [(f"q{i+1}_{f}", pa.bool_() if f == "overridden" else pa.float64())
+                   for f in QUESTION_FIELDS]
+    return pa.schema(fields)
+
+
+def write_parquet(exam: dict, out: BinaryIO, chunk_size: int = CHUNK_SIZE) -> int:
+    """One Parquet row group per chunk."""
+    if not parquet_available():
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema(exam)
+    n = 0
+    with pq.ParquetWriter(out, schema) as writer:
+        for chunk in iter_chunks(iter_rows(exam), chunk_size):
+            table = pa.Table.from_arrays(
+                [pa.array(col, type=schema.field(i).type) for i, col in enumerate(zip(*chunk))],
+                schema=schema,
+            )
+            writer.write_table(table)
+            n += len(chunk)
+    return n
+
+
+WRITERS = {"csv": write_csv, "parquet": write_parquet}
+
+
+def export_exam(exam_id: str, out: BinaryIO, fmt: str = "csv",
+                chunk_size: int = CHUNK_SIZE) -> int:
+    """Write all results of an exam to `out`; returns the number of rows written."""
+    exam = get_exam(exam_id)
+    if not exam:
+        raise KeyError(f"Unknown exam: {exam_id}")
+    return WRITERS[fmt](exam, out, chunk_size)
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Export an exam's results.")
+    ap.add_argument("exam_id")
+    ap.add_argument("output", help="file ending in .csv or .parquet")
+    ap.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = ap.parse_args()
+    fmt = "parquet" if args.output.endswith(".parquet") else "csv"
+    with open(args.output, "wb") as f:
+        rows = export_exam(args.exam_id.upper(), f, fmt, args.chunk_size)
+    print(f"Wrote {rows} row(s) to {args.output}", file=sys.stderr)
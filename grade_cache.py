@@ -0,0 +1,207 @@
+"""
+Persistent grading result cache.
+
+grade_answer is deterministic for a given grader configuration, question and
+answer text, so its result components are kept in a SQLite file under data/
+keyed by a digest of
+
+  - the grader config: weights, the language pack's digest (stop words and
+    stemmer rules), stemmer and profile versions, keyword mode, min_words and
+    the answer word cap
+  - the question: its question bank content hash plus the compiled keyword
+    digest (which also changes when the synonym lexicon does)
+  - the answer text
+
+Editing one question therefore only invalidates that question's entries, and
+re-grading an unchanged cohort is a lookup per answer. Feedback text is not
+stored; it is rendered from the cached reason codes on every hit, so wording
+changes apply immediately.
+
+Each entry carries a last-used stamp. When the cached values grow past
+max_bytes the least recently used entries are evicted down to LOW_WATER of it.
+The file is opened in WAL mode so several server processes can share it.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from database import DATA_DIR, question_hash, with_profile
+from grader import DEFAULT_WEIGHTS, PROFILE_VERSION, STEMMER_VERSION, grade_answer, render_feedback
+from tokenizer import cap_for, get_pack
+
+CACHE_FILE = DATA_DIR / "grade_cache.sqlite"
+MAX_BYTES  = 64 * 1024 * 1024
+LOW_WATER  = 0.9
+TOUCH_BATCH = 256   # last-used stamps of hits are written in batches
+
+@lru_cache(maxsize=256)
+def config_hash(weights: Tuple[float, float, float] = DEFAULT_WEIGHTS,
+                keyword_mode: str = "any", min_words: int = 0, max_tokens: int = 0,
+                language: str = "en") -> str:
+    canonical = json.dumps([[float(w) for w in weights], get_pack(language).digest, STEMMER_VERSION,
+                            PROFILE_VERSION, keyword_mode, int(min_words), cap_for(max_tokens)],
+                           separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def result_key(question: dict, student_answer: str,
+               weights: Tuple[float, float, float] = DEFAULT_WEIGHTS) -> bytes:
+    """Cache key for grading `student_answer` against a profiled question."""
+    config = config_hash(weights, question.get("keyword_mode", "any"), question.get("min_words", 0),
+                         question.get("max_tokens", 0), question.get("language") or "en")
+    answer = hashlib.sha256(student_answer.encode()).hexdigest()
+    parts  = "\0".join((config, question_hash(question), question["profile"]["kw_key"], answer))
+    return hashlib.sha256(parts.encode()).digest()[:16]
+
+
+class GradeCache:
+    """Size-bounded LRU map from result_key() to grade_answer() result components."""
+
+    def __init__(self, path: Path = CACHE_FILE, max_bytes: int = MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False,
+                                   isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS grades ("
+                         "key BLOB PRIMARY KEY, value TEXT NOT NULL, "
+                         "size INTEGER NOT NULL, used REAL NOT NULL) WITHOUT ROWID")
+        self._db.execute("CREATE INDEX IF NOT EXISTS grades_used ON grades(used)")
+        self._lock  = threading.Lock()
+        self._bytes = self._total_bytes()
+        self._touched: Dict[bytes, float] = {}
+        self.hits = self.misses = 0
+
+    def _total_bytes(self) -> int:
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM grades").fetchone()[0]
+
+    def get(self, key: bytes) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM grades WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._touched[key] = time.time()
+            if len(self._touched) >= TOUCH_BATCH:
+                self._flush_touches()
+            self.hits += 1
+        result = json.loads(row[0])
+        result["feedback"] = render_feedback(result["feedback_codes"], result["missed_keywords"])
+        return result
+
+    def _flush_touches(self):
+        self._write(lambda db: db.executemany("UPDATE grades SET used = ? WHERE key = ?",
+                                              [(t, k) for k, t in self._touched.items()]))
+        self._touched.clear()
+
+    def _write(self, fn):
+        """Run fn(db) in a write transaction. BEGIN IMMEDIATE takes the write lock
+        up front (waiting out other processes for `timeout`) instead of failing a
+        read-to-write upgrade, and a failure rolls back so the connection is not
+        left inside an open transaction."""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            out = fn(self._db)
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        return out
+
+    def put(self, key: bytes, result: dict):
+        value = json.dumps({k: v for k, v in result.items() if k != "feedback"},
+                           separators=(",", ":"), ensure_ascii=False)
+        with self._lock:
+            def replace(db):
+                old = db.execute("SELECT size FROM grades WHERE key = ?", (key,)).fetchone()
+                db.execute("INSERT OR REPLACE INTO grades VALUES (?, ?, ?, ?)",
+                           (key, value, len(value), time.time()))
+                return old
+            old = self._write(replace)
+            self._bytes += len(value) - (old[0] if old else 0)   # a re-grade replaces its row
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is under LOW_WATER * max_bytes."""
+        self._flush_touches()
+        total  = self._total_bytes()    # other processes write to the same file
+        target = int(self.max_bytes * LOW_WATER)
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM grades ORDER BY used").fetchall():
+            if total <= target:
+                break
+            doomed.append((key,))
+            total -= size
+        self._write(lambda db: db.executemany("DELETE FROM grades WHERE key = ?", doomed))
+        self._bytes = total
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM grades")
+            self._touched.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM grades").fetchone()[0]
+        return {"entries": entries, "bytes": self._bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses}
+
+
+_caches: Dict[Path, GradeCache] = {}
+_lock = threading.Lock()
+
+
+def get_cache(path: Path = CACHE_FILE) -> GradeCache:
+    """One shared GradeCache per file in this process."""
+    cache = _caches.get(path)
+    if cache is None:
+        with _lock:
+            cache = _caches.get(path) or _caches.setdefault(path, GradeCache(path))
+    return cache
+
+
+def cached_grade(student_answer: str, question: dict,
+                 weights: Tuple[float, float, float] = DEFAULT_WEIGHTS,
+                 cache: Optional[GradeCache] = None) -> dict:
+    """grade_answer() for a question dict, served from the cache when possible."""
+    cache    = cache or get_cache()
+    question = with_profile(question)
+    key      = result_key(question, student_answer, weights)
+    result   = cache.get(key)
+    if result is None:
+        result = grade_answer(
+            student_answer=student_answer,
+            model_answer=question["model_answer"],
+            keywords=question.get("keywords", []),
+            max_marks=question["max_marks"],
+            min_words=question.get("min_words", 0),
+            weights=weights,
+            profile=question["profile"],
+            keyword_mode=question.get("keyword_mode", "any"),
+            max_tokens=question.get("max_tokens", 0),
+        )
+        cache.put(key, result)
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Inspect or clear the grading result cache.")
+    ap.add_argument("--clear", action="store_true")
+    args = ap.parse_args()
+    cache = get_cache()
+    if args.clear:
+        cache.clear()
+    s = cache.stats()
+    print(f"{cache.path}: {s['entries']} entries, {s['bytes'] / 1024:.0f} KiB "
+          f"of {s['max_bytes'] / 1024 / 1024:.0f} MiB")
@@ -6,44 +6,36 @@ Edge cases handled:
   - Short model answers (e.g. "hospital"): coherence threshold scales to model length
   - Exact / near-exact match: always gives full marks
   - Empty student answer: always 0
+  - Huge answers: only the first max_tokens words are graded, in chunks (tokenizer.py)
+
+Tokenizing, stop words and stemming come from the question's language pack
+(tokenizer.py); the module-level helpers default to English.
 """
 
-import re
 import math
+import json
+import hashlib
+from itertools import chain, islice, product
 from typing import List, Tuple
 
-STOP_WORDS = {
-    "a","an","the","is","it","in","on","at","to","for","of","and","or","but",
-    "not","with","this","that","are","was","be","been","being","have","has",
-    "had","do","does","did","will","would","can","could","should","may","might",
-    "shall","from","by","as","so","if","then","than","there","their","they",
-    "we","our","us","you","your","he","she","his","her","its","my","me","i",
-    "am","were","also","into","which","who","what","when","where","how","all",
-    "each","both","more","most","other","some","such","no","only","same","up",
-    "out","about","above","after","before","between","through","during","while",
-    "although","because","since","any","these","those",
-}
+from keyword_matcher import matcher_for
+from tokenizer import ENGLISH, cap_for, get_pack, iter_chunks, truncate
+
+STOP_WORDS = ENGLISH.stop_words
+
+def preprocess(text: str, language: str = "en") -> List[str]:
+    return get_pack(language).tokens(text)
 
-def preprocess(text: str) -> List[str]:
-    text = text.lower().strip()
-    text = re.sub(r"[^\w\s]", " ", text)
-    tokens = text.split()
-    return [t for t in tokens if t not in STOP_WORDS and len(t) > 1]
+STEMMER_VERSION = 1   # bump whenever a pack's stem_word logic changes (rules are in its digest)
 
 def simple_stem(word: str) -> str:
-    for suffix in ["ation","ations","ing","ings","tion","tions","ness",
-                   "ment","ments","ers","ies","es","ed","ly","s"]:
-        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
-            return word[: -len(suffix)]
-    return word
+    return ENGLISH.stem_word(word)
 
-def stem_tokens(tokens: List[str]) -> List[str]:
-    return [simple_stem(t) for t in tokens]
+def stem_tokens(tokens: List[str], language: str = "en") -> List[str]:
+    return get_pack(language).stem_tokens(tokens)
 
-def normalize(text: str) -> str:
-    return re.sub(r"\s+", " ", text.lower().strip().translate(
-        str.maketrans("", "", ".,!?;:'\"")
-    ))
+def normalize(text: str, language: str = "en") -> str:
+    return get_pack(language).normalize(text)
 
 def _tf(tokens):
     d = {}
@@ -55,7 +47,9 @@ def _tf(tokens):
 def cosine_similarity(tokens_a: List[str], tokens_b: List[str]) -> float:
     if not tokens_a or not tokens_b:
         return 0.0
-    tfa, tfb = _tf(tokens_a), _tf(tokens_b)
+    return _cosine(_tf(tokens_a), _tf(tokens_b))
+
+def _cosine(tfa: dict, tfb: dict) -> float:
     vocab = set(tfa) | set(tfb)
     dot = sum(tfa.get(w, 0) * tfb.get(w, 0) for w in vocab)
     ma = math.sqrt(sum(v**2 for v in tfa.values()))
@@ -64,26 +58,21 @@ def cosine_similarity(tokens_a: List[str], tokens_b: List[str]) -> float:
         return 0.0
     return dot / (ma * mb)
 
-def keyword_score(student: str, keywords: List[str]) -> Tuple[float, List[str], List[str]]:
+def _keyword_result(found: set, keywords: List[str]) -> Tuple[float, List[str], List[str]]:
     if not keywords:
         return 1.0, [], []
-    student_stems = set(stem_tokens(preprocess(student)))
-    student_raw   = set(normalize(student).split())
-    matched, missed = [], []
-    for kw in keywords:
-        kw_stems = set(stem_tokens(preprocess(kw)))
-        kw_raw   = set(normalize(kw).split())
-        if (kw_stems and (kw_stems & student_stems)) or (kw_raw and (kw_raw & student_raw)):
-            matched.append(kw)
-        else:
-            missed.append(kw)
-    total = len(matched) + len(missed)
-    return (len(matched) / total if total else 1.0), matched, missed
+    matched = [kw for i, kw in enumerate(keywords) if i in found]
+    missed  = [kw for i, kw in enumerate(keywords) if i not in found]
+    return len(matched) / len(keywords), matched, missed
 
-def coherence_score(student: str, model: str, teacher_min_words: int = 15) -> float:
-    """Length-aware coherence: never penalises concise answers when model answer is also concise."""
-    student_len = len([w for w in student.split() if w.strip()])
-    model_len   = len([w for w in model.split()   if w.strip()])
+def keyword_score(student: str, keywords: List[str], mode: str = "any",
+                  language: str = "en") -> Tuple[float, List[str], List[str]]:
+    pack = get_pack(language)
+    matcher = matcher_for(compile_question("", keywords, language=language), mode)
+    found = matcher.match(pack.stems(student), pack.words(student))
+    return _keyword_result(found, keywords)
+
+def _coherence(student_len: int, model_len: int, teacher_min_words: int) -> float:
     # Effective minimum = never more than model answer length
     effective_min = min(teacher_min_words, max(model_len, 1))
     if student_len == 0:
@@ -92,79 +81,192 @@ def coherence_score(student: str, model: str, teacher_min_words: int = 15) -> fl
         return 1.0
     return round(student_len / effective_min, 2)
 
-def overlap_ratio(student: str, model: str) -> float:
-    s_tokens = set(stem_tokens(preprocess(student)))
-    m_tokens = set(stem_tokens(preprocess(model)))
+def coherence_score(student: str, model: str, teacher_min_words: int = 15) -> float:
+    """Length-aware coherence: never penalises concise answers when model answer is also concise."""
+    return _coherence(len(student.split()), len(model.split()), teacher_min_words)
+
+def _overlap(s_tokens: set, m_tokens: set) -> float:
     if not m_tokens:
         return 1.0
     if not s_tokens:
         return 0.0
     return len(s_tokens & m_tokens) / len(m_tokens)
 
-def is_exact_match(student: str, model: str) -> bool:
-    return normalize(student) == normalize(model)
+def overlap_ratio(student: str, model: str, language: str = "en") -> float:
+    pack = get_pack(language)
+    return _overlap(set(pack.stems(student)), set(pack.stems(model)))
 
-def generate_feedback(sim, kw_sc, coh, missed_kw, final_pct, exact=False):
+def is_exact_match(student: str, model: str, language: str = "en") -> bool:
+    pack = get_pack(language)
+    return pack.normalize(student) == pack.normalize(model)
+
+# ── Compiled question profiles ───────────────────────────────────────────────
+# Everything grade_answer derives from the model answer and keywords, computed
+# once when the exam is created instead of on every graded answer.
+PROFILE_VERSION = 2
+MAX_SYNONYM_VARIANTS = 16   # per keyword; caps the word-by-word product for phrases
+
+def synonym_variants(keyword: str, language: str = "en") -> List[List[str]]:
+    """Stemmed alternatives of a keyword built from the pack's lexicon (lexicon.py);
+    none for a language without one."""
+    from lexicon import get_lexicon
+    pack  = get_pack(language)
+    if not pack.lexicon:
+        return []
+    lex   = get_lexicon(pack.lexicon)
+    words = pack.words(keyword)
+    own   = pack.stems(keyword)
+    variants = []
+    for combo in islice(product(*[[w] + lex.synonyms(w) for w in words]), MAX_SYNONYM_VARIANTS + 1):
+        stems = pack.stems(" ".join(combo))
+        if stems and stems != own and stems not in variants:
+            variants.append(stems)
+    return variants[:MAX_SYNONYM_VARIANTS]
+
+def compile_question(model_answer: str, keywords: List[str], synonyms: bool = False,
+                     language: str = "en") -> dict:
+    pack     = get_pack(language)
+    kw_stems = [pack.stems(k) for k in keywords]
+    kw_raw   = [pack.words(k) for k in keywords]
+    kw_alt   = [synonym_variants(k, pack.code) for k in keywords] if synonyms else []
+    kw_key   = hashlib.sha256(json.dumps([kw_stems, kw_raw, kw_alt]).encode()).hexdigest()[:16]
+    return {
+        "v": PROFILE_VERSION,
+        "model_stems": pack.stems(model_answer),
+        "model_norm": pack.normalize(model_answer),
+        "model_words": len(model_answer.split()),
+        "kw_stems": kw_stems,
+        "kw_raw": kw_raw,
+        "kw_alt": kw_alt,       # synonym expansions, matched like the keyword itself
+        "syn": synonyms,
+        "lang": pack.code,      # language pack everything above was tokenized with
+        "kw_key": kw_key,       # identifies the compiled keyword matcher (keyword_matcher.py)
+    }
+
+# Feedback is stored as reason codes and rendered to text only when displayed.
+FEEDBACK_TEXT = {
+    "none":      "❌ No answer was provided.",
+    "exact":     "✅ Perfect answer! Your response matches the expected answer exactly.",
+    "excellent": "✅ Excellent answer! You addressed all key points effectively.",
+    "good":      "👍 Good answer. You covered the main concepts well.",
+    "partial":   "⚠️ Partial credit. Your answer is relevant but could be more complete.",
+    "poor":      "❌ Your answer does not sufficiently address the question.",
+    "off_topic": "Your response seems off-topic compared to the expected answer.",
+    "imprecise": "The core concept is partially addressed but could be more precise.",
+    "brief":     "Your answer is too brief — please elaborate.",
+    "expand":    "Consider expanding your answer with more detail.",
+    "truncated": "✂️ Your answer was longer than this question's word limit; only the first part was graded.",
+}
+
+def feedback_codes(sim, kw_sc, coh, missed_kw, final_pct, exact=False, truncated=False) -> List[str]:
     if exact:
-        return "✅ Perfect answer! Your response matches the expected answer exactly."
-    parts = []
+        return ["exact"]
     if final_pct >= 0.90:
-        parts.append("✅ Excellent answer! You addressed all key points effectively.")
+        codes = ["excellent"]
     elif final_pct >= 0.70:
-        parts.append("👍 Good answer. You covered the main concepts well.")
+        codes = ["good"]
     elif final_pct >= 0.45:
-        parts.append("⚠️ Partial credit. Your answer is relevant but could be more complete.")
+        codes = ["partial"]
     else:
-        parts.append("❌ Your answer does not sufficiently address the question.")
+        codes = ["poor"]
     if sim < 0.30:
-        parts.append("Your response seems off-topic compared to the expected answer.")
+        codes.append("off_topic")
     elif sim < 0.50:
-        parts.append("The core concept is partially addressed but could be more precise.")
+        codes.append("imprecise")
     if missed_kw:
-        kw_list = ", ".join(f'"{k}"' for k in missed_kw[:4])
-        parts.append(f"Missing key concept(s): {kw_list}.")
+        codes.append("missing_kw")
     if coh < 0.5:
-        parts.append("Your answer is too brief — please elaborate.")
+        codes.append("brief")
     elif coh < 1.0:
-        parts.append("Consider expanding your answer with more detail.")
-    return " ".join(parts)
+        codes.append("expand")
+    if truncated:
+        codes.append("truncated")
+    return codes
+
+def render_feedback(codes: List[str], missed_kw: List[str]) -> str:
+    parts = []
+    for code in codes:
+        if code == "missing_kw":
+            kw_list = ", ".join(f'"{k}"' for k in missed_kw[:4])
+            parts.append(f"Missing key concept(s): {kw_list}.")
+        else:
+            parts.append(FEEDBACK_TEXT.get(code, ""))
+    return " ".join(p for p in parts if p)
+
+def generate_feedback(sim, kw_sc, coh, missed_kw, final_pct, exact=False):
+    return render_feedback(feedback_codes(sim, kw_sc, coh, missed_kw, final_pct, exact), missed_kw)
+
+DEFAULT_WEIGHTS = (0.50, 0.30, 0.20)   # semantic, keyword, coherence
+
+def _scan_answer(chunks, profile: dict, keyword_mode: str):
+    """One pass over an answer's chunks: (stem counts, stem total, matched keyword
+    ids, word count). Memory is bounded by one chunk plus the vocabulary."""
+    matcher = matcher_for(profile, keyword_mode)
+    pack    = get_pack(profile.get("lang", "en"))
+    counts, found = {}, set()
+    n_stems = n_words = s_node = r_node = 0
+    for chunk in chunks:
+        stems = pack.stems(chunk)
+        for t in stems:
+            counts[t] = counts.get(t, 0) + 1
+        n_stems += len(stems)
+        n_words += len(chunk.split())
+        s_node = matcher.stems.scan(stems, found, s_node)
+        if len(found) < matcher.n_keywords:
+            r_node = matcher.raw.scan(pack.words(chunk), found, r_node)
+    return counts, n_stems, found, n_words
 
 def grade_answer(student_answer: str, model_answer: str,
                  keywords: List[str], max_marks: float,
                  min_words: int = 15,
-                 weights: Tuple[float,float,float] = (0.50, 0.30, 0.20)) -> dict:
+                 weights: Tuple[float,float,float] = DEFAULT_WEIGHTS,
+                 profile: dict = None, keyword_mode: str = "any",
+                 max_tokens: int = 0) -> dict:
 
     w_sem, w_kw, w_coh = weights
 
-    if not student_answer.strip() or student_answer.strip() == "(no answer)":
+    # everything below sees at most max_tokens words (DEFAULT_MAX_TOKENS if 0)
+    text, truncated = truncate(student_answer, cap_for(max_tokens))
+
+    if not text or text.isspace() or (len(text) < 64 and text.strip() == "(no answer)"):
         return {
             "score": 0.0, "max_marks": max_marks, "percentage": 0.0,
             "semantic_similarity": 0.0, "keyword_score": 0.0, "coherence_score": 0.0,
             "matched_keywords": [], "missed_keywords": keywords,
-            "feedback": "❌ No answer was provided.",
+            "feedback": FEEDBACK_TEXT["none"], "feedback_codes": ["none"], "truncated": False,
         }
 
-    exact = is_exact_match(student_answer, model_answer)
+    if not profile or profile.get("v") != PROFILE_VERSION:
+        profile = compile_question(model_answer, keywords)
+
+    # an answer of more than one chunk is far longer than any model answer: never exact
+    chunks = iter_chunks(text)
+    first  = next(chunks)
+    second = next(chunks, None)
+    exact  = (not truncated and second is None
+              and get_pack(profile.get("lang", "en")).normalize(first) == profile["model_norm"])
     if exact:
         return {
             "score": max_marks, "max_marks": max_marks, "percentage": 100.0,
             "semantic_similarity": 1.0, "keyword_score": 1.0, "coherence_score": 1.0,
             "matched_keywords": keywords, "missed_keywords": [],
-            "feedback": "✅ Perfect answer! Your response matches the expected answer exactly.",
+            "feedback": FEEDBACK_TEXT["exact"], "feedback_codes": ["exact"], "truncated": False,
         }
 
-    sa_tokens = stem_tokens(preprocess(student_answer))
-    ma_tokens = stem_tokens(preprocess(model_answer))
-    sim = cosine_similarity(sa_tokens, ma_tokens)
-    ov  = overlap_ratio(student_answer, model_answer)
+    rest = chain([first], chunks if second is None else chain([second], chunks))
+    counts, n_stems, found, n_words = _scan_answer(rest, profile, keyword_mode)
+    ma_tokens = profile["model_stems"]
+    sim = _cosine({t: c / n_stems for t, c in counts.items()}, _tf(ma_tokens)) \
+        if counts and ma_tokens else 0.0
+    ov  = _overlap(counts.keys(), set(ma_tokens))
     sim = max(sim, ov * 0.95)
 
-    kw_sc, matched_kw, missed_kw = keyword_score(student_answer, keywords)
-    coh = coherence_score(student_answer, model_answer, min_words)
+    kw_sc, matched_kw, missed_kw = _keyword_result(found, keywords)
+    coh = _coherence(n_words, profile["model_words"], min_words)
 
     final_pct = min((sim * w_sem) + (kw_sc * w_kw) + (coh * w_coh), 1.0)
     score = round(final_pct * max_marks, 2)
-    feedback = generate_feedback(sim, kw_sc, coh, missed_kw, final_pct, exact)
+    codes = feedback_codes(sim, kw_sc, coh, missed_kw, final_pct, exact, truncated)
 
     return {
         "score": score, "max_marks": max_marks,
@@ -174,5 +276,7 @@ def grade_answer(student_answer: str, model_answer: str,
         "coherence_score": round(coh, 3),
         "matched_keywords": matched_kw,
         "missed_keywords": missed_kw,
-        "feedback": feedback,
+        "feedback": render_feedback(codes, missed_kw),
+        "feedback_codes": codes,
+        "truncated": truncated,
     }
@@ -0,0 +1,351 @@
+"""
+Local grading HTTP service.
+
+A small asyncio HTTP/1.1 server (stdlib only) exposing the grading engine to
+other systems — an LMS, batch jobs — with grade_answer semantics:
+
+  POST /grade       {"question": {...}, "answer": "..."}            -> result
+  POST /grade/bulk  {"question": {...}, "answers": ["...", ...]}     -> {"results": [...]}
+                    or {"items": [{"question": {...}, "answer": "..."}, ...]}
+  GET  /stats       queue depth, batches, latency percentiles
+
+A question is either inline ({"model_answer", "keywords", "max_marks",
+"min_words", "keyword_mode", "synonyms", "max_tokens", "language"}) or a stored one
+({"exam_id": "AB12CD", "index": 0}, plus an optional "version" to grade
+against an earlier version of the exam). An optional "weights" triple
+overrides the default blend.
+
+Concurrent answers to the same question (and weights) are coalesced into one
+micro-batch: the first answer opens a window of BATCH_WINDOW_MS, and the batch
+is sent when the window closes or MAX_BATCH answers are waiting. Each batch is
+graded in a worker process, so the event loop only parses requests and the
+question profile is shipped to the worker once per batch, not once per answer.
+
+CLI:  python grading_service.py [--host 127.0.0.1] [--port 8502] [--workers N]
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from database import get_exam, question_hash, with_profile
+from grader import DEFAULT_WEIGHTS, grade_answer
+from profiler import percentile
+from tokenizer import LANGUAGES, SYNONYM_LANGUAGES
+
+BATCH_WINDOW_MS = 3
+MAX_BATCH       = 256
+MAX_BODY        = 16 * 1024 * 1024
+LATENCY_SAMPLES = 10000
+MAX_QUESTIONS   = 4096      # compiled inline questions kept between requests
+
+
+class RequestError(Exception):
+    """Bad client input; reported as HTTP 400."""
+
+
+def grade_batch(question: dict, answers: List[str], weights: Tuple[float, float, float]) -> List[dict]:
+    """Worker-side: grade many answers to one profiled question."""
+    return [grade_answer(
+        student_answer=answer,
+        model_answer=question["model_answer"],
+        keywords=question.get("keywords", []),
+        max_marks=question["max_marks"],
+        min_words=question.get("min_words", 0),
+        weights=weights,
+        profile=question["profile"],
+        keyword_mode=question.get("keyword_mode", "any"),
+        max_tokens=question.get("max_tokens", 0),
+    ) for answer in answers]
+
+
+_questions: Dict[str, dict] = {}     # question_hash -> question with profile
+
+
+def resolve_question(spec) -> dict:
+    """Inline or stored question -> question dict with a compiled profile."""
+    if not isinstance(spec, dict):
+        raise RequestError("\"question\" must be an object")
+    if "exam_id" in spec:
+        try:
+            version = None if spec.get("version") is None else int(spec["version"])
+        except (TypeError, ValueError):
+            raise RequestError("version must be a number")
+        exam = get_exam(str(spec["exam_id"]).upper(), version)
+        if not exam:
+            raise RequestError(f"unknown exam {spec['exam_id']!r}"
+                               + ("" if version is None else f" version {version}"))
+        try:
+            index = int(spec.get("index", 0))
+        except (TypeError, ValueError):
+            raise RequestError("question index must be a number")
+        if not 0 <= index < len(exam["questions"]):
+            raise RequestError("question index out of range")
+        return exam["questions"][index]
+    if not str(spec.get("model_answer", "")).strip():
+        raise RequestError("question needs a model_answer")
+    try:
+        question = {
+            "text": str(spec.get("text", "")),
+            "model_answer": str(spec["model_answer"]),
+            "keywords": [str(k) for k in spec.get("keywords", [])],
+            "max_marks": float(spec.get("max_marks", 10)),
+            "min_words": int(spec.get("min_words", 0)),
+            "keyword_mode": str(spec.get("keyword_mode", "any")),
+            "synonyms": bool(spec.get("synonyms", False)),
+            "max_tokens": int(spec.get("max_tokens", 0)),
+            "language": str(spec.get("language") or "en"),
+        }
+    except (TypeError, ValueError):
+        raise RequestError("max_marks, min_words and max_tokens must be numbers")
+    if question["keyword_mode"] not in ("any", "phrase"):
+        raise RequestError("keyword_mode must be \"any\" or \"phrase\"")
+    if question["language"] not in LANGUAGES:
+        raise RequestError(f"language must be one of {', '.join(LANGUAGES)}")
+    if question["synonyms"] and question["language"] not in SYNONYM_LANGUAGES:
+        raise RequestError(f"synonyms are only available for {', '.join(SYNONYM_LANGUAGES)}")
+    key = question_hash(question)
+    compiled = _questions.get(key)
+    if compiled is None:
+        if len(_questions) >= MAX_QUESTIONS:
+            _questions.clear()
+        compiled = _questions[key] = with_profile(question)
+    return compiled
+
+
+def _weights(body: dict) -> Tuple[float, float, float]:
+    w = body.get("weights", DEFAULT_WEIGHTS)
+    try:
+        w = tuple(float(x) for x in w)
+    except (TypeError, ValueError):
+        raise RequestError("weights must be three numbers")
+    if len(w) != 3:
+        raise RequestError("weights must be three numbers")
+    return w
+
+
+# ── Micro-batching ────────────────────────────────────────────────────────────
+class Batcher:
+    """Coalesces answers per (question, weights) and grades each batch in the pool."""
+
+    def __init__(self, pool: ProcessPoolExecutor, window_ms: float = BATCH_WINDOW_MS,
+                 max_batch: int = MAX_BATCH):
+        self.pool = pool
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending: Dict[tuple, Tuple[dict, list]] = {}
+        self._timers: Dict[tuple, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()     # the loop only keeps weak references to tasks
+        self.queued = 0             # answers waiting for a batch to be sent
+        self.in_flight = 0          # answers inside the worker pool
+        self.batches = 0
+        self.graded = 0
+        self.batch_sizes: deque = deque(maxlen=LATENCY_SAMPLES)
+
+    async def grade(self, question: dict, answers: List[str], weights) -> List[dict]:
+        loop = asyncio.get_running_loop()
+        key = (question_hash(question), question["profile"]["kw_key"], weights)
+        futures = [loop.create_future() for _ in answers]
+        if key not in self._pending:
+            self._pending[key] = (question, [])
+            self._timers[key] = loop.call_later(self.window, self._flush, key)
+        batch = self._pending[key][1]
+        batch.extend(zip(answers, futures))
+        self.queued += len(answers)
+        if len(batch) >= self.max_batch:
+            self._timers.pop(key).cancel()
+            self._flush(key)
+        return list(await asyncio.gather(*futures))
+
+    def _flush(self, key: tuple):
+        self._timers.pop(key, None)
+        question, items = self._pending.pop(key)
+        for start in range(0, len(items), self.max_batch):
+            task = asyncio.ensure_future(self._run(question, items[start:start + self.max_batch], key[2]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, question: dict, items: list, weights):
+        n = len(items)
+        self.queued -= n
+        self.in_flight += n
+        self.batches += 1
+        self.batch_sizes.append(n)
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.pool, grade_batch, question, [a for a, _ in items], weights)
+        except Exception as e:
+            for _, fut in items:
+                if not fut.done():
+                    fut.set_exception(e)
+        else:
+            for (_, fut), res in zip(items, results):
+                if not fut.done():
+                    fut.set_result(res)
+            self.graded += n
+        finally:
+            self.in_flight -= n
+
+
+# ── HTTP ──────────────────────────────────────────────────────────────────────
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class GradingService:
+    def __init__(self, workers: Optional[int] = None, window_ms: float = BATCH_WINDOW_MS,
+                 max_batch: int = MAX_BATCH):
+        self.workers = workers or os.cpu_count()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.batcher = Batcher(self.pool, window_ms, max_batch)
+        self.latency_ms: Dict[str, deque] = {p: deque(maxlen=LATENCY_SAMPLES)
+                                             for p in ("/grade", "/grade/bulk")}
+        self.requests = 0
+        self.started = time.time()
+
+    async def handle_grade(self, body: dict) -> dict:
+        question = resolve_question(body.get("question"))
+        answer = body.get("answer")
+        if not isinstance(answer, str):
+            raise RequestError("\"answer\" must be a string")
+        return (await self.batcher.grade(question, [answer], _weights(body)))[0]
+
+    async def handle_bulk(self, body: dict) -> dict:
+        weights = _weights(body)
+        if "items" in body:
+            items = body["items"]
+            if not isinstance(items, list):
+                raise RequestError("\"items\" must be a list")
+            jobs = []
+            for item in items:
+                if not isinstance(item, dict) or not isinstance(item.get("answer"), str):
+                    raise RequestError("each item needs a \"question\" and a string \"answer\"")
+                jobs.append(self.batcher.grade(resolve_question(item.get("question")),
+                                               [item["answer"]], weights))
+            return {"results": [r[0] for r in await asyncio.gather(*jobs)]}
+        answers = body.get("answers")
+        if not isinstance(answers, list) or not all(isinstance(a, str) for a in answers):
+            raise RequestError("\"answers\" must be a list of strings")
+        question = resolve_question(body.get("question"))
+        return {"results": await self.batcher.grade(question, answers, weights)}
+
+    def stats(self) -> dict:
+        b = self.batcher
+        sizes = list(b.batch_sizes)
+        out = {
+            "uptime_s": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "queue_depth": b.queued,
+            "in_flight": b.in_flight,
+            "batches": b.batches,
+            "answers_graded": b.graded,
+            "mean_batch_size": round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+        }
+        for path, lat in self.latency_ms.items():
+            values = list(lat)
+            out[path] = {"count": len(values),
+                         **{f"p{q}_ms": round(percentile(values, q), 2) for q in (50, 95, 99)}}
+        return out
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, dict]:
+        if path == "/stats":
+            return (200, self.stats()) if method == "GET" else (405, {"error": "use GET"})
+        handler = {"/grade": self.handle_grade, "/grade/bulk": self.handle_bulk}.get(path)
+        if handler is None:
+            return 404, {"error": f"no such endpoint {path}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        start = time.perf_counter()
+        try:
+            payload = json.loads(body or b"{}")
+            if not isinstance(payload, dict):
+                raise RequestError("request body must be a JSON object")
+            result = await handler(payload)
+        except (RequestError, json.JSONDecodeError, UnicodeDecodeError) as e:
+            return 400, {"error": str(e)}
+        self.latency_ms[path].append((time.perf_counter() - start) * 1000)
+        return 200, result
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = h.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    status, payload = 400, {"error": "invalid Content-Length"}
+                    keep_alive = False      # the body cannot be framed: drop the connection
+                elif length > MAX_BODY:
+                    status, payload = 413, {"error": "request body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    self.requests += 1
+                    try:
+                        status, payload = await self.dispatch(method, target.split("?", 1)[0], body)
+                    except Exception as e:      # never take the server down for one request
+                        status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                    keep_alive = (headers.get("connection", "").lower() != "close"
+                                  and version == "HTTP/1.1")
+                raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(raw)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + raw)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            pass        # server shutting down with idle keep-alive connections
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8502):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Local grading HTTP service.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8502)
+    ap.add_argument("--workers", type=int, default=None, help="grading processes (default: CPUs)")
+    ap.add_argument("--window-ms", type=float, default=BATCH_WINDOW_MS)
+    ap.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    args = ap.parse_args()
+
+    service = GradingService(args.workers, args.window_ms, args.max_batch)
+    print(f"Grading service on http://{args.host}:{args.port} "
+          f"({service.workers} workers, {args.window_ms} ms batch window)")
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
@@ -0,0 +1,107 @@
+"""
+Incremental reader for the JSON store's top-level objects.
+
+The data files are one JSON object mapping ids to records. json.load builds
+the whole mapping at once, so memory scales with history; iter_items reads
+the file in fixed-size chunks and yields (key, record) pairs one at a time,
+decoding each record with JSONDecoder.raw_decode on a growing text buffer.
+A decode is only accepted if it is followed by a delimiter already in the
+buffer (or ends at end of file), so a value cut off by a chunk boundary —
+the number 12 of 123, or 1 of 1.5 — is never returned; the reader fetches
+more and retries. Consumed text is dropped from the buffer as it goes, so
+peak memory is bounded by the chunk size plus the largest single record.
+"""
+
+import codecs
+import json
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterator, Optional, Tuple
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WS = " \t\n\r"
+_DELIMITERS = _WS + ",:}]"
+
+
+class _Reader:
+    def __init__(self, f: BinaryIO, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.nbytes = 0
+
+    def fill(self, size: int):
+        raw = self.f.read(size)
+        self.nbytes += len(raw)
+        self.eof = not raw
+        if self.pos > len(self.buf) // 2:   # drop consumed text before growing
+            self.buf, self.pos = self.buf[self.pos:], 0
+        self.buf += self.utf8.decode(raw, final=self.eof)
+
+    def peek(self) -> str:
+        """Next non-whitespace character ("" at end of file), without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos: self.pos + 1]
+            self.fill(self.chunk_size)
+
+    def expect(self, chars: str) -> str:
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError(f"expected one of {chars!r} at offset {self.nbytes}, got {c!r}")
+        self.pos += 1
+        return c
+
+    def value(self) -> Any:
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+                if (end < len(self.buf) and self.buf[end] in _DELIMITERS) or self.eof:
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill(size)
+            size *= 2       # large records: grow geometrically instead of re-decoding per chunk
+
+
+def iter_items(f: BinaryIO, chunk_size: int = CHUNK_SIZE,
+               on_done: Optional[Callable[[int], None]] = None) -> Iterator[Tuple[str, Any]]:
+    """Yield the (key, value) pairs of the top-level JSON object in `f` one at a time.
+    `on_done(nbytes)` is called with the bytes read once iteration stops."""
+    r = _Reader(f, chunk_size)
+    try:
+        if not r.peek():
+            return              # empty file
+        r.expect("{")
+        if r.peek() != "}":
+            while True:
+                key = r.value()
+                r.expect(":")
+                yield key, r.value()
+                if r.expect(",}") == "}":
+                    break
+        else:
+            r.pos += 1
+        if r.peek():            # json.load rejects anything after the object too
+            raise ValueError(f"extra data after the object at offset {r.nbytes}")
+    finally:
+        if on_done:
+            on_done(r.nbytes)
+
+
+def iter_file(path: Path, chunk_size: int = CHUNK_SIZE,
+              on_done: Optional[Callable[[int], None]] = None) -> Iterator[Tuple[str, Any]]:
+    if not path.exists():
+        return
+    with open(path, "rb") as f:
+        yield from iter_items(f, chunk_size, on_done)
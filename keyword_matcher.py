@@ -0,0 +1,124 @@
+"""
+Aho-Corasick keyword matching over token streams.
+
+Every keyword of a question is compiled into one automaton whose alphabet is
+tokens rather than characters, so a student answer is scanned once no matter
+how many keywords the question has. Two matching modes:
+
+  "phrase" — a multi-word keyword matches only if its tokens appear
+             consecutively ("cell membrane" needs "cell membrane", stop words
+             in between are ignored because they are removed before stemming)
+  "any"    — a keyword matches if any one of its tokens appears (the original
+             keyword_score behaviour, and the default for existing exams)
+
+Each keyword is looked for both as stems (stop words removed, suffixes
+stripped) and as raw normalized tokens, exactly like keyword_score. Synonym
+expansions compiled into the profile (lexicon.py) are extra stem patterns
+mapped to the same keyword, so they add nothing to the per-answer scan.
+Compiled matchers are cached by the profile's keyword digest and mode.
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+KEYWORD_MODES = ("any", "phrase")
+MAX_CACHED    = 4096
+
+
+class TokenAutomaton:
+    """Aho-Corasick automaton; patterns are token sequences tagged with an id."""
+
+    def __init__(self, patterns: Iterable[Tuple[Sequence[str], int]]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out:  List[Tuple[int, ...]] = [()]
+        for seq, pid in patterns:
+            if not seq:
+                continue
+            node = 0
+            for tok in seq:
+                nxt = self.goto[node].get(tok)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto.append({}); self.fail.append(0); self.out.append(())
+                    self.goto[node][tok] = nxt
+                node = nxt
+            if pid not in self.out[node]:
+                self.out[node] += (pid,)
+        self._link()
+
+    def _link(self):
+        queue = deque(self.goto[0].values())        # depth-1 nodes fail to the root
+        while queue:
+            node = queue.popleft()
+            for tok, child in self.goto[node].items():
+                queue.append(child)
+                f = self.fail[node]
+                while f and tok not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(tok, 0)
+                self.fail[child] = target if target != child else 0
+                if self.out[self.fail[child]]:
+                    self.out[child] += self.out[self.fail[child]]
+
+    def find(self, tokens: Iterable[str], found: Set[int] = None) -> Set[int]:
+        """Ids of all patterns occurring in `tokens`, in one pass."""
+        found = set() if found is None else found
+        self.scan(tokens, found)
+        return found
+
+    def scan(self, tokens: Iterable[str], found: Set[int], node: int = 0) -> int:
+        """Resumable find(): adds matches to `found` and returns the state to pass
+        with the next piece of the same stream, so phrases can span pieces."""
+        goto, fail, out = self.goto, self.fail, self.out
+        for tok in tokens:
+            while node and tok not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(tok, 0)
+            if out[node]:
+                found.update(out[node])
+        return node
+
+
+class QuestionMatcher:
+    """Matches all keywords of one question against a stemmed and a raw token stream."""
+
+    def __init__(self, kw_stems: List[List[str]], kw_raw: List[List[str]], mode: str = "any",
+                 kw_alt: List[List[List[str]]] = ()):
+        if mode not in KEYWORD_MODES:
+            raise ValueError(f"keyword mode must be one of {KEYWORD_MODES}, got {mode!r}")
+        alt = [(seq, i) for i, seqs in enumerate(kw_alt) for seq in seqs]
+        if mode == "phrase":
+            stem_patterns = [(seq, i) for i, seq in enumerate(kw_stems)] + alt
+            raw_patterns  = [(seq, i) for i, seq in enumerate(kw_raw)]
+        else:  # every single token is its own pattern
+            stem_patterns = [((t,), i) for i, seq in enumerate(kw_stems) for t in seq] \
+                          + [((t,), i) for seq, i in alt for t in seq]
+            raw_patterns  = [((t,), i) for i, seq in enumerate(kw_raw) for t in seq]
+        self.n_keywords = len(kw_stems)
+        self.stems = TokenAutomaton(stem_patterns)
+        self.raw   = TokenAutomaton(raw_patterns)
+
+    def match(self, stem_tokens: Iterable[str], raw_tokens: Iterable[str]) -> Set[int]:
+        found = self.stems.find(stem_tokens)
+        if len(found) < self.n_keywords:
+            self.raw.find(raw_tokens, found)
+        return found
+
+
+_cache: Dict[tuple, QuestionMatcher] = {}
+_lock  = threading.Lock()
+
+
+def matcher_for(profile: dict, mode: str = "any") -> QuestionMatcher:
+    """Compiled matcher for a question profile (grader.compile_question), cached."""
+    key = (profile["kw_key"], mode)
+    m = _cache.get(key)
+    if m is None:
+        m = QuestionMatcher(profile["kw_stems"], profile["kw_raw"], mode, profile.get("kw_alt", ()))
+        with _lock:
+            if len(_cache) >= MAX_CACHED:
+                _cache.clear()
+            _cache[key] = m
+    return m
@@ -0,0 +1,108 @@
+"""
+Cohort-level latent semantic scoring (LSA).
+
+The per-answer semantic score is a bag-of-stems cosine, so a paraphrase that
+uses different words scores low. This optional batch scorer builds a sparse
+TF-IDF term-document matrix over every answer to a question plus the model
+answer, projects it onto its top-k singular vectors (truncated SVD) and scores
+each answer by cosine similarity to the model answer in that latent space,
+where words that co-occur across the cohort end up close together.
+
+It runs over a whole cohort at once and does not change stored grades.
+
+CLI:  python latent.py EXAM_ID [--k 100]
+"""
+
+import math
+from typing import Dict, List
+
+import numpy as np
+from scipy.sparse import csr_matrix, diags
+from scipy.sparse.linalg import svds
+
+from tokenizer import get_pack
+
+DEFAULT_K = 100
+
+
+def term_document_matrix(docs: List[List[str]]) -> csr_matrix:
+    """Rows are documents, columns stems; values are sublinear TF x smoothed IDF, rows L2-normalised."""
+    vocab: Dict[str, int] = {}
+    indptr, indices, counts = [0], [], []
+    for doc in docs:
+        tf: Dict[int, int] = {}
+        for tok in doc:
+            j = vocab.setdefault(tok, len(vocab))
+            tf[j] = tf.get(j, 0) + 1
+        indices.extend(tf.keys())
+        counts.extend(tf.values())
+        indptr.append(len(indices))
+    X = csr_matrix((np.array(counts, dtype=float), np.array(indices, dtype=np.int64), indptr),
+                   shape=(len(docs), max(len(vocab), 1)))
+    X.data = 1.0 + np.log(X.data)
+    df  = np.bincount(X.indices, minlength=X.shape[1])
+    idf = np.log((1 + X.shape[0]) / (1 + df)) + 1.0
+    X   = X @ diags(idf)
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return csr_matrix(diags(1.0 / norms) @ X)
+
+
+def latent_scores(model_answer: str, answers: List[str], k: int = DEFAULT_K,
+                  language: str = "en") -> np.ndarray:
+    """Similarity of each answer to the model answer in a k-dimensional LSA space, in [0, 1]."""
+    if not answers:
+        return np.zeros(0)
+    pack = get_pack(language)
+    docs = [pack.stems(model_answer)] + [pack.stems(a) for a in answers]
+    X = term_document_matrix(docs)
+    k = min(k, min(X.shape) - 1)
+    if k < 1:  # too few documents or terms for a decomposition: plain TF-IDF cosine
+        Z = X.toarray()
+    else:
+        U, S, _ = svds(X, k=k, v0=np.ones(min(X.shape)))    # fixed start: same scores on every run
+        Z = U * S
+        norms = np.linalg.norm(Z, axis=1)
+        norms[norms == 0] = 1.0
+        Z = Z / norms[:, None]
+    sims = Z[1:] @ Z[0]
+    empty = np.array([not d for d in docs[1:]])
+    sims[empty] = 0.0
+    return np.clip(sims, 0.0, 1.0)
+
+
+def score_exam(exam: dict, submissions: List[dict], k: int = DEFAULT_K) -> Dict[str, np.ndarray]:
+    """Latent similarity per question for a cohort: {"sid": ids, "q1": scores, ...}."""
+    out = {"sid": np.array([s["id"] for s in submissions])}
+    for qi, q in enumerate(exam["questions"]):
+        answers = [(s["results"][qi].get("a", s["results"][qi].get("student_answer", ""))
+                    if qi < len(s["results"]) else "") for s in submissions]
+        out[f"q{qi+1}"] = latent_scores(q["model_answer"], answers, k, q.get("language") or "en")
+    return out
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import get_exam, get_exam_columns, iter_exam_submissions
+
+    ap = argparse.ArgumentParser(description="Latent semantic scores for an exam's cohort.")
+    ap.add_argument("exam_id")
+    ap.add_argument("--k", type=int, default=DEFAULT_K)
+    args = ap.parse_args()
+
+    exam = get_exam(args.exam_id.upper())
+    if not exam:
+        raise SystemExit(f"Unknown exam: {args.exam_id}")
+    subs   = list(iter_exam_submissions(exam["id"]))
+    scores = score_exam(exam, subs, args.k)
+    cols   = get_exam_columns(exam["id"])
+    row_of = {sid: i for i, sid in enumerate(cols["sid"])}
+    rows   = np.array([row_of.get(sid, -1) for sid in scores["sid"]])
+    print(f"{len(subs)} submission(s), k={args.k}")
+    print(f"{'question':>8} {'latent mean':>12} {'stem mean':>10} {'corr':>6}")
+    for qi in range(len(exam["questions"])):
+        lat  = scores[f"q{qi+1}"]
+        stem = np.where(rows >= 0, cols["semantic"][rows, qi] if len(cols["sid"]) else np.nan, np.nan)
+        ok   = ~np.isnan(stem)
+        corr = np.corrcoef(lat[ok], stem[ok])[0, 1] if ok.sum() > 2 else math.nan
+        print(f"{'Q' + str(qi + 1):>8} {lat.mean():>12.3f} {np.nanmean(stem):>10.3f} {corr:>6.2f}")
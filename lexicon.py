@@ -0,0 +1,134 @@
+"""
+Local synonym lexicon for keyword expansion.
+
+Each language pack names its source file under lexicon/ (English:
+lexicon/synonyms.txt; plain text, one comma-separated synonym group per line),
+which is compiled into a compact binary index and opened with mmap, so every worker
+process on a host shares the same read-only pages instead of loading a
+dictionary into its own heap. Lookups are a binary search over the index.
+
+Compiled layout (all integers little-endian uint32):
+    b"EXLEX001"  magic
+    n            number of words
+    offsets[n+1] start of each record, relative to the first record
+    records      b"word\\tsyn1\\tsyn2..." for each word, sorted by UTF-8 bytes
+
+The compiled file is named after a hash of the source, so it never goes stale
+and concurrent processes can build it without coordination. It lives in the
+data directory (data/lexicon/, created owner-only), not the shared system temp
+directory, where another local user could plant an index that changes grades.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Dict, List, Set
+
+from database import DATA_DIR
+
+SOURCE_DIR = Path(__file__).parent / "lexicon"
+SOURCE = SOURCE_DIR / "synonyms.txt"
+COMPILED_DIR = DATA_DIR / "lexicon"
+MAGIC  = b"EXLEX001"
+
+
+def parse_groups(text: str) -> Dict[str, Set[str]]:
+    """word -> every other word sharing a group with it."""
+    table: Dict[str, Set[str]] = {}
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        words = [w.strip().lower() for w in line.split(",") if w.strip()]
+        for w in words:
+            table.setdefault(w, set()).update(x for x in words if x != w)
+    return table
+
+
+def compile_lexicon(src: Path, dst: Path):
+    table   = parse_groups(src.read_text(encoding="utf-8"))
+    records = [b"\t".join([w.encode()] + [s.encode() for s in sorted(table[w])])
+               for w in sorted(table, key=lambda w: w.encode())]
+    offsets, pos = [], 0
+    for r in records:
+        offsets.append(pos); pos += len(r)
+    offsets.append(pos)
+    tmp = dst.with_name(f"{dst.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack(f"<{len(offsets) + 1}I", len(records), *offsets))
+        f.write(b"".join(records))
+    os.replace(tmp, dst)
+
+
+class Lexicon:
+    """Read-only view over a compiled lexicon file."""
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != MAGIC:
+            raise ValueError(f"{path} is not a compiled lexicon")
+        (self.size,) = struct.unpack_from("<I", self._mm, 8)
+        self._index = 12
+        self._base  = 12 + 4 * (self.size + 1)
+
+    def _offset(self, i: int) -> int:
+        return struct.unpack_from("<I", self._mm, self._index + 4 * i)[0]
+
+    def _record(self, i: int) -> bytes:
+        return self._mm[self._base + self._offset(i): self._base + self._offset(i + 1)]
+
+    def synonyms(self, word: str) -> List[str]:
+        key = word.lower().encode()
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            rec = self._record(mid)
+            head = rec.split(b"\t", 1)[0]
+            if head == key:
+                return [s.decode() for s in rec.split(b"\t")[1:]]
+            if head < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return []
+
+    def __len__(self):
+        return self.size
+
+
+_lexicons: Dict[str, Lexicon] = {}     # source file name -> opened index
+_lock = threading.Lock()
+
+
+def compiled_path(src: Path = SOURCE) -> Path:
+    digest = hashlib.sha256(src.read_bytes()).hexdigest()[:12]
+    return COMPILED_DIR / f"{src.stem}-{digest}.idx"
+
+
+def get_lexicon(name: str = SOURCE.name) -> Lexicon:
+    """The shared lexicon compiled from lexicon/<name>, built into the data directory on first use."""
+    lex = _lexicons.get(name)
+    if lex is None:
+        with _lock:
+            lex = _lexicons.get(name)
+            if lex is None:
+                src  = SOURCE_DIR / name
+                path = compiled_path(src)
+                if not path.exists():
+                    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+                    compile_lexicon(src, path)
+                lex = _lexicons[name] = Lexicon(path)
+    return lex
+
+
+if __name__ == "__main__":
+    import sys
+    lex = get_lexicon()
+    print(f"{len(lex)} words, compiled at {compiled_path()}")
+    for w in sys.argv[1:]:
+        print(f"{w}: {', '.join(lex.synonyms(w)) or '(none)'}")
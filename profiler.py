@@ -0,0 +1,129 @@
+"""
+Per-rerun page profiler.
+Every Streamlit rerun of a page is wrapped in `profile_page`, which records wall
+time, storage I/O (calls to database._load / _save and bytes moved), time
+spent grading and time spent waiting for store write locks. Each record is
+logged as one JSON line on the "exameval.perf" logger and kept in a bounded
+in-memory window for the admin page.
+"""
+
+import json
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+log = logging.getLogger("exameval.perf")
+
+MAX_SAMPLES = 2000          # per page, oldest samples are dropped first
+
+_local   = threading.local()    # Streamlit runs each session's script in its own thread
+_samples: Dict[str, deque] = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+_lock    = threading.Lock()
+
+
+def _current() -> Optional[dict]:
+    return getattr(_local, "record", None)
+
+
+@contextmanager
+def profile_page(page: str):
+    """Profile one render of `page`; nested storage / grading calls report into it."""
+    rec = {
+        "page": page, "status": "ok",
+        "loads": 0, "saves": 0, "bytes_read": 0, "bytes_written": 0,
+        "grading_ms": 0.0, "lock_wait_ms": 0.0,
+    }
+    _local.record = rec
+    start = time.perf_counter()
+    try:
+        yield rec
+    except BaseException as e:
+        # st.rerun() / st.stop() end a render early — still worth recording
+        rec["status"] = type(e).__name__
+        raise
+    finally:
+        rec["wall_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        rec["grading_ms"] = round(rec["grading_ms"], 2)
+        rec["lock_wait_ms"] = round(rec["lock_wait_ms"], 2)
+        rec["ts"] = time.time()
+        _local.record = None
+        with _lock:
+            _samples[page].append(rec)
+        log.info(json.dumps(rec))
+
+
+def record_io(kind: str, nbytes: int):
+    """Called by the storage layer; `kind` is "load" or "save"."""
+    rec = _current()
+    if rec is None:
+        return
+    if kind == "load":
+        rec["loads"] += 1
+        rec["bytes_read"] += nbytes
+    else:
+        rec["saves"] += 1
+        rec["bytes_written"] += nbytes
+
+
+@contextmanager
+def timed(field: str = "grading_ms"):
+    """Add the elapsed milliseconds of the block to `field` of the current record."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        rec = _current()
+        if rec is not None:
+            rec[field] = rec.get(field, 0.0) + (time.perf_counter() - start) * 1000
+
+
+# ── Reporting ─────────────────────────────────────────────────────────────────
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile, q in [0, 100]."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+def samples(page: Optional[str] = None) -> List[dict]:
+    with _lock:
+        if page is not None:
+            return list(_samples.get(page, ()))
+        return [r for dq in _samples.values() for r in dq]
+
+
+def page_stats() -> List[dict]:
+    """One summary row per page: latency percentiles and mean I/O per render."""
+    with _lock:
+        snapshot = {p: list(dq) for p, dq in _samples.items()}
+    rows = []
+    for page, recs in sorted(snapshot.items()):
+        if not recs:
+            continue
+        walls = [r["wall_ms"] for r in recs]
+        n = len(recs)
+        rows.append({
+            "page": page, "renders": n,
+            "p50_ms": percentile(walls, 50),
+            "p95_ms": percentile(walls, 95),
+            "p99_ms": percentile(walls, 99),
+            "max_ms": max(walls),
+            "loads": round(sum(r["loads"] for r in recs) / n, 1),
+            "saves": round(sum(r["saves"] for r in recs) / n, 1),
+            "kb_read": round(sum(r["bytes_read"] for r in recs) / n / 1024, 1),
+            "kb_written": round(sum(r["bytes_written"] for r in recs) / n / 1024, 1),
+            "grading_ms": round(sum(r["grading_ms"] for r in recs) / n, 2),
+            "lock_wait_ms": round(sum(r.get("lock_wait_ms", 0.0) for r in recs) / n, 2),
+        })
+    return rows
+
+
+def reset():
+    with _lock:
+        _samples.clear()
@@ -0,0 +1,116 @@
+"""
+Compact per-answer result records.
+
+A submission stores one small record per question, in question order:
+
+    {"s": 7.5,             # awarded score (teacher override if "ov")
+     "sim": 0.812,         # semantic similarity
+     "kw": 0.667,          # keyword score
+     "coh": 1.0,           # coherence score
+     "m": [0, 2],          # indices into the question's keywords that matched
+     "fb": 260,            # feedback reason codes as a bitmask over FEEDBACK_CODES
+     "a": "...",           # the student's answer (the graded part, see "tr")
+     "tr": true,           # present only when the answer was cut at the word cap
+     "ov": true}           # present only when a teacher overrode the score
+
+Question text, max marks, keyword strings and feedback sentences come from the
+exam at display time instead of being copied into every submission.
+"""
+
+from typing import List, Optional
+
+from grader import feedback_codes, render_feedback
+from tokenizer import cap_for, truncate
+
+# Bit i of a stored "fb" mask is FEEDBACK_CODES[i]; append-only, never reorder.
+FEEDBACK_CODES = ["none", "exact", "excellent", "good", "partial", "poor",
+                  "off_topic", "imprecise", "missing_kw", "brief", "expand", "truncated"]
+_CODE_BIT = {c: 1 << i for i, c in enumerate(FEEDBACK_CODES)}
+
+
+def encode_feedback(codes: List[str]) -> int:
+    mask = 0
+    for c in codes:
+        mask |= _CODE_BIT[c]
+    return mask
+
+
+def decode_feedback(mask: int) -> List[str]:
+    return [c for i, c in enumerate(FEEDBACK_CODES) if mask >> i & 1]
+
+
+def is_compact(rec: dict) -> bool:
+    return "s" in rec
+
+
+def result_score(rec: dict) -> float:
+    return rec["s"] if is_compact(rec) else rec["score"]
+
+
+def compact_result(result: dict, question: dict, student_answer: str) -> dict:
+    """Shrink a grade_answer() result dict for storage. A truncated answer is
+    stored only up to the question's word cap, as graded."""
+    matched = set(result.get("matched_keywords", []))
+    if result.get("truncated"):
+        student_answer = truncate(student_answer, cap_for(question.get("max_tokens", 0)))[0]
+    rec = {
+        "s": result["score"],
+        "sim": result["semantic_similarity"],
+        "kw": result["keyword_score"],
+        "coh": result["coherence_score"],
+        "m": [i for i, k in enumerate(question.get("keywords", [])) if k in matched],
+        "fb": encode_feedback(result["feedback_codes"]),
+        "a": student_answer,
+    }
+    if result.get("truncated"):
+        rec["tr"] = True
+    if result.get("overridden"):
+        rec["ov"] = True
+    return rec
+
+
+def compact_legacy(result: dict, question: dict) -> dict:
+    """Convert a pre-compact stored result (full grade_answer dict + question_text)."""
+    keywords = question.get("keywords", [])
+    missed   = [k for k in keywords if k in set(result.get("missed_keywords", []))]
+    pct      = result.get("percentage", 0.0) / 100
+    if result.get("feedback", "").startswith("❌ No answer"):
+        codes = ["none"]
+    else:
+        codes = feedback_codes(result.get("semantic_similarity", 0.0), result.get("keyword_score", 0.0),
+                               result.get("coherence_score", 0.0), missed, pct,
+                               exact=result.get("feedback", "").startswith("✅ Perfect"))
+    return compact_result({**result, "feedback_codes": codes}, question,
+                          result.get("student_answer", ""))
+
+
+def expand_result(rec: dict, question: Optional[dict]) -> dict:
+    """Rebuild the display dict (same keys grade_answer returns) for one record."""
+    if not is_compact(rec):
+        return rec  # stored before the compact format
+    question  = question or {}
+    keywords  = question.get("keywords", [])
+    hit       = set(rec.get("m", []))
+    matched   = [k for i, k in enumerate(keywords) if i in hit]
+    missed    = [k for i, k in enumerate(keywords) if i not in hit]
+    max_marks = question.get("max_marks", 0)
+    return {
+        "score": rec["s"], "max_marks": max_marks,
+        "percentage": round(rec["s"] / max_marks * 100, 1) if max_marks else 0.0,
+        "semantic_similarity": rec["sim"],
+        "keyword_score": rec["kw"],
+        "coherence_score": rec["coh"],
+        "matched_keywords": matched,
+        "missed_keywords": missed,
+        "feedback": render_feedback(decode_feedback(rec.get("fb", 0)), missed),
+        "question_text": question.get("text", ""),
+        "student_answer": rec.get("a", ""),
+        "truncated": rec.get("tr", False),
+        "overridden": rec.get("ov", False),
+    }
+
+
+def expand_results(sub: dict, exam: Optional[dict]) -> List[dict]:
+    questions = exam["questions"] if exam else []
+    return [expand_result(r, questions[i] if i < len(questions) else None)
+            for i, r in enumerate(sub["results"])]
@@ -0,0 +1,90 @@
+"""
+Per-exam order-statistics index over submission percentages.
+A sorted array of (percentage, submission id) answers rank, percentile and
+top-k with a binary search instead of sorting every submission per view.
+database.py keeps one index per exam in process memory: it is built from the
+exam's columnar scores on first use and updated in place on save_submission /
+update_submission_score, tagged with the column file's stamp so a write made
+by another process is noticed and the index rebuilt.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class ScoreIndex:
+    """Scores kept sorted ascending; ties are ordered by submission id."""
+
+    def __init__(self, entries: Iterable[Tuple[str, float]] = ()):
+        self._entries: List[Tuple[float, str]] = sorted((float(p), sid) for sid, p in entries)
+        self._scores:  List[float] = [p for p, _ in self._entries]
+        self._by_sid:  Dict[str, float] = {sid: p for p, sid in self._entries}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, sid: str) -> bool:
+        return sid in self._by_sid
+
+    def set(self, sid: str, pct: float):
+        """Insert a submission or move it to its new score."""
+        old = self._by_sid.get(sid)
+        if old is not None:
+            i = bisect_left(self._entries, (old, sid))
+            del self._entries[i], self._scores[i]
+        pct = float(pct)
+        i = bisect_left(self._entries, (pct, sid))
+        self._entries.insert(i, (pct, sid))
+        self._scores.insert(i, pct)
+        self._by_sid[sid] = pct
+
+    def rank(self, sid: str) -> Optional[int]:
+        """1 for the top score; tied submissions share the best rank among them."""
+        pct = self._by_sid.get(sid)
+        if pct is None:
+            return None
+        return len(self._scores) - bisect_right(self._scores, pct) + 1
+
+    def percentile(self, sid: str) -> Optional[float]:
+        """Share of submissions scoring at or below this one, 0–100."""
+        pct = self._by_sid.get(sid)
+        if pct is None:
+            return None
+        return 100.0 * bisect_right(self._scores, pct) / len(self._scores)
+
+    def top(self, k: int) -> List[Tuple[str, float]]:
+        """The k best (sid, percentage), best first."""
+        return [(sid, p) for p, sid in reversed(self._entries[-k:])] if k > 0 else []
+
+    def ranked(self) -> List[str]:
+        """All submission ids, best first."""
+        return [sid for _, sid in reversed(self._entries)]
+
+
+_indexes: Dict[str, Tuple[int, ScoreIndex]] = {}   # exam id -> (column stamp, index)
+_lock = threading.Lock()
+
+
+def cached(exam_id: str, stamp: int) -> Optional[ScoreIndex]:
+    with _lock:
+        hit = _indexes.get(exam_id)
+    return hit[1] if hit and stamp and hit[0] == stamp else None
+
+
+def store(exam_id: str, stamp: int, index: ScoreIndex):
+    with _lock:
+        _indexes[exam_id] = (stamp, index)
+
+
+def apply(exam_id: str, old_stamp: int, new_stamp: int, sid: str, pct: float):
+    """Record one write: update the cached index if it was current, else drop it."""
+    with _lock:
+        hit = _indexes.get(exam_id)
+        if not hit:
+            return
+        if old_stamp and hit[0] == old_stamp and new_stamp:
+            hit[1].set(sid, pct)
+            _indexes[exam_id] = (new_stamp, hit[1])
+        else:
+            del _indexes[exam_id]
@@ -3,10 +3,13 @@
 import streamlit as st
 import time
 from database import (
-    get_exam, get_exams, save_submission, get_student_submissions,
-    has_student_submitted, get_submission
+    get_exam, get_exams, get_exams_by_ids, save_submission, get_student_submissions,
+    has_student_submitted, get_submission, get_score_index
 )
-from grader import grade_answer
+from grade_cache import cached_grade
+from results import compact_result, expand_results
+from profiler import timed
+from tokenizer import cap_for
 
 def nav(page):
     st.session_state.page = page
@@ -38,17 +41,21 @@ def page_student_dashboard():
                     st.warning("You've already submitted this exam. See your result below.")
                 else:
                     st.session_state.active_exam_id   = code
+                    st.session_state.active_exam_version = exam.get("version")   # edits mid-exam don't apply
                     st.session_state.student_answers  = {}
                     st.session_state.exam_start_time  = time.time()
                     nav("take_exam")
 
+    subs      = get_student_submissions(user["id"])
+    submitted = {s["exam_id"] for s in subs}
+
     # ── Available exams ───────────────────────────────────────────────────────
     all_exams = [e for e in get_exams().values() if e.get("published", True)]
     if all_exams:
         st.markdown('<hr class="divider">', unsafe_allow_html=True)
         st.markdown("**Available Exams — use one of these codes above**")
         for exam in sorted(all_exams, key=lambda e: e["created_at"], reverse=True):
-            already = has_student_submitted(exam["id"], user["id"])
+            already = exam["id"] in submitted
             status  = '<span class="badge badge-green">✓ Submitted</span>' if already else '<span class="badge badge-blue">Open</span>'
             st.markdown(f"""
             <div class="card" style="display:flex;justify-content:space-between;align-items:center;flex-wrap:wrap;gap:0.5rem;">
@@ -64,16 +71,17 @@ def page_student_dashboard():
             """, unsafe_allow_html=True)
 
     # ── Past submissions ──────────────────────────────────────────────────────
-    subs = get_student_submissions(user["id"])
     if subs:
+        # Older submissions predate the stored exam title: resolve them in one batch
+        legacy = get_exams_by_ids(s["exam_id"] for s in subs if not s.get("exam_title"))
         st.markdown('<hr class="divider">', unsafe_allow_html=True)
         st.markdown(f"**My Results ({len(subs)})**")
         for sub in sorted(subs, key=lambda s: s["submitted_at"], reverse=True):
             pct   = sub["percentage"]
             badge = "badge-green" if pct >= 65 else ("badge-yellow" if pct >= 40 else "badge-red")
             emoji = "🟢" if pct >= 65 else ("🟡" if pct >= 40 else "🔴")
-            exam  = get_exam(sub["exam_id"])
-            title = exam["title"] if exam else sub["exam_id"]
+            exam  = legacy.get(sub["exam_id"])
+            title = sub.get("exam_title") or (exam["title"] if exam else sub["exam_id"])
             c1, c2 = st.columns([3, 1])
             with c1:
                 st.markdown(f"""
@@ -96,7 +104,7 @@ def page_take_exam():
     if not exam_id:
         nav("student_dashboard"); return
 
-    exam = get_exam(exam_id)
+    exam = get_exam(exam_id, st.session_state.get("active_exam_version"))
     if not exam:
         st.error("Exam not found."); nav("student_dashboard"); return
 
@@ -177,8 +185,11 @@ def page_take_exam():
 
         wc        = len(ans.split()) if ans.strip() else 0
         min_w     = q.get("min_words", 0)
+        cap       = cap_for(q.get("max_tokens", 0))
         wc_color  = "#16a34a" if (min_w == 0 or wc >= min_w) else ("#b45309" if wc > 0 else "#6b7280")
         min_label = f"(min {min_w})" if min_w > 0 else ""
+        if wc > cap:
+            wc_color, min_label = "#dc2626", f"(only the first {cap} will be graded)"
         st.markdown(f'<div style="font-size:0.78rem;color:{wc_color};text-align:right;margin-top:-0.3rem">{wc} words {min_label}</div>', unsafe_allow_html=True)
         st.markdown("")
 
@@ -201,28 +212,21 @@ def page_take_exam():
 
     if should_submit:
         final_answers = st.session_state.get("student_answers", answers)
-        with st.spinner("🧠 Grading your answers with AI…"):
+        with st.spinner("🧠 Grading your answers with AI…"), timed("grading_ms"):
             results      = []
             total_score  = 0.0
             total_marks  = 0.0
             for i, q in enumerate(exam["questions"]):
                 student_ans = (final_answers.get(i) or "").strip()
-                result = grade_answer(
-                    student_answer=student_ans if student_ans else "(no answer)",
-                    model_answer=q["model_answer"],
-                    keywords=q.get("keywords", []),
-                    max_marks=q["max_marks"],
-                    min_words=q.get("min_words", 0),
-                )
-                result["question_text"]  = q["text"]
-                result["student_answer"] = student_ans
-                results.append(result)
+                result = cached_grade(student_ans if student_ans else "(no answer)", q)
+                results.append(compact_result(result, q, student_ans))
                 total_score += result["score"]
                 total_marks += q["max_marks"]
 
         sub = save_submission(
             exam_id=exam_id, student_id=user["id"], student_name=user["name"],
             results=results, total_score=total_score, total_marks=total_marks,
+            exam_title=exam["title"], exam_subject=exam["subject"], exam_version=exam.get("version"),
         )
         st.session_state.selected_submission_id = sub["id"]
         st.success("✅ Submitted! Loading your results…")
@@ -248,7 +252,7 @@ def page_my_results():
     if not sub:
         st.error("Result not found."); nav("student_dashboard"); return
 
-    exam       = get_exam(sub["exam_id"])
+    exam       = get_exam(sub["exam_id"], sub.get("exam_version"))
     exam_title = exam["title"] if exam else sub["exam_id"]
 
     if st.button("← Back to Dashboard"):
@@ -282,10 +286,16 @@ def page_my_results():
     </div>
     """, unsafe_allow_html=True)
 
+    index = get_score_index(sub["exam_id"])
+    rank  = index.rank(sub_id)
+    if rank is not None and len(index) > 1:
+        st.markdown(f'<div style="text-align:center;opacity:0.8">🏅 Class rank <b>{rank}</b> of {len(index)}'
+                    f' &nbsp;·&nbsp; percentile {index.percentile(sub_id):.0f}</div>', unsafe_allow_html=True)
+
     st.markdown('<hr class="divider">', unsafe_allow_html=True)
     st.markdown("**Question-by-Question Breakdown**")
 
-    for i, res in enumerate(sub["results"]):
+    for i, res in enumerate(expand_results(sub, exam)):
         q_score    = res["score"]
         q_max      = res["max_marks"]
         q_pct      = (q_score / q_max * 100) if q_max else 0
@@ -1,11 +1,24 @@
 """Teacher Views — Dashboard, Create Exam, Results"""
 
 import streamlit as st
+import tempfile
 import time
+import numpy as np
+import pandas as pd
 from database import (
     get_teacher_exams, create_exam, get_exam,
-    get_exam_submissions, update_submission_score
+    get_exam_submissions, get_exam_columns, get_score_index, update_submission_score
 )
+from analytics import item_analysis
+from calibration import MIN_OVERRIDES, calibrate_exam, calibrate_subject
+from export import export_exam, parquet_available
+from exam_import import (MAX_DURATION, MAX_TOKENS_LIMIT, MIN_DURATION, import_exam, meta_duration,
+                         parse_file, validate_questions)
+from results import expand_results
+from grader import DEFAULT_WEIGHTS
+from tokenizer import DEFAULT_MAX_TOKENS, PACKS, SYNONYM_LANGUAGES
+
+LEADERBOARD_SIZE = 10
 
 def nav(page):
     st.session_state.page = page
@@ -35,9 +48,9 @@ def page_teacher_dashboard():
         return
 
     for exam in sorted(exams, key=lambda e: e["created_at"], reverse=True):
-        subs        = get_exam_submissions(exam["id"])
+        pcts        = get_exam_columns(exam["id"])["percentage"]
         total_marks = sum(q["max_marks"] for q in exam["questions"])
-        avg_pct     = (sum(s["percentage"] for s in subs) / len(subs)) if subs else None
+        avg_pct     = float(pcts.mean()) if len(pcts) else None
 
         with st.container():
             c1, c2 = st.columns([3, 1], gap="small")
@@ -51,7 +64,7 @@ def page_teacher_dashboard():
                   </div>
                   <div style="margin-top:0.6rem; display:flex; gap:0.6rem; align-items:center; flex-wrap:wrap;">
                     <span class="code-pill">{exam['id']}</span>
-                    <span class="badge badge-blue">👥 {len(subs)} submission(s)</span>
+                    <span class="badge badge-blue">👥 {len(pcts)} submission(s)</span>
                     {f'<span class="badge badge-green">📊 Avg {avg_pct:.1f}%</span>' if avg_pct is not None else ''}
                   </div>
                 </div>
@@ -68,6 +81,38 @@ def page_create_exam():
     if st.button("← Back"):
         nav("teacher_dashboard")
 
+    with st.expander("📂 Bulk import questions from a CSV or JSON file"):
+        st.caption("CSV columns: text, model_answer, keywords (comma-separated), max_marks, min_words, "
+                   "keyword_mode (phrase or any), synonyms (true/false), max_tokens (word cap, 0 = default), "
+                   "language (en or es). "
+                   "JSON: a list of questions with the same fields, or {title, subject, duration_minutes, questions}.")
+        upload = st.file_uploader("Question file", type=["csv", "json"], key="bulk_file")
+        if upload is not None:
+            try:
+                rows, meta = parse_file(upload.name, upload.getvalue())
+            except (ValueError, UnicodeDecodeError) as e:
+                rows, meta = [], {}
+                st.error(f"Could not read the file: {e}")
+            questions, errors = validate_questions(rows) if rows else ([], [])
+            if errors:
+                st.error("\n".join(f"- {e}" for e in errors[:20])
+                         + (f"\n- …and {len(errors) - 20} more" if len(errors) > 20 else ""))
+            elif questions:
+                st.success(f"{len(questions)} question(s), {sum(q['max_marks'] for q in questions)} marks in total.")
+                with st.form("bulk_meta"):
+                    c1, c2, c3 = st.columns([3, 2, 1])
+                    with c1: b_title    = st.text_input("Exam Title", value=meta.get("title", ""))
+                    with c2: b_subject  = st.text_input("Subject",    value=meta.get("subject", ""))
+                    with c3: b_duration = st.number_input("Duration (min)", MIN_DURATION, MAX_DURATION, meta_duration(meta))
+                    if st.form_submit_button("✅ Publish Imported Exam", use_container_width=True):
+                        if not b_title:
+                            st.error("Please give the exam a title.")
+                        else:
+                            exam = import_exam(st.session_state.user["id"], b_title, b_subject,
+                                               int(b_duration), questions)
+                            st.success("✅ Exam published! Share this code with your students:")
+                            st.markdown(f'<div style="text-align:center;padding:1rem 0"><span class="code-pill" style="font-size:1.6rem;letter-spacing:8px">{exam["id"]}</span></div>', unsafe_allow_html=True)
+
     st.markdown('<hr class="divider">', unsafe_allow_html=True)
     st.markdown("**Step 1 — Exam details**")
 
@@ -77,7 +122,21 @@ def page_create_exam():
         with c2: subject  = st.text_input("Subject",    placeholder="e.g. Computer Science")
         with c3: duration = st.number_input("Duration (min)", 5, 180, 60)
         num_q = st.number_input("Number of Questions", 1, 20, 3)
+        phrases = st.checkbox("Match multi-word keywords as whole phrases", value=True,
+                              help="On: \"cell membrane\" needs both words together. "
+                                   "Off: any one word of the keyword is enough.")
+        synonyms = st.checkbox("Also accept common synonyms of keywords", value=False,
+                               help="e.g. \"speed\" also matches \"velocity\" (uses the built-in lexicon; "
+                                    f"available for {', '.join(PACKS[c].name for c in SYNONYM_LANGUAGES)})")
+        language = st.selectbox("Answer language", list(PACKS), format_func=lambda c: PACKS[c].name,
+                                help="Stop words and word endings used when grading answers")
         if st.form_submit_button("Continue →", use_container_width=True):
+            if synonyms and language not in SYNONYM_LANGUAGES:
+                st.error(f"Synonym matching is not available for {PACKS[language].name} answers.")
+                return
+            st.session_state.exam_kw_mode   = "phrase" if phrases else "any"
+            st.session_state.exam_synonyms  = synonyms
+            st.session_state.exam_language  = language
             st.session_state.num_questions  = int(num_q)
             st.session_state.exam_title     = title
             st.session_state.exam_subject   = subject
@@ -98,10 +157,12 @@ def page_create_exam():
         with st.expander(f"Question {i+1}", expanded=True):
             q_text    = st.text_area("Question",     key=f"q_{i}_text", placeholder="Type the question here…")
             model_ans = st.text_area("Model Answer", key=f"q_{i}_ans",  placeholder="The ideal answer (even a single word is fine)…", height=80)
-            c1, c2 = st.columns(2)
+            c1, c2, c3 = st.columns(3)
             with c1: marks     = st.number_input("Marks",     1, 100, 10, key=f"q_{i}_marks")
             with c2: min_words = st.number_input("Min Words", 0, 200,  0, key=f"q_{i}_minw",
                                                  help="0 = no minimum (good for single-word answers)")
+            with c3: max_words = st.number_input("Max Words", 0, MAX_TOKENS_LIMIT, 0, key=f"q_{i}_maxw",
+                                                 help=f"Words graded per answer; 0 = default ({DEFAULT_MAX_TOKENS})")
             kw_raw  = st.text_input("Keywords (comma-separated, optional)", key=f"q_{i}_kw",
                                      placeholder="e.g. recursion, complexity, algorithm")
             kw_list = [k.strip() for k in kw_raw.split(",") if k.strip()]
@@ -110,6 +171,10 @@ def page_create_exam():
             questions.append({
                 "text": q_text, "model_answer": model_ans,
                 "keywords": kw_list, "max_marks": int(marks), "min_words": int(min_words),
+                "max_tokens": int(max_words),
+                "keyword_mode": st.session_state.get("exam_kw_mode", "phrase"),
+                "synonyms": st.session_state.get("exam_synonyms", False),
+                "language": st.session_state.get("exam_language", "en"),
             })
 
     st.markdown('<hr class="divider">', unsafe_allow_html=True)
@@ -150,33 +215,105 @@ def page_exam_results():
         nav("teacher_dashboard")
 
     st.markdown(f'<div class="page-title">📊 {exam["title"]}</div>', unsafe_allow_html=True)
-    st.markdown(f'<div class="page-sub">Code: <b>{exam["id"]}</b> &nbsp;·&nbsp; {exam["subject"]} &nbsp;·&nbsp; {len(exam["questions"])} questions &nbsp;·&nbsp; {sum(q["max_marks"] for q in exam["questions"])} total marks</div>', unsafe_allow_html=True)
+    st.markdown(f'<div class="page-sub">Code: <b>{exam["id"]}</b> &nbsp;·&nbsp; {exam["subject"]} &nbsp;·&nbsp; {len(exam["questions"])} questions &nbsp;·&nbsp; {sum(q["max_marks"] for q in exam["questions"])} total marks &nbsp;·&nbsp; version {exam.get("version", 1)}</div>', unsafe_allow_html=True)
 
-    subs = get_exam_submissions(exam_id)
-    if not subs:
+    cols = get_exam_columns(exam_id)
+    pcts = cols["percentage"]
+    if not len(pcts):
         st.info("No submissions yet. Share the exam code with students."); return
 
-    percentages = [s["percentage"] for s in subs]
-    avg    = sum(percentages) / len(percentages)
-    passed = sum(1 for p in percentages if p >= 50)
+    passed = int((pcts >= 50).sum())
 
     m1, m2, m3, m4 = st.columns(4)
-    m1.metric("Submissions", len(subs))
-    m2.metric("Average",     f"{avg:.1f}%")
-    m3.metric("Highest",     f"{max(percentages):.1f}%")
-    m4.metric("Pass Rate",   f"{passed}/{len(subs)}")
+    m1.metric("Submissions", len(pcts))
+    m2.metric("Average",     f"{pcts.mean():.1f}%")
+    m3.metric("Highest",     f"{pcts.max():.1f}%")
+    m4.metric("Pass Rate",   f"{passed}/{len(pcts)}")
+
+    counts, edges = np.histogram(pcts, bins=10, range=(0, 100))
+    st.markdown("**Score Distribution**")
+    st.bar_chart(pd.DataFrame({"Students": counts},
+                              index=[f"{int(lo)}–{int(hi)}%" for lo, hi in zip(edges[:-1], edges[1:])]))
+
+    q_means = np.nanmean(cols["score"], axis=0) if cols["score"].size else []
+    if len(q_means):
+        st.markdown("**Average Score per Question**")
+        st.bar_chart(pd.DataFrame({"Average": q_means},
+                                  index=[f"Q{i+1}" for i in range(len(q_means))]))
+
+    with st.expander("🔬 Item Analysis"):
+        report = item_analysis(exam)
+        st.caption("Difficulty = average fraction of marks earned (higher is easier). "
+                   "Discrimination = point-biserial correlation between scoring ≥ 50% on the "
+                   "question and the rest of the exam (low or negative values flag weak questions).")
+        st.dataframe(report["items"], use_container_width=True, hide_index=True)
+        st.markdown("**Most frequently missed keywords**")
+        if report["missed_keywords"].empty:
+            st.caption("No keywords defined for this exam.")
+        else:
+            st.dataframe(report["missed_keywords"].head(15), use_container_width=True, hide_index=True)
+        st.markdown("**Metric distribution (percentiles)**")
+        st.dataframe(report["components"], use_container_width=True, hide_index=True)
+
+    with st.expander("⚖️ Weight Calibration"):
+        st.caption("Fits the semantic / keyword / coherence weights to the scores you have "
+                   f"overridden. A suggestion needs at least {MIN_OVERRIDES} overrides; "
+                   f"current weights are {', '.join(f'{w:.2f}' for w in DEFAULT_WEIGHTS)}.")
+        whole_subject = st.checkbox(f"Use all my {exam['subject']} exams", key=f"cal_subj_{exam_id}")
+        report = (calibrate_subject(st.session_state.user["id"], exam["subject"]) if whole_subject
+                  else calibrate_exam(exam))
+        if not report:
+            st.caption("No overridden scores yet.")
+        else:
+            st.dataframe(pd.DataFrame([
+                {"fit": name, "semantic": r["weights"][0], "keyword": r["weights"][1],
+                 "coherence": r["weights"][2], "rmse": r["rmse"], "mae": r["mae"]}
+                for name, r in ((n, report[n]) for n in ("current", "grid", "lstsq"))
+            ]), use_container_width=True, hide_index=True)
+            if report["suggested"]:
+                st.success(f"Suggested weights from {report['overrides']} overrides: "
+                           + ", ".join(f"{w:.2f}" for w in report["suggested"]))
+
+    with st.expander("⬇️ Export Results"):
+        formats = ["csv", "parquet"] if parquet_available() else ["csv"]
+        fmt = st.radio("Format", formats, horizontal=True, key=f"exp_fmt_{exam_id}")
+        if st.button("Prepare export", key=f"exp_btn_{exam_id}"):
+            # Rows are streamed to a spooled temp file in chunks, not built in memory
+            out = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+            rows = export_exam(exam_id, out, fmt)
+            out.seek(0)
+            st.download_button(
+                f"Download {rows} row(s) as {fmt.upper()}", out.read(),
+                file_name=f"{exam_id}_results.{fmt}",
+                mime="text/csv" if fmt == "csv" else "application/octet-stream",
+                key=f"exp_dl_{exam_id}",
+            )
+
+    subs  = {s["id"]: s for s in get_exam_submissions(exam_id)}
+    index = get_score_index(exam_id)
 
     st.markdown('<hr class="divider">', unsafe_allow_html=True)
+    st.markdown("**Leaderboard**")
+    st.dataframe(pd.DataFrame([
+        {"Rank": index.rank(sid), "Student": subs[sid]["student_name"], "Score %": pct}
+        for sid, pct in index.top(LEADERBOARD_SIZE) if sid in subs
+    ]), use_container_width=True, hide_index=True)
+
     st.markdown("**Individual Results**")
 
-    for sub in sorted(subs, key=lambda s: s["percentage"], reverse=True):
+    ranked = [subs[sid] for sid in index.ranked() if sid in subs]
+    ranked += [s for s in subs.values() if s["id"] not in index]   # written since the index was read
+    for sub in ranked:
         pct   = sub["percentage"]
         badge = "badge-green" if pct >= 65 else ("badge-yellow" if pct >= 40 else "badge-red")
         emoji = "🟢" if pct >= 65 else ("🟡" if pct >= 40 else "🔴")
 
+        graded = exam
+        if sub.get("exam_version") not in (None, exam.get("version")):
+            graded = get_exam(exam_id, sub["exam_version"]) or exam   # questions this answer was graded on
         with st.expander(f"{emoji} {sub['student_name']} — {sub['total_score']}/{sub['total_marks']} ({pct}%)"):
-            for qi, res in enumerate(sub["results"]):
-                q       = exam["questions"][qi]
+            for qi, res in enumerate(expand_results(sub, graded)):
+                q       = graded["questions"][qi]
                 q_score = res["score"]
                 q_max   = res["max_marks"]
                 q_pct   = (q_score / q_max * 100) if q_max else 0
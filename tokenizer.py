@@ -0,0 +1,187 @@
+"""
+Bounded-cost scanning of answer text.
+
+Nothing stops a student pasting a 2 MB essay, so the grader never runs its
+regexes and token lists over a whole answer at once:
+
+  - truncate() applies the question's word cap (max_tokens, or
+    DEFAULT_MAX_TOKENS when unset). It stops scanning at the cap, so its cost
+    does not depend on how long the answer is. An answer made of a few
+    enormous "words" is also cut after MAX_CHARS_PER_TOKEN characters per
+    allowed word.
+  - iter_chunks() cuts what is left at whitespace into pieces of CHUNK_WORDS
+    words. grade_answer folds each piece into running counts, so memory
+    stays flat however high the cap is set.
+
+Chunks end on a word boundary, and every tokenizer step (lower-casing,
+punctuation stripping, splitting) works within a word. Concatenating the
+per-chunk tokens therefore gives exactly the tokens of the whole text.
+
+Language packs hold those steps for one language: the stop-word list, the
+stemmer's suffix rules and accent folding, with the translation tables
+compiled once at import. A question picks its pack with its "language"
+field (English by default). Every metric goes through the pack, and stems
+are memoised per pack because answers to the same question repeat the same
+few hundred words. A pack names its own synonym lexicon (see lexicon.py);
+synonym matching is only offered for packs that have one.
+"""
+
+import hashlib
+import json
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_MAX_TOKENS  = 2000     # words graded per answer unless the question sets max_tokens
+MAX_CHARS_PER_TOKEN = 32
+CHUNK_WORDS         = 2048
+
+_WORD = re.compile(r"\S+")
+
+
+def cap_for(max_tokens: int) -> int:
+    """The effective word cap for a question's max_tokens setting (0 = default)."""
+    return max_tokens if max_tokens and max_tokens > 0 else DEFAULT_MAX_TOKENS
+
+
+def truncate(text: str, max_tokens: int) -> Tuple[str, bool]:
+    """(graded prefix of `text`, whether anything was cut off)."""
+    if len(text) < 2 * max_tokens:
+        return text, False      # too short to hold more than max_tokens words
+    end, n = 0, 0
+    for m in _WORD.finditer(text, 0, max_tokens * MAX_CHARS_PER_TOKEN):
+        n += 1
+        if n > max_tokens:
+            return text[:end], True
+        end = m.end()
+    if _WORD.search(text, end) is None:
+        return text, False      # only whitespace after the last word
+    return text[:end], True
+
+
+def iter_chunks(text: str, chunk_words: int = CHUNK_WORDS) -> Iterator[str]:
+    """`text` in consecutive pieces of `chunk_words` words, cut at whitespace."""
+    if len(text) < 2 * chunk_words:
+        yield text              # cannot hold more than one chunk
+        return
+    start = 0
+    for n, m in enumerate(_WORD.finditer(text), 1):
+        if n % chunk_words == 0:
+            yield text[start:m.end()]
+            start = m.end()
+    if start < len(text):
+        yield text[start:]
+
+
+# ── LANGUAGE PACKS ────────────────────────────────────────────────────────────
+_PUNCT  = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+# [^\w\s] as a translation table for ASCII text, which is nearly every answer
+_ASCII_PUNCT = {i: " " for i in range(128) if _PUNCT.match(chr(i))}
+_NORM_STRIP  = ".,!?;:'\""
+MAX_STEM_CACHE = 50_000     # memoised stems per pack before the memo is reset
+
+
+class _StemMemo(dict):
+    def __init__(self, stem):
+        super().__init__()
+        self._stem = stem
+
+    def __missing__(self, word):
+        if len(self) >= MAX_STEM_CACHE:
+            self.clear()
+        s = self[word] = self._stem(word)
+        return s
+
+
+class LanguagePack:
+    """Tokenizer rules for one language, compiled once and shared by every metric."""
+
+    def __init__(self, code: str, name: str, stop_words: Iterable[str], suffixes: Iterable[str],
+                 min_stem: int = 3, fold: Dict[str, str] = None, punctuation: str = "",
+                 lexicon: Optional[str] = None):
+        self.code, self.name, self.min_stem = code, name, min_stem
+        self.lexicon = lexicon      # synonym source file under lexicon/, None = no synonyms
+        self.fold = str.maketrans(fold) if fold else None
+        folded = (lambda w: w.translate(self.fold)) if fold else (lambda w: w)
+        self.stop_words = frozenset(folded(w) for w in stop_words)
+        self.suffixes   = tuple(folded(x) for x in suffixes)    # tried in order, first match wins
+        self.norm_table = {**str.maketrans("", "", _NORM_STRIP + punctuation), **(self.fold or {})}
+        self.digest = hashlib.sha256(json.dumps(
+            [code, sorted(self.stop_words), self.suffixes, min_stem, sorted((fold or {}).items()),
+             punctuation],
+            ensure_ascii=False).encode()).hexdigest()[:16]
+        self._memo = _StemMemo(self.stem_word)
+
+    def tokens(self, text: str) -> List[str]:
+        """Lower-cased words with punctuation and stop words removed."""
+        text = text.lower()
+        if self.fold:
+            text = text.translate(self.fold)
+        text = text.translate(_ASCII_PUNCT) if text.isascii() else _PUNCT.sub(" ", text)
+        stop = self.stop_words
+        return [t for t in text.split() if t not in stop and len(t) > 1]
+
+    def stem_word(self, word: str) -> str:
+        for suffix in self.suffixes:
+            if word.endswith(suffix) and len(word) - len(suffix) >= self.min_stem:
+                return word[: -len(suffix)]
+        return word
+
+    def stem_tokens(self, tokens: Iterable[str]) -> List[str]:
+        return list(map(self._memo.__getitem__, tokens))
+
+    def stems(self, text: str) -> List[str]:
+        """stem_tokens(tokens(text))."""
+        return list(map(self._memo.__getitem__, self.tokens(text)))
+
+    def normalize(self, text: str) -> str:
+        """Lower-cased, sentence punctuation removed, whitespace runs collapsed."""
+        return _SPACES.sub(" ", text.lower().strip().translate(self.norm_table))
+
+    def words(self, text: str) -> List[str]:
+        """normalize(text).split() without building the normalized string."""
+        return text.lower().translate(self.norm_table).split()
+
+
+ENGLISH = LanguagePack(
+    "en", "English",
+    stop_words="""
+        a an the is it in on at to for of and or but not with this that are was be been
+        being have has had do does did will would can could should may might shall from
+        by as so if then than there their they we our us you your he she his her its my
+        me i am were also into which who what when where how all each both more most
+        other some such no only same up out about above after before between through
+        during while although because since any these those""".split(),
+    suffixes=("ation", "ations", "ing", "ings", "tion", "tions", "ness",
+              "ment", "ments", "ers", "ies", "es", "ed", "ly", "s"),
+    lexicon="synonyms.txt",
+)
+
+SPANISH = LanguagePack(
+    "es", "Español",
+    stop_words="""
+        a al algo algunas algunos ante antes como con contra cual cuando de del desde
+        donde durante e el él ella ellas ellos en entre era eres es esa esas ese eso esos
+        esta está estaba estar estas este esto estos fue fueron ha han hasta hay la las le
+        les lo los más me mi mí mis mucho muchos muy nada ni no nos nosotros o os otra
+        otras otro otros para pero poco por porque qué que quien quienes se ser si sí sin
+        sobre son su sus también tanto te tiene tienen todo todos tu tú tus un una uno
+        unos y ya yo""".split(),
+    suffixes=("amientos", "imientos", "aciones", "uciones", "amiento", "imiento", "idades",
+              "mente", "ación", "ución", "anzas", "istas", "ables", "ibles", "idad", "anza",
+              "ista", "able", "ible", "osos", "osas", "oso", "osa", "es", "s"),
+    fold={"á": "a", "é": "e", "í": "i", "ó": "o", "ú": "u", "ü": "u"},
+    punctuation="¿¡",
+)
+
+PACKS: Dict[str, LanguagePack] = {p.code: p for p in (ENGLISH, SPANISH)}
+LANGUAGES = tuple(PACKS)
+SYNONYM_LANGUAGES = tuple(c for c, p in PACKS.items() if p.lexicon)
+
+
+def get_pack(language: str = "en") -> LanguagePack:
+    """The pack for a question's language code ("" or None = English)."""
+    try:
+        return PACKS[language or "en"]
+    except KeyError:
+        raise ValueError(f"unknown language {language!r}; expected one of {', '.join(LANGUAGES)}")